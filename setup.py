@@ -20,6 +20,9 @@ setup(
             'ipdb',
             'pylint==3.0.4',
             'nose2'
+        ],
+        'orjson': [
+            'orjson>=3.9'
         ]
     },
     entry_points="""
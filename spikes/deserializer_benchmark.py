@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+'''
+Compares the item deserialization of `Deserializer.deserialize_item` with the
+recursive TypeDeserializer path it replaced.
+
+    python spikes/deserializer_benchmark.py [number of items]
+'''
+import random
+import string
+import sys
+import timeit
+
+from tap_dynamodb.deserialize import Deserializer
+
+
+def random_string(size=12):
+    return ''.join(random.choice(string.ascii_letters) for _ in range(size))
+
+
+def make_item(index):
+    return {
+        'id': {'N': str(index)},
+        'name': {'S': random_string()},
+        'active': {'BOOL': index % 2 == 0},
+        'deleted_at': {'NULL': True},
+        'score': {'N': '{}.{}'.format(random.randint(0, 10000), random.randint(0, 99))},
+        'payload': {'B': random_string(32).encode('utf-8')},
+        'tags': {'SS': [random_string(6) for _ in range(3)]},
+        'counters': {'NS': [str(random.randint(0, 1000)) for _ in range(3)]},
+        'address': {'M': {
+            'street': {'S': random_string()},
+            'number': {'N': str(random.randint(1, 500))},
+            'geo': {'M': {'lat': {'N': '52.5200'}, 'lng': {'N': '13.4050'}}},
+        }},
+        'events': {'L': [{'M': {'type': {'S': random_string(5)},
+                                'at': {'N': str(1600000000 + i)}}}
+                         for i in range(5)]},
+    }
+
+
+def recursive_deserialize_item(deserializer, item):
+    return deserializer.deserialize({'M': item})
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    items = [make_item(i) for i in range(count)]
+    deserializer = Deserializer()
+
+    assert [deserializer.deserialize_item(item) for item in items] == \
+        [recursive_deserialize_item(deserializer, item) for item in items]
+
+    recursive = min(timeit.repeat(lambda: [recursive_deserialize_item(deserializer, item) for item in items],
+                                  number=1, repeat=5))
+    fast = min(timeit.repeat(lambda: [deserializer.deserialize_item(item) for item in items],
+                             number=1, repeat=5))
+
+    print('items:                      {}'.format(count))
+    print('recursive TypeDeserializer: {:.1f} items/second'.format(count / recursive))
+    print('deserialize_item:           {:.1f} items/second'.format(count / fast))
+    print('speedup:                    {:.2f}x'.format(recursive / fast))
+
+
+if __name__ == '__main__':
+    main()
@@ -1,11 +1,15 @@
 import json
 import sys
 import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 
 import singer
 from singer import metadata
+from tap_dynamodb import checkpoint, output, process_pool, rate_limiter, scheduler, tailing
+from tap_dynamodb.config import get_number
 from tap_dynamodb.discover import discover_streams
 from tap_dynamodb.dynamodb import setup_aws_client, setup_aws_client_with_proxy
+from tap_dynamodb.sync_strategies import full_table
 from tap_dynamodb.sync import sync_stream
 
 
@@ -31,30 +35,95 @@ def stream_is_selected(mdata):
     '''
     return mdata.get((), {}).get('selected', False)
 
+def get_stream_workers(config):
+    # by default the streams are synced one after another
+    return get_number(config.get('stream_workers'), 'stream_workers', 1, minimum=1)
+
+def sync_selected_stream(config, state, stream, counts, sync_times):
+    '''
+    Write the schema and sync a selected stream, recording its row count and
+    sync time
+    '''
+    start_time = time.time()
+    stream_name = stream['tap_stream_id']
+    mdata = metadata.to_map(stream['metadata'])
+
+    output.write_state(state)
+    key_properties = metadata.get(mdata, (), 'table-key-properties')
+    output.write_schema(stream_name, stream['schema'], key_properties)
+
+    LOGGER.info("%s: Starting sync", stream_name)
+    counts[stream_name] = sync_stream(config, state, stream)
+    sync_times[stream_name] = time.time() - start_time
+    LOGGER.info("%s: Completed sync (%s rows)", stream_name, counts[stream_name])
+
+def sync_streams_concurrently(config, state, streams, stream_workers, counts, sync_times):
+    '''
+    Sync the streams on `stream_workers` worker threads. Every stream has a
+    state of its own, which is merged into `state` whenever it is written,
+    see `output.StateMerger`. The messages of every stream go through the
+    same writer, so they never interleave. The first failure stops the other
+    streams at their next state message and is raised.
+    '''
+    merger = output.StateMerger(state)
+
+    def sync_in_worker(stream):
+        stream_name = stream['tap_stream_id']
+        with output.merging_state(merger, stream_name):
+            sync_selected_stream(config, merger.get_stream_state(stream_name), stream, counts, sync_times)
+
+    LOGGER.info("Syncing %s streams with %s workers", len(streams), stream_workers)
+    executor = ThreadPoolExecutor(max_workers=stream_workers, thread_name_prefix='tap-dynamodb-stream')
+    try:
+        futures = [executor.submit(sync_in_worker, stream) for stream in streams]
+        for future in as_completed(futures):
+            future.result()
+    except Exception:
+        merger.stop()
+        raise
+    finally:
+        # the streams which did not start yet are not synced after a failure
+        executor.shutdown(wait=True, cancel_futures=True)
+
 def do_sync(config, catalog, state):
     '''
     Run the sync mode for each streams
     '''
     LOGGER.info('Starting sync.')
+    output.configure(config)
+    checkpoint.configure(config)
+    rate_limiter.configure_streams_governor(config)
+    tailing.configure(config)
+    stream_workers = get_stream_workers(config)
 
-    counts = {}
-    sync_times = {}
+    selected_streams = []
     for stream in catalog['streams']:
-        start_time = time.time()
-        stream_name = stream['tap_stream_id']
         mdata = metadata.to_map(stream['metadata'])
         if not stream_is_selected(mdata):
-            LOGGER.info("%s: Skipping - not selected", stream_name)
+            LOGGER.info("%s: Skipping - not selected", stream['tap_stream_id'])
             continue
+        # an invalid filter or partition key list fails the sync before any stream is synced
+        full_table.get_partition_keys(mdata)
+        full_table.get_scan_filter(mdata)
+        selected_streams.append(stream)
+    selected_streams = scheduler.order_streams(selected_streams, state, stream_workers)
 
-        singer.write_state(state)
-        key_properties = metadata.get(mdata, (), 'table-key-properties')
-        singer.write_schema(stream_name, stream['schema'], key_properties)
+    # the decode worker processes are started once and shared by every stream
+    process_pool.start(config)
 
-        LOGGER.info("%s: Starting sync", stream_name)
-        counts[stream_name] = sync_stream(config, state, stream)
-        sync_times[stream_name] = time.time() - start_time
-        LOGGER.info("%s: Completed sync (%s rows)", stream_name, counts[stream_name])
+    counts = {}
+    sync_times = {}
+    try:
+        if stream_workers > 1:
+            sync_streams_concurrently(config, state, selected_streams, stream_workers, counts, sync_times)
+        else:
+            for stream in selected_streams:
+                sync_selected_stream(config, state, stream, counts, sync_times)
+    finally:
+        # write out the buffered messages, even if the sync failed, as every
+        # state message still follows the records it covers
+        output.flush()
+        process_pool.shutdown()
 
     get_sync_summary(catalog, counts, sync_times)
     LOGGER.info('Done syncing.')
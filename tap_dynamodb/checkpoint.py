@@ -0,0 +1,77 @@
+import time
+
+from tap_dynamodb import output
+from tap_dynamodb.config import get_number
+
+# By default the state is written once this many seconds have passed or this
+# many records have been written since the last state message, whichever
+# comes first. 0 disables a threshold.
+CHECKPOINT_INTERVAL = 10.0
+CHECKPOINT_RECORDS = 10000
+
+# The thresholds of the run, see `configure`
+SETTINGS = {'interval': CHECKPOINT_INTERVAL, 'records': CHECKPOINT_RECORDS}
+
+
+class CheckpointPolicy():
+    '''
+    Decides when a STATE message is written during the sync of a stream.
+
+    The sync strategies update their bookmarks in memory and call `update`
+    after writing records, which only writes the state once the time or
+    record threshold is reached. `write` always writes it, which is used on
+    stream boundaries, and `write_pending` writes it if a bookmark was
+    updated since the last state message, which is used on shutdown.
+    '''
+
+    def __init__(self, interval=None, records=None, clock=time.monotonic):
+        self.interval = SETTINGS['interval'] if interval is None else interval
+        self.records = SETTINGS['records'] if records is None else records
+        self._clock = clock
+        self._written_at = clock()
+        self._records_since_write = 0
+        self._pending = False
+
+    def is_due(self):
+        if not self.interval and not self.records:
+            # without thresholds every update is written
+            return True
+        if self.records and self._records_since_write >= self.records:
+            return True
+        return bool(self.interval) and self._clock() - self._written_at >= self.interval
+
+    def update(self, state, records=0):
+        '''
+        Note that the bookmarks in `state` were updated after writing
+        `records` records, writing the state if a threshold is reached
+        '''
+        self._records_since_write += records
+        self._pending = True
+        if self.is_due():
+            self.write(state)
+
+    def write(self, state):
+        output.write_state(state)
+        self._written_at = self._clock()
+        self._records_since_write = 0
+        self._pending = False
+
+    def write_pending(self, state):
+        if self._pending:
+            self.write(state)
+
+
+def get_checkpoint_interval(config):
+    return get_number(config.get('checkpoint_interval'), 'checkpoint_interval', CHECKPOINT_INTERVAL, float)
+
+
+def get_checkpoint_records(config):
+    return get_number(config.get('checkpoint_records'), 'checkpoint_records', CHECKPOINT_RECORDS)
+
+
+def configure(config):
+    '''
+    Set the thresholds of the policies created during the run from the config
+    '''
+    SETTINGS['interval'] = get_checkpoint_interval(config)
+    SETTINGS['records'] = get_checkpoint_records(config)
@@ -0,0 +1,29 @@
+def get_number(value, name, default=None, convert=int, minimum=0, maximum=None, exclusive_minimum=False):
+    '''
+    Return `value`, from the config or the metadata `name`, converted with
+    `convert`, `int` or `float`, or `default` if it is not set. Raises an
+    exception if it is not a number, or if it is lower than `minimum`, or
+    equal to it with `exclusive_minimum`, or greater than `maximum`. A
+    `minimum` of None allows any value.
+    '''
+    if value is None or value == '':
+        return default
+
+    try:
+        number = convert(value)
+    except (TypeError, ValueError):
+        raise Exception("Invalid {}: {}. It should be {}.".format(
+            name, value, 'an integer' if convert is int else 'a number'))
+
+    if maximum is not None and not minimum <= number <= maximum:
+        raise Exception("Invalid {}: {}. It should be between {} and {}.".format(name, number, minimum, maximum))
+
+    if minimum is not None:
+        if exclusive_minimum and number <= minimum:
+            raise Exception("Invalid {}: {}. It should be greater than {}.".format(name, number, minimum))
+        if number < minimum:
+            if minimum == 0:
+                raise Exception("Invalid {}: {}. It should not be negative.".format(name, number))
+            raise Exception("Invalid {}: {}. It should be at least {}.".format(name, number, minimum))
+
+    return number
@@ -1,5 +1,6 @@
 import base64
 import decimal
+import math
 from boto3.dynamodb.types import TypeDeserializer
 
 # Custom context to control how decimals are deserialized
@@ -9,6 +10,55 @@ trapped_signals = [decimal.Clamped, decimal.Overflow, decimal.Inexact, decimal.R
 SINGER_CONTEXT = decimal.Context(Emin=-128, Emax=126, prec=100,
                                  traps=trapped_signals)
 
+# Integers with up to 15 digits are exactly representable as a double, so they
+# are safe for targets which parse JSON numbers as floats
+MAX_INT_DIGITS = 15
+
+
+def deserialize_number(value):
+    '''
+    Deserializes integers within the safe range as int and any other number
+    as a Decimal in the SINGER_CONTEXT. Both are JSON encoded the same way,
+    but building an int is much cheaper than building a Decimal.
+    '''
+    digits = value[1:] if value[:1] == '-' else value
+    if len(digits) <= MAX_INT_DIGITS and digits.isdigit() and digits.isascii():
+        number = int(value)
+        # `-0` keeps its sign as a Decimal
+        if number or digits is value:
+            return number
+    return SINGER_CONTEXT.create_decimal(value)
+
+
+def deserialize_number_as_float(value):
+    '''
+    Deserializes numbers with a fractional part as floats when the float
+    round-trips to the exact same value, falling back to `deserialize_number`
+    otherwise
+    '''
+    number = deserialize_number(value)
+    if isinstance(number, int) or number == number.to_integral_value():
+        return number
+    as_float = float(number)
+    if math.isfinite(as_float) and decimal.Decimal(repr(as_float)) == number:
+        return as_float
+    return number
+
+
+# Number deserializers selectable with the `tap-dynamodb.number-mode` metadata
+NUMBER_DESERIALIZERS = {
+    'decimal': deserialize_number,
+    'float': deserialize_number_as_float,
+}
+
+
+class DecodedItem(dict):
+    '''
+    An item deserialized straight from the raw response body, see
+    `tap_dynamodb.raw_response`. `Deserializer.deserialize_item` returns it
+    as is.
+    '''
+
 class Deserializer(TypeDeserializer):
     '''
     This class inherits from boto3.dynamodb.types.TypeDeserializer
@@ -18,8 +68,132 @@ class Deserializer(TypeDeserializer):
     handle binary data and sets
     '''
 
+    def __init__(self, number_mode=None):
+        number_mode = number_mode or 'decimal'
+        if number_mode not in NUMBER_DESERIALIZERS:
+            raise Exception("Invalid number mode: {}. It should be one of {}.".format(
+                number_mode, ', '.join(NUMBER_DESERIALIZERS)))
+        self.number_mode = number_mode
+        self.number_deserializer = NUMBER_DESERIALIZERS[number_mode]
+
+        # The projection last applied, its plan and the attributes it selects,
+        # see `compile_projection` and `compile_selection`
+        self._projection = None
+        self._projection_plan = None
+        self._projection_selection = None
+
+        # Deserializers of the scalar and set types, maps and lists are
+        # handled by `deserialize_item` itself
+        self.type_deserializers = {
+            'NULL': self._deserialize_null,
+            'BOOL': self._deserialize_bool,
+            'N': self.number_deserializer,
+            'S': self._deserialize_s,
+            'B': self._deserialize_b,
+            'NS': self._deserialize_ns,
+            'SS': self._deserialize_ss,
+            'BS': self._deserialize_bs,
+        }
+        # Binary values in a raw response body are already base64 encoded
+        self.raw_type_deserializers = dict(self.type_deserializers,
+                                           B=self._deserialize_s,
+                                           BS=self._deserialize_ss)
+
     def deserialize_item(self, item):
-        return self.deserialize({'M': item})
+        '''
+        Deserializes a top level item, producing the same output as
+        `self.deserialize({'M': item})`.
+
+        The types are dispatched with a table lookup instead of the
+        `getattr` based dispatch of TypeDeserializer, and nested maps and
+        lists are walked with an explicit stack instead of recursion.
+        '''
+        if isinstance(item, DecodedItem):
+            return item
+        return self._deserialize_item(item, self.type_deserializers)
+
+    def deserialize_projected_item(self, item, projections):
+        '''
+        Deserializes only the attributes of a top level item which
+        `apply_projection` reads for `projections`, so applying the projection
+        to the result gives the same output as applying it to the whole
+        deserialized item. The values which are not selected are never
+        deserialized.
+        '''
+        if isinstance(item, DecodedItem):
+            return item
+        selection = self._compile_projection(projections)[1]
+        return {key: self._deserialize_selected(item[key], selection[key])
+                for key in selection if key in item}
+
+    def _deserialize_selected(self, typed_value, selection):
+        if selection is not SELECT_ALL and typed_value:
+            value_type, children = selection
+            dynamodb_type = next(iter(typed_value))
+            value = typed_value[dynamodb_type]
+            if dynamodb_type == value_type == 'M':
+                output = {key: self._deserialize_selected(value[key], children[key])
+                          for key in children if key in value}
+                if value and not output:
+                    # the map is only read for its truthiness
+                    output[next(iter(value))] = None
+                return output
+            if dynamodb_type == value_type == 'L':
+                # the other elements are only read for the length of the list
+                output = [None] * len(value)
+                for index, child in children.items():
+                    if index < len(value):
+                        output[index] = self._deserialize_selected(value[index], child)
+                return output
+        # the whole value is selected, or it is not the map or list the
+        # projection expects and is read as is
+        return self._deserialize_item({'value': typed_value}, self.type_deserializers)['value']
+
+    def deserialize_raw_item(self, item):
+        '''
+        Deserializes a top level item decoded from the JSON of a raw response
+        body, where binary values are base64 encoded strings instead of bytes
+        '''
+        return DecodedItem(self._deserialize_item(item, self.raw_type_deserializers))
+
+    def _deserialize_item(self, item, type_deserializers):
+        output = {}
+        # Every frame holds the container being filled and an iterator over
+        # the (key or index, typed value) pairs still to deserialize into it
+        stack = [(output, iter(item.items()))]
+        while stack:
+            container, typed_values = stack[-1]
+            for key, typed_value in typed_values:
+                if not typed_value:
+                    raise TypeError('Value must be a nonempty dictionary whose key is a valid dynamodb type.')
+                dynamodb_type = next(iter(typed_value))
+                value = typed_value[dynamodb_type]
+
+                if dynamodb_type == 'S':
+                    # strings are the most common type and need no conversion
+                    container[key] = value
+                    continue
+                if dynamodb_type == 'M':
+                    child = {}
+                    container[key] = child
+                    stack.append((child, iter(value.items())))
+                    break
+                if dynamodb_type == 'L':
+                    child = [None] * len(value)
+                    container[key] = child
+                    stack.append((child, enumerate(value)))
+                    break
+
+                deserializer = type_deserializers.get(dynamodb_type)
+                if deserializer is None:
+                    # TypeDeserializer ignores the case of the type
+                    container[key] = self.deserialize(typed_value)
+                else:
+                    container[key] = deserializer(value)
+            else:
+                stack.pop()
+
+        return output
 
     def _deserialize_b(self, value):
         '''
@@ -30,9 +204,9 @@ class Deserializer(TypeDeserializer):
 
     def _deserialize_n(self, value):
         '''
-        Deserializes sets as lists to allow JSON encoding
+        Deserializes numbers with the number deserializer of the number mode
         '''
-        return SINGER_CONTEXT.create_decimal(value)
+        return self.number_deserializer(value)
 
     def _deserialize_ns(self, value):
         '''
@@ -52,47 +226,152 @@ class Deserializer(TypeDeserializer):
         '''
         return list(map(self._deserialize_b, value))
 
-    def _apply_projection(self, record, breadcrumb, output):
-        """
+    def apply_projection(self, record, projections):
+        '''
         The LOG_BASED replication method uses the get_records method which gets all the records by default.
-        In case of projection expression, parse the response retrieved from the API and filter the output
-        based on projection expressions
-        """
-        if len(breadcrumb) == 1:
-            if '[' in breadcrumb[0]:
-                breadcrumb_key = breadcrumb[0].split('[')[0]
-                index = int(breadcrumb[0].split('[')[1].split(']')[0])
-                if output.get(breadcrumb_key):
-                    # only prepare output if the list field contains data at that index position in record
-                    if len(record.get(breadcrumb_key)) > index:
-                        output[breadcrumb_key].append(record[breadcrumb_key][index])
-                else:
-                    output[breadcrumb_key] = []
-                    # only prepare output if the list field contains data at that index position in record
-                    if record.get(breadcrumb_key) and len(record.get(breadcrumb_key)) > index:
-                        output[breadcrumb_key].append(record[breadcrumb_key][index])
+        In case of projection expression, filter the record based on the projection expressions.
+        The projections are compiled once and the plan is reused as long as the same list is passed.
+        '''
+        return apply_projection_plan(record, self._compile_projection(projections)[0])
+
+    def _compile_projection(self, projections):
+        '''
+        Returns the plan and the selection of the projection, which are only
+        compiled again if another list of breadcrumbs is passed
+        '''
+        if self._projection is not projections:
+            self._projection_plan = compile_projection(projections)
+            self._projection_selection = compile_selection(self._projection_plan)
+            self._projection = projections
+        return self._projection_plan, self._projection_selection
+
+
+# Selects a whole value in a selection of `compile_selection`
+SELECT_ALL = None
+
+
+def select_child(children, key, value_type):
+    '''
+    Returns the children of `key` in a selection, selected as a map ('M') or
+    a list ('L'), or None if the whole value of `key` is selected
+    '''
+    selection = children.get(key, ())
+    if selection == ():
+        selection = children[key] = (value_type, {})
+    elif selection is SELECT_ALL or selection[0] != value_type:
+        # a value read both as a map and as a list is deserialized as is
+        children[key] = SELECT_ALL
+        return None
+    return selection[1]
+
+
+def select_list(children, key, index):
+    '''
+    Returns the children of the list `key` in a selection, or None if the
+    whole list is selected, which it is for a negative index because the
+    element it selects depends on the length of the list
+    '''
+    if index < 0:
+        children[key] = SELECT_ALL
+        return None
+    return select_child(children, key, 'L')
+
+
+def compile_selection(plan):
+    '''
+    Compiles a plan of `compile_projection` into the tree of the attributes
+    it reads: a dict of the selected keys of the item to either SELECT_ALL or
+    a tuple of 'M' and the dict of the selected keys of the map, or of 'L'
+    and the dict of the selected indexes of the list.
+    '''
+    selection = {}
+    for steps, (leaf_key, leaf_index) in plan:
+        children = selection
+        for key, index in steps:
+            if index is None:
+                children = select_child(children, key, 'M')
             else:
-                output[breadcrumb[0]] = record.get(breadcrumb[0])
+                children = select_list(children, key, index)
+                if children is not None:
+                    children = select_child(children, index, 'M')
+            if children is None:
+                break
         else:
-            if '[' in breadcrumb[0]:
-                breadcrumb_key = breadcrumb[0].split('[')[0]
-                index = int(breadcrumb[0].split('[')[1].split(']')[0])
-                if not output.get(breadcrumb_key):
-                    output[breadcrumb_key] = [{}]
-                # only prepare output if the list field contains data at that index position in record
-                if record.get(breadcrumb_key) and len(record.get(breadcrumb_key)) > index:
-                    self._apply_projection(record[breadcrumb_key][index], breadcrumb[1:], output[breadcrumb_key][0])
-            else:
-                if output.get(breadcrumb[0]) is None:
-                    output[breadcrumb[0]] = {}
-                # keep empty dict if the data is not found in the record
-                if record.get(breadcrumb[0]):
-                    self._apply_projection(record.get(breadcrumb[0], {}), breadcrumb[1:], output[breadcrumb[0]])
+            if leaf_index is not None:
+                children = select_list(children, leaf_key, leaf_index)
+                leaf_key = leaf_index
+            if children is not None:
+                children[leaf_key] = SELECT_ALL
+    return selection
 
-    def apply_projection(self, record, projections):
-        output = {}
 
-        for breadcrumb in projections:
-            self._apply_projection(record, breadcrumb, output)
+def compile_breadcrumb_part(part):
+    '''
+    Returns the key and the list index, or None, of a breadcrumb part like
+    `Name` or `Name[0]`
+    '''
+    if '[' in part:
+        return part.split('[')[0], int(part.split('[')[1].split(']')[0])
+    return part, None
 
-        return output
+
+def compile_projection(projections):
+    '''
+    Compiles the breadcrumbs of a projection into a plan: for every
+    breadcrumb, the (key, index) steps leading to its last part and the
+    (key, index) of the last part itself.
+
+    The breadcrumbs are kept in order rather than merged into a tree,
+    because applying one can depend on the output of the ones before it.
+    '''
+    plan = []
+    for breadcrumb in projections:
+        steps = tuple(compile_breadcrumb_part(part) for part in breadcrumb)
+        plan.append((steps[:-1], steps[-1]))
+    return tuple(plan)
+
+
+def apply_projection_plan(record, plan):
+    '''
+    Returns the record filtered by a plan of `compile_projection`
+    '''
+    output = {}
+
+    for steps, (leaf_key, leaf_index) in plan:
+        source = record
+        target = output
+        for key, index in steps:
+            # the output is filled before the record is read, the record can
+            # be part of the output if a breadcrumb before took it as is
+            if index is None:
+                if target.get(key) is None:
+                    target[key] = {}
+                value = source.get(key)
+                # keep empty dict if the data is not found in the record
+                if not value:
+                    break
+                source = value
+                target = target[key]
+            else:
+                if not target.get(key):
+                    target[key] = [{}]
+                value = source.get(key)
+                # only prepare output if the list field contains data at that index position in record
+                if not value or len(value) <= index:
+                    break
+                source = value[index]
+                target = target[key][0]
+        else:
+            if leaf_index is None:
+                target[leaf_key] = source.get(leaf_key)
+            elif target.get(leaf_key):
+                # only prepare output if the list field contains data at that index position in record
+                if len(source.get(leaf_key)) > leaf_index:
+                    target[leaf_key].append(source[leaf_key][leaf_index])
+            else:
+                target[leaf_key] = []
+                value = source.get(leaf_key)
+                if value and len(value) > leaf_index:
+                    target[leaf_key].append(value[leaf_index])
+
+    return output
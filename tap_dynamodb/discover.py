@@ -22,6 +22,8 @@ def discover_table_schema(client, table_name):
     mdata = metadata.write(mdata, (), 'table-key-properties', key_props)
     if table_info.get('ItemCount'):
         mdata = metadata.write(mdata, (), 'row-count', table_info['ItemCount'])
+    if table_info.get('TableSizeBytes'):
+        mdata = metadata.write(mdata, (), 'table-size-bytes', table_info['TableSizeBytes'])
 
     return {
         'table_name': table_name,
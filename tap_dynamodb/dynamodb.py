@@ -1,4 +1,5 @@
 import json
+import threading
 import backoff
 import boto3
 import singer
@@ -16,6 +17,13 @@ from botocore.exceptions import ClientError, ConnectTimeoutError, ReadTimeoutErr
 
 LOGGER = singer.get_logger()
 REQUEST_TIMEOUT = 300
+MAX_POOL_CONNECTIONS = 50
+
+# Clients are cached for the whole run, keyed by service, region, endpoint and
+# connection settings, so every caller (including the parallel workers) shares
+# the same warm HTTP connection pool
+_CLIENTS_LOCK = threading.Lock()
+_CLIENTS = {}
 
 def retry_pattern():
     '''
@@ -77,6 +85,7 @@ def setup_aws_client(config):
 
     LOGGER.info("Attempting to assume_role on RoleArn: %s", role_arn)
     boto3.setup_default_session(botocore_session=refreshable_session)
+    clear_client_cache()
 
 
 @retry_pattern()
@@ -127,6 +136,7 @@ def setup_aws_client_with_proxy(config):
 
     LOGGER.info("Attempting to assume_role on RoleArn: %s", cust_role_arn)
     boto3.setup_default_session(botocore_session=refreshable_session_cust)
+    clear_client_cache()
 
 def get_request_timeout(config):
     # if request_timeout is other than 0,"0" or "" then use request_timeout
@@ -137,42 +147,89 @@ def get_request_timeout(config):
         request_timeout = REQUEST_TIMEOUT
     return request_timeout
 
-def get_client(config):
+def get_max_pool_connections(config):
+    # if max_pool_connections is other than 0,"0" or "" then use max_pool_connections
+    max_pool_connections = config.get('max_pool_connections')
+    if max_pool_connections and int(max_pool_connections):
+        return int(max_pool_connections)
+    return MAX_POOL_CONNECTIONS
+
+def get_tcp_keepalive(config):
+    # TCP keepalive is enabled unless it is disabled in the config
+    tcp_keepalive = config.get('tcp_keepalive')
+    if isinstance(tcp_keepalive, str):
+        return tcp_keepalive.lower() not in ('false', '0', '')
+    return tcp_keepalive is None or bool(tcp_keepalive)
+
+def get_retry_mode(config):
+    # without retry_mode the retry mode of botocore, from the environment or
+    # the AWS config file, is kept
+    retry_mode = config.get('retry_mode') or None
+    if retry_mode is not None and retry_mode not in ('legacy', 'standard', 'adaptive'):
+        raise Exception("Invalid retry_mode: {}. It should be one of legacy, standard or adaptive.".format(retry_mode))
+    return retry_mode
+
+def create_client(service_name, config):
     """
-    Client for FULL_TABLE and running discover mode.
+    Create a client of the service with the connection settings from the config.
     """
     # get the request_timeout
     request_timeout = get_request_timeout(config)
+    connection_settings = {'max_pool_connections': get_max_pool_connections(config),
+                           'tcp_keepalive': get_tcp_keepalive(config)}
+    retry_mode = get_retry_mode(config)
+    if retry_mode is not None:
+        connection_settings['retries'] = {'mode': retry_mode}
+    connection_config = Config(**connection_settings)
     # add the request_timeout in both connect_timeout as well as read_timeout
     timeout_config = Config(connect_timeout=request_timeout, read_timeout=request_timeout)
+    client_config = timeout_config.merge(connection_config)
     if config.get('use_local_dynamo'):
-        return boto3.client('dynamodb',
+        return boto3.client(service_name,
                             endpoint_url='http://localhost:8000',
                             region_name=config['region_name'],
-                            config=timeout_config   # pass the config to add the request_timeout
+                            config=client_config   # pass the config to add the request_timeout
                             )
-    return boto3.client('dynamodb', config['region_name'],
-                        config=timeout_config   # pass the config to add the request_timeout
+    return boto3.client(service_name,
+                        region_name=config['region_name'],
+                        config=client_config   # pass the config to add the request_timeout
                         )
 
+def get_cached_client(service_name, config):
+    """
+    Return the client of the service shared by the whole run, creating it on first use.
+    """
+    key = (service_name,
+           config['region_name'],
+           bool(config.get('use_local_dynamo')),
+           get_request_timeout(config),
+           get_max_pool_connections(config),
+           get_tcp_keepalive(config),
+           get_retry_mode(config))
+    # boto3 clients are thread safe but creating them from the default session is not
+    with _CLIENTS_LOCK:
+        if key not in _CLIENTS:
+            _CLIENTS[key] = create_client(service_name, config)
+        return _CLIENTS[key]
+
+def clear_client_cache():
+    """
+    Forget the cached clients, e.g. after the default session has changed.
+    """
+    with _CLIENTS_LOCK:
+        _CLIENTS.clear()
+
+def get_client(config):
+    """
+    Client for FULL_TABLE and running discover mode.
+    """
+    return get_cached_client('dynamodb', config)
+
 def get_stream_client(config):
     """
     Streams client for the LOG_BASED sync.
     """
-    # get the request_timeout
-    request_timeout = get_request_timeout(config)
-    # add the request_timeout in both connect_timeout as well as read_timeout
-    timeout_config = Config(connect_timeout=request_timeout,  read_timeout=request_timeout)
-    if config.get('use_local_dynamo'):
-        return boto3.client('dynamodbstreams',
-                            endpoint_url='http://localhost:8000',
-                            region_name=config['region_name'],
-                            config=timeout_config   # pass the config to add the request_timeout
-                            )
-    return boto3.client('dynamodbstreams',
-                        region_name=config['region_name'],
-                        config=timeout_config   # pass the config to add the request_timeout
-                        )
+    return get_cached_client('dynamodbstreams', config)
 
 def decode_expression(expression):
     '''Convert the string into JSON object and raise an exception if invalid JSON format'''
@@ -0,0 +1,92 @@
+import decimal
+
+import simplejson
+import singer
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+LOGGER = singer.get_logger()
+
+JSON_ENCODERS = ('simplejson', 'orjson')
+
+
+class RecordEncoder():
+    '''
+    Encodes RECORD messages straight to bytes.
+
+    The records produced by `Deserializer` only hold str, int, Decimal, bool,
+    None, lists and dicts (binary values are base64 strings), so they never
+    need the generic message handling of singer-python. The envelope around
+    the record only depends on the stream and version and is encoded once.
+
+    The output is byte-identical to `singer.format_message`.
+    '''
+
+    def __init__(self):
+        # Same settings as the encoder used by `singer.format_message`
+        self._json_encoder = simplejson.JSONEncoder(use_decimal=True, allow_nan=False)
+        self._envelopes = {}
+
+    def get_envelope(self, stream_name, version):
+        '''
+        Return the encoded bytes before and after the record of a message
+        '''
+        key = (stream_name, version)
+        if key not in self._envelopes:
+            prefix = '{"type": "RECORD", "stream": ' + self._json_encoder.encode(stream_name) + ', "record": '
+            if version is None:
+                suffix = '}'
+            else:
+                suffix = ', "version": ' + self._json_encoder.encode(version) + '}'
+            self._envelopes[key] = (prefix.encode('utf-8'), suffix.encode('utf-8'))
+        return self._envelopes[key]
+
+    def encode_record(self, stream_name, record, version=None):
+        prefix, suffix = self.get_envelope(stream_name, version)
+        # ensure_ascii makes the encoded record pure ASCII
+        return prefix + self._json_encoder.encode(record).encode('ascii') + suffix
+
+
+def encode_decimal(value):
+    '''
+    Encode Decimals as JSON numbers with the exact digits of the Decimal
+    '''
+    if isinstance(value, decimal.Decimal):
+        return orjson.Fragment(str(value))
+    raise TypeError('Object of type {} is not JSON serializable'.format(type(value).__name__))
+
+
+class OrjsonRecordEncoder():
+    '''
+    Encodes RECORD messages with orjson. The output is equivalent JSON, but
+    not byte-identical to `singer.format_message`: it has no whitespace
+    between the tokens and non ASCII characters are not escaped.
+    '''
+
+    def encode_record(self, stream_name, record, version=None):
+        message = {'type': 'RECORD', 'stream': stream_name, 'record': record}
+        if version is not None:
+            message['version'] = version
+        return orjson.dumps(message, default=encode_decimal)
+
+
+def get_record_encoder(config):
+    '''
+    Return the record encoder selected with the `json_encoder` config,
+    `simplejson` by default. `orjson` requires orjson 3.9 or later to be
+    installed, otherwise the default encoder is used.
+    '''
+    json_encoder = config.get('json_encoder') or 'simplejson'
+    if json_encoder not in JSON_ENCODERS:
+        raise Exception("Invalid json_encoder: {}. It should be one of {}.".format(json_encoder, ', '.join(JSON_ENCODERS)))
+
+    if json_encoder == 'orjson':
+        # orjson.Fragment, needed to encode Decimals as numbers, was added in orjson 3.9
+        if orjson is not None and hasattr(orjson, 'Fragment'):
+            return OrjsonRecordEncoder()
+        LOGGER.warning('orjson 3.9 or later is not installed, falling back to the simplejson encoder')
+
+    return RecordEncoder()
@@ -0,0 +1,220 @@
+import contextlib
+import copy
+import sys
+import threading
+import time
+
+import singer
+from tap_dynamodb import encoder
+from tap_dynamodb.config import get_number
+
+# Messages are buffered and written to stdout once the buffer holds this many
+# bytes or the oldest buffered message is older than FLUSH_INTERVAL seconds
+BUFFER_SIZE = 1024 * 1024
+FLUSH_INTERVAL = 1.0
+
+
+class MessageWriter():
+    '''
+    Writes Singer messages to stdout through a reusable buffer, instead of
+    one write and flush per message like `singer.write_message`.
+
+    Every message is appended to the same buffer in the order it was written,
+    so a STATE message is always written after the records it covers. The
+    buffer is guarded by a lock, so streams synced on concurrent worker
+    threads never interleave within a message.
+    '''
+
+    def __init__(self, buffer_size=BUFFER_SIZE, flush_interval=FLUSH_INTERVAL, clock=time.monotonic):
+        self.buffer_size = buffer_size
+        self.flush_interval = flush_interval
+        self.buffer = bytearray()
+        self.record_encoder = encoder.RecordEncoder()
+        self._clock = clock
+        self._flushed_at = clock()
+        self._lock = threading.Lock()
+
+    def write_line(self, line):
+        '''
+        Buffer an encoded message, flushing if a threshold is reached
+        '''
+        with self._lock:
+            if not self.buffer:
+                self._flushed_at = self._clock()
+            self.buffer += line
+            self.buffer += b'\n'
+            self._flush_if_due()
+
+    def write_lines(self, lines):
+        '''
+        Buffer a block of encoded, newline terminated messages
+        '''
+        with self._lock:
+            if not self.buffer:
+                self._flushed_at = self._clock()
+            self.buffer += lines
+            self._flush_if_due()
+
+    def flush_if_due(self):
+        with self._lock:
+            self._flush_if_due()
+
+    def _flush_if_due(self):
+        if len(self.buffer) >= self.buffer_size or self._clock() - self._flushed_at >= self.flush_interval:
+            self._flush()
+
+    def write_message(self, message):
+        self.write_line(singer.format_message(message).encode('utf-8'))
+
+    def write_record(self, stream_name, record, version=None):
+        self.write_line(self.record_encoder.encode_record(stream_name, record, version))
+
+    def flush(self):
+        '''
+        Write the buffered messages to stdout
+        '''
+        with self._lock:
+            self._flush()
+
+    def _flush(self):
+        if not self.buffer:
+            return
+
+        # stdout is looked up on every flush because it may be replaced,
+        # and anything written to it as text must come first
+        stdout = sys.stdout
+        stdout.flush()
+        if hasattr(stdout, 'buffer'):
+            stdout.buffer.write(self.buffer)
+            stdout.buffer.flush()
+        else:
+            stdout.write(self.buffer.decode('utf-8'))
+            stdout.flush()
+        # clearing keeps the memory allocated for the next messages
+        self.buffer.clear()
+
+
+WRITER = MessageWriter()
+
+# The StateMerger and the stream of the current worker thread, see `merging_state`
+_LOCAL = threading.local()
+
+
+class StateMerger():
+    '''
+    Merges the state of streams synced concurrently into the state of the run.
+
+    Every stream is synced on its own worker thread with a state of its own,
+    holding only its bookmarks, so no thread reads the bookmarks another one
+    is updating. When a stream writes its state, a copy of its bookmarks is
+    merged into the state of the run, which is written as a whole. The state
+    of the run always holds the bookmarks of every stream and names the
+    stream which wrote it last as `currently_syncing`.
+
+    Once `stop` is called, the next state a stream writes raises an
+    exception instead, which ends its sync.
+    '''
+
+    def __init__(self, state):
+        self.state = state
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+
+    def stop(self):
+        self._stopped.set()
+
+    def get_stream_state(self, stream_name):
+        '''
+        Returns a state holding a copy of the bookmarks of the stream
+        '''
+        with self._lock:
+            stream_state = {'bookmarks': {}}
+            bookmarks = self.state.get('bookmarks', {}).get(stream_name)
+            if bookmarks is not None:
+                stream_state['bookmarks'][stream_name] = copy.deepcopy(bookmarks)
+            return stream_state
+
+    def write_state(self, stream_name, value):
+        if self._stopped.is_set():
+            raise Exception("Stopped syncing {} as another stream failed".format(stream_name))
+        with self._lock:
+            bookmarks = value.get('bookmarks', {}).get(stream_name)
+            if bookmarks is None:
+                self.state.get('bookmarks', {}).pop(stream_name, None)
+            else:
+                self.state.setdefault('bookmarks', {})[stream_name] = copy.deepcopy(bookmarks)
+            if value.get('currently_syncing') is not None:
+                self.state['currently_syncing'] = value['currently_syncing']
+            # the state is written while it is locked, so the state messages
+            # are written in the order they were merged
+            write_message(singer.StateMessage(value=self.state))
+
+
+@contextlib.contextmanager
+def merging_state(merger, stream_name):
+    '''
+    Merge the states written on the current thread into the state of the run
+    with `merger`, as the state of `stream_name`
+    '''
+    _LOCAL.state_merge = (merger, stream_name)
+    try:
+        yield
+    finally:
+        _LOCAL.state_merge = None
+
+
+def get_buffer_size(config):
+    # 0 writes every message as soon as it is written
+    return get_number(config.get('output_buffer_size'), 'output_buffer_size', BUFFER_SIZE)
+
+
+def get_flush_interval(config):
+    return get_number(config.get('output_flush_interval'), 'output_flush_interval', FLUSH_INTERVAL, float)
+
+
+def configure(config):
+    '''
+    Set the flush thresholds and the record encoder of the writer from the config
+    '''
+    WRITER.flush()
+    WRITER.buffer_size = get_buffer_size(config)
+    WRITER.flush_interval = get_flush_interval(config)
+    WRITER.record_encoder = encoder.get_record_encoder(config)
+
+
+def write_message(message):
+    WRITER.write_message(message)
+
+
+def write_record(stream_name, record, version=None):
+    WRITER.write_record(stream_name, record, version)
+
+
+def write_lines(lines):
+    WRITER.write_lines(lines)
+
+
+def write_schema(stream_name, schema, key_properties):
+    if isinstance(key_properties, (str, bytes)):
+        key_properties = [key_properties]
+    if not isinstance(key_properties, list):
+        raise Exception("key_properties must be a string or list of strings")
+
+    write_message(singer.SchemaMessage(stream=stream_name, schema=schema, key_properties=key_properties))
+
+
+def write_state(value):
+    state_merge = getattr(_LOCAL, 'state_merge', None)
+    if state_merge is not None:
+        merger, stream_name = state_merge
+        merger.write_state(stream_name, value)
+        return
+    write_message(singer.StateMessage(value=value))
+
+
+def write_version(stream_name, version):
+    write_message(singer.ActivateVersionMessage(stream_name, version))
+
+
+def flush():
+    WRITER.flush()
@@ -0,0 +1,101 @@
+import contextlib
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import singer
+
+LOGGER = singer.get_logger()
+
+# Marker yielded for a task once its iterable is exhausted
+DONE = object()
+
+# How long a worker waits on a full queue before checking if it should stop
+QUEUE_POLL_SECONDS = 1
+
+
+def iterate_in_parallel(tasks, max_workers, queue_size=None, parents=None):
+    '''
+    Run every task on a pool of worker threads and yield `(task_id, page)`
+    on the calling thread as the pages are produced.
+
+    `tasks` is a list of `(task_id, task)` tuples where `task` is a callable
+    returning an iterable of pages. Once a task is exhausted `(task_id, DONE)`
+    is yielded. Pages are handed over through a bounded queue, so writing
+    messages and bookmarks stays on the calling thread. An exception raised by
+    a task stops the remaining workers and is re-raised on the calling thread.
+
+    `parents` optionally maps a task id to the id of a parent task. A task is
+    only started once `(parent_id, DONE)` has been consumed, so all the pages
+    of the parent are handled before the first page of the child. Parents
+    which are not in `tasks` are considered done.
+    '''
+    if not tasks:
+        return
+
+    results = queue.Queue(maxsize=queue_size or max_workers * 2)
+    stop = threading.Event()
+
+    def put(item):
+        while not stop.is_set():
+            try:
+                results.put(item, timeout=QUEUE_POLL_SECONDS)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def run(task_id, task):
+        try:
+            for page in task():
+                if not put((task_id, page, None)):
+                    return
+            put((task_id, DONE, None))
+        except Exception as ex:
+            put((task_id, None, ex))
+
+    task_ids = {task_id for task_id, _ in tasks}
+    # the tasks waiting on their parent, by parent id
+    children = {}
+
+    executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='tap-dynamodb')
+    try:
+        for task_id, task in tasks:
+            parent_id = parents.get(task_id) if parents else None
+            if parent_id is not None and parent_id in task_ids:
+                children.setdefault(parent_id, []).append((task_id, task))
+            else:
+                executor.submit(run, task_id, task)
+
+        remaining = len(tasks)
+        while remaining:
+            task_id, page, ex = results.get()
+            if ex is not None:
+                raise ex
+            if page is DONE:
+                remaining -= 1
+            yield task_id, page
+            if page is DONE:
+                for child_id, child in children.pop(task_id, []):
+                    executor.submit(run, child_id, child)
+    finally:
+        stop.set()
+        executor.shutdown(wait=True, cancel_futures=True)
+
+
+def prefetch(iterable, depth):
+    '''
+    Iterate over `iterable` on a background thread, keeping at most `depth`
+    items fetched ahead of the caller in a bounded queue. This overlaps the
+    network calls producing the items with the processing of the previous
+    ones. A `depth` lower than 1 disables the prefetching.
+    '''
+    if depth < 1:
+        yield from iterable
+        return
+
+    with contextlib.closing(iterate_in_parallel([(None, lambda: iterable)], 1, queue_size=depth)) as items:
+        for _, item in items:
+            if item is DONE:
+                return
+            yield item
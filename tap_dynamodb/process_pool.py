@@ -0,0 +1,118 @@
+import collections
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+import singer
+from tap_dynamodb import encoder, output, parallel
+from tap_dynamodb.config import get_number
+from tap_dynamodb.deserialize import Deserializer
+
+LOGGER = singer.get_logger()
+
+# Pages submitted to the pool ahead of the page being written, per worker
+PENDING_PAGES_PER_WORKER = 2
+
+# The pool shared by the whole run and its worker count, see `start`
+POOL = {'executor': None, 'workers': 0}
+
+# The deserializers and record encoders of a worker process, by number mode
+# and json_encoder
+_WORKER_CODECS = {}
+
+
+def get_decode_workers(config):
+    '''
+    Return the number of worker processes deserializing and encoding the
+    scanned items, configured through `decode_workers`. 0 disables the pool
+    '''
+    return get_number(config.get('decode_workers'), 'decode_workers', 0)
+
+
+def start(config):
+    '''
+    Start the pool of worker processes for the run if `decode_workers` is set
+    '''
+    workers = get_decode_workers(config)
+    if workers == 0 or POOL['executor'] is not None:
+        return
+
+    LOGGER.info('Starting %s decode worker processes', workers)
+    # the worker processes are spawned because forking a process running
+    # boto3 and fetch threads is not safe
+    POOL['executor'] = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn'))
+    POOL['workers'] = workers
+
+
+def get_pool():
+    '''
+    Return the pool of worker processes, or None if it is not started
+    '''
+    return POOL['executor']
+
+
+def shutdown():
+    if POOL['executor'] is not None:
+        POOL['executor'].shutdown(wait=True, cancel_futures=True)
+    POOL['executor'] = None
+    POOL['workers'] = 0
+
+
+def get_codecs(number_mode, json_encoder):
+    key = (number_mode, json_encoder)
+    if key not in _WORKER_CODECS:
+        _WORKER_CODECS[key] = (Deserializer(number_mode=number_mode),
+                               encoder.get_record_encoder({'json_encoder': json_encoder}))
+    return _WORKER_CODECS[key]
+
+
+def encode_page(table_name, stream_version, number_mode, json_encoder, items):
+    '''
+    Deserialize the items of a page and encode them as RECORD messages.
+    Runs in a worker process and returns the newline terminated messages
+    and their count.
+    '''
+    deserializer, record_encoder = get_codecs(number_mode, json_encoder)
+    lines = []
+    for item in items:
+        lines.append(record_encoder.encode_record(table_name, deserializer.deserialize_item(item), stream_version))
+        lines.append(b'\n')
+    return b''.join(lines), len(items)
+
+
+def write_pages(pages, table_name, stream_version, number_mode, json_encoder):
+    '''
+    Write the items of the `(key, result)` scan pages, deserialized and
+    encoded on the pool, and yield `(key, result, rows_saved)` in page order
+    once the records of a page are written. `parallel.DONE` results are
+    passed through in order.
+    '''
+    pending = collections.deque()
+    max_pending = POOL['workers'] * PENDING_PAGES_PER_WORKER
+
+    def write_next():
+        key, result, future = pending.popleft()
+        if future is None:
+            return key, result, 0
+        lines, rows_saved = future.result()
+        if lines:
+            output.write_lines(lines)
+        return key, result, rows_saved
+
+    try:
+        for key, result in pages:
+            future = None
+            if result is not parallel.DONE:
+                future = POOL['executor'].submit(encode_page, table_name, stream_version, number_mode, json_encoder,
+                                      result.get('Items', []))
+            pending.append((key, result, future))
+
+            # write the pages which are ready without waiting on the others
+            while pending and (len(pending) > max_pending or pending[0][2] is None or pending[0][2].done()):
+                yield write_next()
+
+        while pending:
+            yield write_next()
+    finally:
+        for _, _, future in pending:
+            if future is not None:
+                future.cancel()
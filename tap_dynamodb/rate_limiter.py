@@ -0,0 +1,294 @@
+import collections
+import threading
+import time
+
+import singer
+import singer.metrics
+from tap_dynamodb import dynamodb
+from tap_dynamodb.config import get_number
+
+LOGGER = singer.get_logger()
+
+# DynamoDB Streams serves up to 5 GetRecords calls per second per shard
+SHARD_REQUESTS_PER_SECOND = 5
+
+# Debt small enough to be a rounding error of the refill, in tokens
+ROUNDING_TOLERANCE = 1e-9
+
+# Error codes of the requests rejected because of throttling
+THROTTLING_ERROR_CODES = {'LimitExceededException', 'ProvisionedThroughputExceededException',
+                          'RequestLimitExceeded', 'ThrottlingException'}
+
+# Read capacity limiters are shared by every segment and stream of the
+# process. The tap wide limiter is stored under the `None` key and the table
+# limiters under the table name
+_LIMITERS_LOCK = threading.Lock()
+_LIMITERS = {}
+
+# The throttled attempts of the Streams call in progress on the current thread
+_LOCAL = threading.local()
+
+
+class TokenBucket():
+    '''
+    Token bucket refilled at `rate` tokens per second up to `capacity`.
+
+    The cost of a DynamoDB read is only known once the response returns its
+    consumed capacity, so callers `acquire()` before a request and `consume()`
+    the actual cost afterwards. The bucket is allowed to go into debt, and
+    `acquire()` blocks until the debt has been paid back.
+    '''
+
+    def __init__(self, rate, capacity=None, clock=time.monotonic, sleep=time.sleep):
+        self.rate = float(rate)
+        self.capacity = float(capacity) if capacity else self.rate
+        self.tokens = self.capacity
+        self._clock = clock
+        self._sleep = sleep
+        self._updated_at = clock()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = self._clock()
+        self.tokens = min(self.capacity, self.tokens + (now - self._updated_at) * self.rate)
+        self._updated_at = now
+
+    def acquire(self):
+        while True:
+            with self._lock:
+                self._refill()
+                # the refill after waiting out the debt may fall short of 0
+                # by a rounding error
+                if self.tokens >= -ROUNDING_TOLERANCE:
+                    return
+                wait = -self.tokens / self.rate
+            self._sleep(wait)
+
+    def consume(self, units):
+        with self._lock:
+            self._refill()
+            self.tokens -= units
+
+
+class ReadCapacityLimiter():
+    '''
+    Paces reads against every bucket which applies to a table
+    '''
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+
+    def acquire(self):
+        for bucket in self.buckets:
+            bucket.acquire()
+
+    def consume(self, response):
+        units = get_consumed_capacity(response)
+        if units:
+            for bucket in self.buckets:
+                bucket.consume(units)
+
+
+def get_consumed_capacity(response):
+    '''
+    Return the read capacity units consumed by a request made with
+    `ReturnConsumedCapacity` set to `TOTAL`
+    '''
+    consumed_capacity = response.get('ConsumedCapacity') or {}
+    return consumed_capacity.get('CapacityUnits', 0)
+
+
+def get_float_config(config, key):
+    '''
+    Return the float value of the config `key` or None if it is not set,
+    raising an exception if it is not a positive number
+    '''
+    return get_number(config.get(key), key, convert=float, exclusive_minimum=True)
+
+
+def get_provisioned_read_capacity(client, table_name):
+    '''
+    Return the provisioned read capacity units of the table, or None for
+    on-demand tables
+    '''
+    table = client.describe_table(TableName=table_name)['Table']
+    if table.get('BillingModeSummary', {}).get('BillingMode') == 'PAY_PER_REQUEST':
+        return None
+    return table.get('ProvisionedThroughput', {}).get('ReadCapacityUnits') or None
+
+
+def get_read_limiter(config, table_name):
+    '''
+    Return the limiter pacing the reads of the table, or None if no read
+    capacity budget is configured.
+
+    `read_capacity_units_per_second` caps the reads of the whole tap to an
+    absolute budget, which is the only option for on-demand tables.
+    `read_capacity_fraction` caps the reads of a table to a fraction of its
+    provisioned read capacity units.
+    '''
+    units_per_second = get_float_config(config, 'read_capacity_units_per_second')
+    fraction = get_float_config(config, 'read_capacity_fraction')
+    if fraction is not None and fraction > 1:
+        raise Exception("Invalid read_capacity_fraction: {}. It should not be greater than 1.".format(fraction))
+
+    buckets = []
+    with _LIMITERS_LOCK:
+        if units_per_second is not None:
+            if None not in _LIMITERS:
+                LOGGER.info('Limiting reads to %s read capacity units per second', units_per_second)
+                _LIMITERS[None] = TokenBucket(units_per_second)
+            buckets.append(_LIMITERS[None])
+
+        if fraction is not None:
+            if table_name not in _LIMITERS:
+                provisioned = get_provisioned_read_capacity(dynamodb.get_client(config), table_name)
+                if provisioned is None:
+                    LOGGER.info('Table %s has no provisioned read capacity, read_capacity_fraction does not apply', table_name)
+                    _LIMITERS[table_name] = None
+                else:
+                    LOGGER.info('Limiting reads of table %s to %s of %s provisioned read capacity units',
+                                table_name, fraction, provisioned)
+                    _LIMITERS[table_name] = TokenBucket(provisioned * fraction)
+            if _LIMITERS[table_name] is not None:
+                buckets.append(_LIMITERS[table_name])
+
+    if not buckets:
+        return None
+    return ReadCapacityLimiter(buckets)
+
+
+def reset_read_limiters():
+    '''
+    Forget the shared limiters, so the next call to `get_read_limiter()`
+    creates them from the config again
+    '''
+    with _LIMITERS_LOCK:
+        _LIMITERS.clear()
+
+
+class StreamsGovernor():
+    '''
+    Paces the `get_records` and `get_shard_iterator` calls made on DynamoDB
+    Streams, per shard and optionally per stream, across every table and
+    worker of the process.
+
+    Throttled requests are retried by botocore, so every attempt rejected
+    with a throttling error is counted from the `needs-retry` event of the
+    client, including the last one of a request which ran out of retries.
+    Attempts failing for other reasons, e.g. server errors or timeouts, are
+    not counted. A throttled shard is held back for a second.
+    '''
+
+    def __init__(self, shard_rate, stream_rate=None, clock=time.monotonic, sleep=time.sleep):
+        self._clock = clock
+        self._sleep = sleep
+        self._lock = threading.Lock()
+        self.configure(shard_rate, stream_rate)
+
+    def configure(self, shard_rate, stream_rate=None):
+        '''
+        Use the given budgets from now on, forgetting the buckets and the
+        throttle counts
+        '''
+        with self._lock:
+            self.shard_rate = shard_rate
+            self.stream_rate = stream_rate
+            self._buckets = {}
+            self.throttles = collections.Counter()
+
+    def get_bucket(self, key, rate):
+        with self._lock:
+            if key not in self._buckets:
+                self._buckets[key] = TokenBucket(rate, clock=self._clock, sleep=self._sleep)
+            return self._buckets[key]
+
+    def get_buckets(self, stream_arn, shard_id):
+        buckets = [self.get_bucket((stream_arn, shard_id), self.shard_rate)]
+        if self.stream_rate:
+            buckets.append(self.get_bucket((stream_arn, None), self.stream_rate))
+        return buckets
+
+    def call(self, stream_arn, shard_id, method, **params):
+        '''
+        Call the client `method` with `params` once the shard and stream
+        have the budget for another request
+        '''
+        buckets = self.get_buckets(stream_arn, shard_id)
+        # the request is reserved first, so the budget is never exceeded by
+        # the requests waiting on it
+        for bucket in buckets:
+            bucket.consume(1)
+            bucket.acquire()
+
+        client = getattr(method, '__self__', None)
+        if hasattr(client, 'meta'):
+            register(client)
+
+        _LOCAL.throttles = 0
+        try:
+            return method(**params)
+        finally:
+            if _LOCAL.throttles:
+                self.record_throttles(stream_arn, method.__name__, _LOCAL.throttles, buckets[0])
+            _LOCAL.throttles = None
+
+    def record_throttles(self, stream_arn, operation, count, shard_bucket):
+        with self._lock:
+            self.throttles[(stream_arn, operation)] += count
+        shard_bucket.consume(self.shard_rate)
+
+    def log_throttles(self, stream_arn, table_name):
+        '''
+        Publish the throttled requests of the stream as metrics
+        '''
+        for operation in ('get_shard_iterator', 'get_records'):
+            with self._lock:
+                count = self.throttles[(stream_arn, operation)]
+            singer.metrics.log(LOGGER, singer.metrics.Point('counter', 'throttled_requests', count,
+                                                            {'table': table_name, 'operation': operation}))
+
+
+def count_throttled_attempt(response=None, **_kwargs):
+    '''
+    Count an attempt of the Streams call in progress on the current thread
+    if it was rejected with a throttling error
+    '''
+    if response is None or getattr(_LOCAL, 'throttles', None) is None:
+        return
+    if response[1].get('Error', {}).get('Code') in THROTTLING_ERROR_CODES:
+        _LOCAL.throttles += 1
+
+
+def register(client):
+    '''
+    Register the throttle counting handler on a DynamoDB Streams client.
+    Registering it again is a no-op.
+    '''
+    client.meta.events.register('needs-retry.dynamodb-streams', count_throttled_attempt,
+                                unique_id='tap-dynamodb-count-throttles')
+
+
+def get_streams_governor_config(config):
+    shard_rate = get_float_config(config, 'shard_requests_per_second') or SHARD_REQUESTS_PER_SECOND
+    stream_rate = get_float_config(config, 'stream_requests_per_second')
+    return shard_rate, stream_rate
+
+
+def configure_streams_governor(config):
+    '''
+    Configure the governor of the process with the budgets of the config
+    '''
+    shard_rate, stream_rate = get_streams_governor_config(config)
+    if stream_rate:
+        LOGGER.info('Limiting DynamoDB Streams requests to %s per second per shard and %s per second per stream',
+                    shard_rate, stream_rate)
+    STREAMS_GOVERNOR.configure(shard_rate, stream_rate)
+
+
+def call_streams(stream_arn, shard_id, method, **params):
+    return STREAMS_GOVERNOR.call(stream_arn, shard_id, method, **params)
+
+
+# The governor shared by every stream of the process, see `configure_streams_governor`
+STREAMS_GOVERNOR = StreamsGovernor(SHARD_REQUESTS_PER_SECOND)
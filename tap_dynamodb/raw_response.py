@@ -0,0 +1,117 @@
+import contextlib
+import json
+import threading
+
+from botocore.parsers import DEFAULT_TIMESTAMP_PARSER
+
+try:
+    import orjson
+    loads = orjson.loads
+except ImportError:
+    loads = json.loads
+
+# The Deserializer decoding the responses of the calls made on the current thread
+_LOCAL = threading.local()
+
+# Images of a stream record holding typed attribute values
+STREAM_IMAGES = ('Keys', 'NewImage', 'OldImage')
+
+
+def get_raw_response_decoding(config):
+    # Raw response decoding is disabled unless it is enabled in the config
+    raw_response_decoding = config.get('raw_response_decoding')
+    if isinstance(raw_response_decoding, str):
+        return raw_response_decoding.lower() not in ('false', '0', '')
+    return bool(raw_response_decoding)
+
+
+def register(client):
+    '''
+    Register the raw response decoding handlers on a DynamoDB or DynamoDB
+    Streams client. The handlers only decode the responses of calls made
+    within `decoding`, so registering them on a shared client is harmless.
+    '''
+    events = client.meta.events
+    events.register('before-parse.dynamodb.Scan', decode_scan,
+                    unique_id='tap-dynamodb-decode-scan')
+    events.register('before-parse.dynamodb-streams.GetRecords', decode_get_records,
+                    unique_id='tap-dynamodb-decode-get-records')
+
+
+def get_decoder(config, deserializer):
+    '''
+    Return the deserializer to decode the raw responses with, or None if
+    `raw_response_decoding` is not enabled in the config
+    '''
+    if not get_raw_response_decoding(config):
+        return None
+    return deserializer
+
+
+@contextlib.contextmanager
+def decoding(deserializer):
+    '''
+    Decode the responses of the calls made on the current thread with
+    `deserializer`. None leaves the responses to botocore.
+    '''
+    previous = getattr(_LOCAL, 'deserializer', None)
+    _LOCAL.deserializer = deserializer
+    try:
+        yield
+    finally:
+        _LOCAL.deserializer = previous
+
+
+def pop_body(response_dict, key):
+    '''
+    Return the deserializer of the current thread and the value of `key`
+    popped from the JSON body of a successful response, leaving the rest of
+    the body to the botocore parser. Returns None if there is nothing to
+    decode.
+    '''
+    deserializer = getattr(_LOCAL, 'deserializer', None)
+    if deserializer is None or response_dict['status_code'] != 200:
+        return None
+
+    body = loads(response_dict['body'])
+    values = body.pop(key, None)
+    if values is None:
+        return None
+
+    # only the small control fields are left for botocore to parse
+    response_dict['body'] = json.dumps(body).encode('utf-8')
+    return deserializer, values
+
+
+def decode_scan(response_dict, customized_response_dict, **_kwargs):
+    '''
+    Deserialize the `Items` of a scan response straight from the JSON body.
+    `LastEvaluatedKey` and the other fields are parsed by botocore.
+    '''
+    popped = pop_body(response_dict, 'Items')
+    if popped is None:
+        return
+    deserializer, items = popped
+    customized_response_dict['Items'] = [deserializer.deserialize_raw_item(item) for item in items]
+
+
+def decode_get_records(response_dict, customized_response_dict, **_kwargs):
+    '''
+    Deserialize the images of the `Records` of a get_records response
+    straight from the JSON body. `NextShardIterator` is parsed by botocore.
+    '''
+    popped = pop_body(response_dict, 'Records')
+    if popped is None:
+        return
+    deserializer, records = popped
+    for record in records:
+        stream_record = record.get('dynamodb')
+        if not stream_record:
+            continue
+        for image in STREAM_IMAGES:
+            if image in stream_record:
+                stream_record[image] = deserializer.deserialize_raw_item(stream_record[image])
+        if 'ApproximateCreationDateTime' in stream_record:
+            stream_record['ApproximateCreationDateTime'] = DEFAULT_TIMESTAMP_PARSER(
+                stream_record['ApproximateCreationDateTime'])
+    customized_response_dict['Records'] = records
@@ -0,0 +1,86 @@
+import singer
+from singer import metadata
+from tap_dynamodb.config import get_number
+
+LOGGER = singer.get_logger()
+
+# Throughputs used to estimate the sync time of a stream from its discovered
+# size until the state holds the sync time of a stream of known size
+ROWS_PER_SECOND = 5000.0
+BYTES_PER_SECOND = 5 * 1024 * 1024.0
+
+
+def get_sync_priority(md_map):
+    '''
+    Return the integer value of the `tap-dynamodb.sync-priority` metadata of
+    the stream, 0 if it is not set. Streams with a higher priority are
+    synced first.
+    '''
+    return get_number(metadata.get(md_map, (), 'tap-dynamodb.sync-priority'), 'sync priority', 0, minimum=None)
+
+
+def get_last_sync_seconds(state, stream):
+    return singer.get_bookmark(state, stream['tap_stream_id'], 'sync_seconds')
+
+
+def get_throughput(streams, state, size_key, default):
+    '''
+    Return the amount of `size_key` metadata synced per second by the streams
+    with a recorded sync time, or `default` if there are none
+    '''
+    size = 0
+    seconds = 0
+    for stream in streams:
+        stream_size = metadata.get(metadata.to_map(stream['metadata']), (), size_key)
+        stream_seconds = get_last_sync_seconds(state, stream)
+        if stream_size and stream_seconds:
+            size += stream_size
+            seconds += stream_seconds
+    if not seconds:
+        return default
+    return size / seconds
+
+
+def estimate_sync_seconds(stream, state, rows_per_second, bytes_per_second):
+    '''
+    Estimate how long the stream takes to sync from the sync time recorded
+    in the state, else from its `row-count` or `table-size-bytes` metadata.
+    Tables without any of these are empty when discovered and estimated at 0.
+    '''
+    last_sync_seconds = get_last_sync_seconds(state, stream)
+    if last_sync_seconds is not None:
+        return last_sync_seconds
+
+    md_map = metadata.to_map(stream['metadata'])
+    row_count = metadata.get(md_map, (), 'row-count')
+    if row_count:
+        return row_count / rows_per_second
+    table_size = metadata.get(md_map, (), 'table-size-bytes')
+    if table_size:
+        return table_size / bytes_per_second
+    return 0
+
+
+def order_streams(streams, state, workers):
+    '''
+    Return the streams in the order they are synced: by descending
+    `tap-dynamodb.sync-priority`, then by their estimated sync time.
+
+    Synced one after another, the shortest streams go first, so the small
+    tables do not wait behind a large one. With several workers, the longest
+    streams are started first and the small ones are synced by the other
+    workers meanwhile, which keeps the large tables from being started last
+    and finishing long after everything else.
+    '''
+    rows_per_second = get_throughput(streams, state, 'row-count', ROWS_PER_SECOND)
+    bytes_per_second = get_throughput(streams, state, 'table-size-bytes', BYTES_PER_SECOND)
+    longest_first = -1 if workers > 1 else 1
+
+    def sort_key(stream):
+        priority = get_sync_priority(metadata.to_map(stream['metadata']))
+        return (-priority, longest_first * estimate_sync_seconds(stream, state, rows_per_second, bytes_per_second))
+
+    # sorting is stable, so streams estimated the same keep the catalog order
+    ordered = sorted(streams, key=sort_key)
+    LOGGER.info("Syncing streams in order: %s", ', '.join(stream['tap_stream_id'] for stream in ordered))
+    return ordered
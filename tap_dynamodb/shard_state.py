@@ -0,0 +1,84 @@
+import os
+
+import singer
+
+# The sequence numbers of the shards are not encoded, the closed shards are
+# decoded with this `EndingSequenceNumber`
+CLOSED_SHARD_SEQUENCE_NUMBER = 'closed'
+
+
+def encode_shard_ids(shard_ids):
+    '''
+    Encode a set of shard IDs as their common prefix and the comma separated
+    rest of the sorted IDs. The IDs of a stream share a long prefix, e.g.
+    `shardId-0000000153...`, so this is much smaller than a JSON list.
+    '''
+    shard_ids = sorted(shard_ids)
+    # a single ID is kept whole, an empty `ids` is no shards
+    prefix = os.path.commonprefix(shard_ids) if len(shard_ids) > 1 else ''
+    return {'prefix': prefix, 'ids': ','.join(shard_id[len(prefix):] for shard_id in shard_ids)}
+
+
+def decode_shard_ids(encoded):
+    '''
+    Decode the shard IDs encoded by `encode_shard_ids`. A list is the format
+    written by earlier versions of the tap and is read as is.
+    '''
+    if not encoded:
+        return set()
+    if isinstance(encoded, list):
+        return set(encoded)
+    if not encoded['ids']:
+        return set()
+    return {encoded['prefix'] + suffix for suffix in encoded['ids'].split(',')}
+
+
+def read_finished_shards(state, table_name):
+    '''
+    Returns the set of fully synced shards of the `finished_shards` bookmark
+    '''
+    return decode_shard_ids(singer.get_bookmark(state, table_name, 'finished_shards'))
+
+
+def write_finished_shards(state, table_name, finished_shards):
+    '''
+    Write the set of fully synced shards to the `finished_shards` bookmark
+    '''
+    return singer.write_bookmark(state, table_name, 'finished_shards', encode_shard_ids(finished_shards))
+
+
+def encode_shards(shards):
+    '''
+    Encode the closed shards of `describe_stream`, in order, as the common
+    prefix of their IDs and the comma separated rest of every ID, followed
+    by `/` and the rest of its `ParentShardId` if it has one. Only what the
+    sync needs is kept, not the sequence numbers of the shards.
+    '''
+    shard_ids = [shard['ShardId'] for shard in shards]
+    shard_ids += [shard['ParentShardId'] for shard in shards if shard.get('ParentShardId')]
+    prefix = os.path.commonprefix(shard_ids) if len(shard_ids) > 1 else ''
+    encoded_shards = []
+    for shard in shards:
+        encoded = shard['ShardId'][len(prefix):]
+        if shard.get('ParentShardId'):
+            encoded += '/' + shard['ParentShardId'][len(prefix):]
+        encoded_shards.append(encoded)
+    return {'prefix': prefix, 'ids': ','.join(encoded_shards)}
+
+
+def decode_shards(encoded):
+    '''
+    Decode the shards encoded by `encode_shards`. They are all closed, which
+    is what their `SequenceNumberRange` tells `tailing.is_open`.
+    '''
+    if not encoded['ids']:
+        return []
+    shards = []
+    for suffixes in encoded['ids'].split(','):
+        shard_id, _, parent_id = suffixes.partition('/')
+        shard = {'ShardId': encoded['prefix'] + shard_id,
+                 'SequenceNumberRange': {'EndingSequenceNumber': CLOSED_SHARD_SEQUENCE_NUMBER}}
+        if parent_id:
+            shard['ParentShardId'] = encoded['prefix'] + parent_id
+        shards.append(shard)
+    return shards
@@ -1,7 +1,11 @@
+import time
+
 from singer import metadata
 import singer
+from tap_dynamodb import output
 from tap_dynamodb.sync_strategies import log_based
 from tap_dynamodb.sync_strategies import full_table
+from tap_dynamodb.sync_strategies import incremental
 
 LOGGER = singer.get_logger()
 
@@ -22,6 +26,7 @@ def clear_state_on_replication_change(stream, state):
     return state
 
 def sync_stream(config, state, stream):
+    start_time = time.time()
     table_name = stream['tap_stream_id']
 
     md_map = metadata.to_map(stream['metadata'])
@@ -32,12 +37,9 @@ def sync_stream(config, state, stream):
     # write state message with currently_syncing bookmark
     state = clear_state_on_replication_change(stream, state)
     state = singer.set_currently_syncing(state, table_name)
-    singer.write_state(state)
+    output.write_state(state)
 
-    singer.write_message(singer.SchemaMessage(
-        stream=table_name,
-        schema=stream['schema'],
-        key_properties=key_properties))
+    output.write_schema(table_name, stream['schema'], key_properties)
 
     rows_saved = 0
     if replication_method == 'FULL_TABLE':
@@ -54,16 +56,27 @@ def sync_stream(config, state, stream):
             msg = 'Must complete full table sync before replicating from dynamodb streams for %s'
             LOGGER.info(msg, table_name)
 
-            state = log_based.get_initial_bookmarks(config, state, table_name)
-            singer.write_state(state)
+            # The shards were bookmarked when the interrupted full table sync
+            # started. Seeding them again would skip the changes made since
+            # to the items which were already synced.
+            if full_table.is_sync_in_progress(state, table_name):
+                LOGGER.info('Resuming the full table sync of %s from the shard bookmarks it started with', table_name)
+            else:
+                state = log_based.get_initial_bookmarks(config, state, table_name)
+                output.write_state(state)
 
             rows_saved += full_table.sync(config, state, stream)
 
         rows_saved += log_based.sync(config, state, stream)
+    elif replication_method == 'INCREMENTAL':
+        LOGGER.info("Syncing incremental for stream: %s", table_name)
+        rows_saved += incremental.sync(config, state, stream)
     else:
         LOGGER.info('Unknown replication method: %s for stream: %s', replication_method, table_name)
 
     state = singer.write_bookmark(state, table_name, 'success_timestamp', singer.utils.strftime(singer.utils.now()))
-    singer.write_state(state)
+    # used to schedule the stream in the next sync, see `scheduler.order_streams`
+    state = singer.write_bookmark(state, table_name, 'sync_seconds', round(time.time() - start_time, 3))
+    output.write_state(state)
 
     return rows_saved
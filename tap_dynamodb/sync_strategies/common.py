@@ -0,0 +1,42 @@
+from singer import metadata
+from tap_dynamodb import output, parallel, process_pool
+from tap_dynamodb.config import get_number
+
+
+def get_positive_int_metadata(md_map, key, name, maximum):
+    '''
+    Return the integer value of the stream metadata `key` or None if it is
+    not set, raising an exception if it is not between 1 and `maximum`
+    '''
+    return get_number(metadata.get(md_map, (), key), name, minimum=1, maximum=maximum)
+
+
+def write_records(deserializer, table_name, stream_version, items):
+    '''
+    Deserialize the scanned or queried items and write them as record messages
+    '''
+    rows_saved = 0
+    for item in items:
+        rows_saved += 1
+        record = deserializer.deserialize_item(item)
+        output.write_record(table_name, record, version=stream_version)
+    return rows_saved
+
+
+def write_pages(config, deserializer, table_name, stream_version, pages):
+    '''
+    Write the records of the `(key, result)` scan or query pages and yield
+    `(key, result, rows_saved)` in page order once the records of a page are
+    written, so the page can be bookmarked. The items are deserialized and
+    encoded on the worker processes if the `decode_workers` pool is started.
+    '''
+    if process_pool.get_pool() is not None:
+        yield from process_pool.write_pages(pages, table_name, stream_version,
+                                            deserializer.number_mode, config.get('json_encoder'))
+        return
+
+    for key, result in pages:
+        rows_saved = 0
+        if result is not parallel.DONE:
+            rows_saved = write_records(deserializer, table_name, stream_version, result.get('Items', []))
+        yield key, result, rows_saved
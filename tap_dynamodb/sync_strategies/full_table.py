@@ -1,21 +1,208 @@
+import base64
+import contextlib
+import functools
+import json
+import re
 import time
 import singer
 from singer import metadata
 import backoff
 from botocore.exceptions import ConnectTimeoutError, ReadTimeoutError
+from tap_dynamodb.config import get_number
 from tap_dynamodb.deserialize import Deserializer
-from tap_dynamodb import dynamodb
+from tap_dynamodb import checkpoint, dynamodb, output, parallel, rate_limiter, raw_response
+from tap_dynamodb.sync_strategies.common import get_positive_int_metadata, write_pages
+from tap_dynamodb.sync_strategies.query import (MAX_QUERY_WORKERS, PARTITION_KEY_NAME, get_attribute_type,
+                                                 get_key_schema, query_table, serialize_key_value)
 
 LOGGER = singer.get_logger()
 
+# DynamoDB rejects a `TotalSegments` greater than this
+MAX_SCAN_SEGMENTS = 1000000
 
-def scan_table(table_name, projection, expression, last_evaluated_key, config):
+# Number of scan pages fetched ahead while the current page is written
+PREFETCH_PAGES = 1
+
+# When only the worker count is configured the table is split into this many
+# segments per worker, so that idle workers can pick up the segments left
+# behind by workers stuck on hot partitions
+SEGMENTS_PER_WORKER = 4
+
+# Default number of partitions of a partition key list queried in parallel
+PARTITION_QUERY_WORKERS = 32
+
+# The data types of the typed values of a filter expression
+FILTER_VALUE_TYPES = ('S', 'N', 'B', 'BOOL', 'NULL', 'M', 'L', 'SS', 'NS', 'BS')
+
+
+def get_scan_segments(md_map):
+    '''
+    Return the number of parallel scan segments configured for the stream
+    through the `tap-dynamodb.scan-segments` metadata. If only the
+    `tap-dynamodb.scan-workers` metadata is set the table is oversubscribed
+    with `SEGMENTS_PER_WORKER` segments per worker. Defaults to 1
+    '''
+    segments = get_positive_int_metadata(md_map, 'tap-dynamodb.scan-segments', 'scan segments', MAX_SCAN_SEGMENTS)
+    if segments is not None:
+        return segments
+
+    workers = get_positive_int_metadata(md_map, 'tap-dynamodb.scan-workers', 'scan workers', MAX_SCAN_SEGMENTS)
+    if workers is not None and workers > 1:
+        return min(workers * SEGMENTS_PER_WORKER, MAX_SCAN_SEGMENTS)
+
+    return 1
+
+
+def get_scan_workers(md_map, total_segments, config):
+    '''
+    Return the number of worker threads scanning the segments, configured
+    through the `tap-dynamodb.scan-workers` metadata. Defaults to one worker
+    per segment, up to the `max_pool_connections` the workers share
+    '''
+    workers = get_positive_int_metadata(md_map, 'tap-dynamodb.scan-workers', 'scan workers', MAX_SCAN_SEGMENTS)
+    if workers is None:
+        return min(total_segments, dynamodb.get_max_pool_connections(config))
+    return min(workers, total_segments)
+
+
+def check_full_table_metadata(md_map, name, value):
+    '''
+    Raise an exception if the stream is not FULL_TABLE, as the metadata
+    `name` would otherwise limit the initial full table sync of a LOG_BASED
+    stream, whose changes are then read from every item
     '''
-    Get all the records of the table by using `scan()` method with projection expression parameters
+    replication_method = metadata.get(md_map, (), 'replication-method')
+    if replication_method != 'FULL_TABLE':
+        raise Exception("Invalid {}: {}. It should only be set on FULL_TABLE streams, not {}.".format(
+            name, value, replication_method))
+
+
+def get_partition_keys(md_map):
+    '''
+    Return the partition key values to extract with one query each instead
+    of a scan, from the comma separated `tap-dynamodb.partition-keys`
+    metadata or the local file named by `tap-dynamodb.partition-keys-file`
+    with one value per line. Returns None if neither is set. Raises an
+    exception if either is set on a stream which is not FULL_TABLE.
+    '''
+    partition_keys = metadata.get(md_map, (), 'tap-dynamodb.partition-keys')
+    partition_keys_file = metadata.get(md_map, (), 'tap-dynamodb.partition-keys-file')
+
+    if partition_keys_file or (partition_keys is not None and partition_keys != ''):
+        check_full_table_metadata(md_map, 'partition keys', partition_keys_file or partition_keys)
+
+    if partition_keys_file:
+        with open(partition_keys_file, encoding='utf-8') as keys_file:
+            partition_keys = keys_file.read().splitlines()
+    elif partition_keys is None or partition_keys == '':
+        return None
+
+    values = partition_keys.split(',') if isinstance(partition_keys, str) else partition_keys
+    values = [str(value).strip() for value in values if str(value).strip()]
+    if not values:
+        raise Exception("Invalid partition keys: {}. It should list the partition key values to query.".format(
+            partition_keys_file or partition_keys))
+
+    # every partition is queried once, in the listed order
+    return list(dict.fromkeys(values))
+
+
+def get_scan_filter(md_map):
+    '''
+    Return the `tap-dynamodb.filter-expression` metadata of the stream and
+    its typed `tap-dynamodb.filter-expression-values`, e.g.
+    `{":status": {"S": "active"}}`, or (None, None) if no filter is set.
+
+    The filter is applied by DynamoDB, so the items it drops are not sent
+    over the wire, though they still consume read capacity. Raises an
+    exception if the values do not match the placeholders of the
+    expression, which DynamoDB would only reject on the first request, or
+    if the filter is set on a stream which is not FULL_TABLE.
+    '''
+    filter_expression = metadata.get(md_map, (), 'tap-dynamodb.filter-expression')
+    filter_values = metadata.get(md_map, (), 'tap-dynamodb.filter-expression-values')
+
+    if filter_expression or filter_values:
+        check_full_table_metadata(md_map, 'filter expression', filter_expression or filter_values)
+
+    if filter_expression is None or filter_expression == '':
+        if filter_values:
+            raise Exception("Invalid filter expression values: {}. They should only be set with a filter "
+                            "expression.".format(filter_values))
+        return None, None
+
+    if isinstance(filter_values, str):
+        try:
+            filter_values = json.loads(filter_values)
+        except json.decoder.JSONDecodeError:
+            raise Exception("Invalid JSON format. The filter expression values should contain a valid JSON "
+                            "format.")
+    filter_values = filter_values or {}
+
+    if not isinstance(filter_values, dict) or \
+       not all(isinstance(value, dict) and len(value) == 1 and next(iter(value)) in FILTER_VALUE_TYPES
+               for value in filter_values.values()):
+        raise Exception("Invalid filter expression values: {}. They should map every placeholder to a typed "
+                        "value, e.g. {{\":status\": {{\"S\": \"active\"}}}}.".format(filter_values))
+
+    placeholders = set(re.findall(r':\w+', filter_expression))
+    if placeholders != set(filter_values):
+        raise Exception("Invalid filter expression values: {}. They should define exactly the placeholders {} "
+                        "of the filter expression.".format(sorted(filter_values), sorted(placeholders)))
+
+    partition_keys = metadata.get(md_map, (), 'tap-dynamodb.partition-keys')
+    partition_keys_file = metadata.get(md_map, (), 'tap-dynamodb.partition-keys-file')
+    if (partition_keys or partition_keys_file) and ':partition' in filter_values:
+        raise Exception("Invalid filter expression values: {}. The placeholder :partition is used by the "
+                        "partition key queries.".format(sorted(filter_values)))
+
+    expression = metadata.get(md_map, (), 'tap-dynamodb.expression-attributes')
+    expression_names = dynamodb.decode_expression(expression) if expression else {}
+    missing_names = sorted(set(re.findall(r'#\w+', filter_expression)) - set(expression_names))
+    if missing_names:
+        raise Exception("Invalid filter expression: {}. The attribute names {} should be defined in the "
+                        "expression attributes.".format(filter_expression, missing_names))
+
+    # binary values are base64 encoded, the way they are written
+    typed_values = {}
+    for placeholder, value in filter_values.items():
+        if 'B' in value:
+            value = {'B': base64.b64decode(value['B'])}
+        elif 'BS' in value:
+            value = {'BS': [base64.b64decode(item) for item in value['BS']]}
+        typed_values[placeholder] = value
+
+    return filter_expression, typed_values
+
+
+def count_page(item_counts, result):
+    '''
+    Add the number of items a page scanned and returned to `item_counts`
+    '''
+    item_counts['scanned'] += result.get('ScannedCount', 0)
+    item_counts['returned'] += result.get('Count', 0)
+
+
+def get_prefetch_pages(config):
+    '''
+    Return the number of scan pages to fetch ahead on a background thread,
+    configured through `scan_prefetch_pages`. 0 disables the prefetching
+    '''
+    return get_number(config.get('scan_prefetch_pages'), 'scan_prefetch_pages', PREFETCH_PAGES)
+
+
+def scan_table(table_name, projection, expression, last_evaluated_key, config,
+               segment=None, total_segments=None, client=None, limiter=None, decoder=None,
+               filter_expression=None, filter_values=None):
+    '''
+    Get all the records of the table by using `scan()` method with projection expression parameters.
+    With a `decoder` the items are deserialized from the raw response body. With a `filter_expression`
+    only the matching items are returned.
     '''
     scan_params = {
         'TableName': table_name,
-        'Limit': 1000
+        'Limit': 1000,
+        'ReturnConsumedCapacity': 'TOTAL'
     }
 
     # add the projection expression in the parameters to the `scan`
@@ -24,17 +211,33 @@ def scan_table(table_name, projection, expression, last_evaluated_key, config):
     if expression:
         # Add `ExpressionAttributeNames` parameter for reserved word.
         scan_params['ExpressionAttributeNames'] = dynamodb.decode_expression(expression)
+    if filter_expression:
+        scan_params['FilterExpression'] = filter_expression
+        if filter_values:
+            scan_params['ExpressionAttributeValues'] = filter_values
+    if total_segments is not None:
+        # Only scan the given segment of a parallel scan
+        scan_params['Segment'] = segment
+        scan_params['TotalSegments'] = total_segments
     if last_evaluated_key is not None:
         scan_params['ExclusiveStartKey'] = last_evaluated_key
 
-    client = dynamodb.get_client(config)
+    if client is None:
+        client = dynamodb.get_client(config)
+    if decoder is not None:
+        raw_response.register(client)
     has_more = True
     LOGGER.info('Scanning table %s with params:', table_name)
     for key, value in scan_params.items():
         LOGGER.info('\t%s = %s', key, value)
 
     while has_more:
-        result = client.scan(**scan_params)
+        if limiter is not None:
+            limiter.acquire()
+        with raw_response.decoding(decoder):
+            result = client.scan(**scan_params)
+        if limiter is not None:
+            limiter.consume(result)
         yield result
 
         if result.get('LastEvaluatedKey'):
@@ -42,6 +245,206 @@ def scan_table(table_name, projection, expression, last_evaluated_key, config):
 
         has_more = result.get('LastEvaluatedKey', False)
 
+def sync_segments(config, state, table_name, projection, expression, stream_version, total_segments, workers, limiter,
+                  deserializer, checkpoints, decoder=None, filter_expression=None, filter_values=None,
+                  item_counts=None):
+    '''
+    Scan the table as `total_segments` segments on `workers` parallel worker
+    threads.
+
+    The segments are queued up and every idle worker pulls the next pending
+    one, so with more segments than workers a slow segment on a hot partition
+    only holds up its own worker. Segments which were in progress when the
+    last sync was interrupted are queued first.
+
+    Every segment keeps its own `last_evaluated_key` bookmark in
+    `segment_last_evaluated_keys` and is moved to `finished_segments` once
+    scanned, so an interrupted sync only re-runs the unfinished segments,
+    each from where it stopped. The bookmarks are updated in memory and
+    written according to `checkpoints`. The items scanned and returned are
+    added to `item_counts`.
+    '''
+    segment_keys = singer.get_bookmark(state, table_name, 'segment_last_evaluated_keys') or {}
+    finished_segments = singer.get_bookmark(state, table_name, 'finished_segments') or []
+
+    state = singer.write_bookmark(state, table_name, 'scan_segments', total_segments)
+    state = singer.write_bookmark(state, table_name, 'segment_last_evaluated_keys', segment_keys)
+    state = singer.write_bookmark(state, table_name, 'finished_segments', finished_segments)
+    output.write_state(state)
+
+    # boto3 clients are thread safe, so every segment shares the same client
+    client = dynamodb.get_client(config)
+    finished = set(finished_segments)
+    pending_segments = [segment for segment in range(total_segments) if segment not in finished]
+    # resume the in progress segments before starting new ones
+    pending_segments.sort(key=lambda segment: str(segment) not in segment_keys)
+    tasks = [(segment, functools.partial(scan_table, table_name, projection, expression,
+                                         segment_keys.get(str(segment)), config,
+                                         segment=segment, total_segments=total_segments,
+                                         client=client, limiter=limiter, decoder=decoder,
+                                         filter_expression=filter_expression, filter_values=filter_values))
+             for segment in pending_segments]
+
+    LOGGER.info('Scanning %s of %s segments of table %s with %s workers',
+                len(tasks), total_segments, table_name, workers)
+
+    rows_saved = 0
+
+    # closing the pages stops the workers if writing the records fails
+    with contextlib.closing(parallel.iterate_in_parallel(tasks, workers)) as pages:
+        for segment, result, page_rows in write_pages(config, deserializer, table_name, stream_version, pages):
+            if result is parallel.DONE:
+                finished_segments.append(segment)
+                segment_keys.pop(str(segment), None)
+                checkpoints.update(state)
+                continue
+
+            rows_saved += page_rows
+            if item_counts is not None:
+                count_page(item_counts, result)
+            if result.get('LastEvaluatedKey'):
+                segment_keys[str(segment)] = result['LastEvaluatedKey']
+            checkpoints.update(state, records=page_rows)
+
+    return rows_saved
+
+def sync_partitions(config, state, table_name, projection, expression, stream_version, partition_keys, workers,
+                    limiter, deserializer, checkpoints, filter_expression=None, filter_values=None,
+                    item_counts=None):
+    '''
+    Query the items of every listed partition key value on `workers`
+    parallel worker threads, instead of scanning the whole table.
+
+    Like the segments of a parallel scan, every partition keeps its own
+    `last_evaluated_key` bookmark in `partition_last_evaluated_keys` and is
+    moved to `finished_partitions` once queried, so an interrupted sync only
+    re-runs the unfinished partitions, each from where it stopped. The
+    partitions which were in progress are queried first. The items read and
+    returned are added to `item_counts`.
+    '''
+    partition_keys_lek = singer.get_bookmark(state, table_name, 'partition_last_evaluated_keys') or {}
+    finished_partitions = singer.get_bookmark(state, table_name, 'finished_partitions') or []
+
+    state = singer.write_bookmark(state, table_name, 'partition_last_evaluated_keys', partition_keys_lek)
+    state = singer.write_bookmark(state, table_name, 'finished_partitions', finished_partitions)
+    output.write_state(state)
+
+    client = dynamodb.get_client(config)
+    table = client.describe_table(TableName=table_name)['Table']
+    partition_key, _ = get_key_schema(table, None)
+    partition_key_type = get_attribute_type(table, partition_key)
+
+    expression_names = dynamodb.decode_expression(expression) if expression else {}
+    expression_names = dict(expression_names, **{PARTITION_KEY_NAME: partition_key})
+    key_condition = '{} = :partition'.format(PARTITION_KEY_NAME)
+
+    finished = set(finished_partitions)
+    pending_partitions = [key for key in partition_keys if key not in finished]
+    # resume the in progress partitions before starting new ones
+    pending_partitions.sort(key=lambda key: key not in partition_keys_lek)
+    tasks = [(key, functools.partial(query_table, table_name, key_condition, expression_names,
+                                     dict(filter_values or {},
+                                          **{':partition': serialize_key_value(partition_key_type, key)}),
+                                     projection, config, exclusive_start_key=partition_keys_lek.get(key),
+                                     client=client, limiter=limiter, filter_expression=filter_expression))
+             for key in pending_partitions]
+
+    LOGGER.info('Querying %s of %s partitions of table %s with %s workers',
+                len(tasks), len(partition_keys), table_name, workers)
+
+    rows_saved = 0
+
+    # closing the pages stops the workers if writing the records fails
+    with contextlib.closing(parallel.iterate_in_parallel(tasks, workers)) as pages:
+        for key, result, page_rows in write_pages(config, deserializer, table_name, stream_version, pages):
+            if result is parallel.DONE:
+                finished_partitions.append(key)
+                partition_keys_lek.pop(key, None)
+                checkpoints.update(state)
+                continue
+
+            rows_saved += page_rows
+            if item_counts is not None:
+                count_page(item_counts, result)
+            if result.get('LastEvaluatedKey'):
+                partition_keys_lek[key] = result['LastEvaluatedKey']
+            checkpoints.update(state, records=page_rows)
+
+    return rows_saved
+
+def sync_items(config, state, table_name, md_map, stream_version, checkpoints, item_counts, partition_keys,
+               filter_expression, filter_values):
+    '''
+    Write the items of the listed partitions, of the segments of a parallel
+    scan or of a single scan, resuming an interrupted sync from its
+    bookmarks. Returns the number of records written.
+    '''
+    last_evaluated_key = singer.get_bookmark(state,
+                                             table_name,
+                                             'last_evaluated_key')
+
+    projection = metadata.get(md_map, (), 'tap-mongodb.projection')
+
+    # An expression attribute name is a placeholder that one uses in an Amazon DynamoDB expression as an alternative to an actual attribute name.
+    # Sometimes it might need to write an expression containing an attribute name that conflicts with a DynamoDB reserved word.
+    # For example, table `A` contains the field `Comment` but `Comment` is a reserved word. So, it fails during fetch.
+    expression = metadata.get(md_map, (), 'tap-dynamodb.expression-attributes')
+
+    # An interrupted scan is resumed with the segmentation it was started with
+    if last_evaluated_key is not None:
+        total_segments = 1
+    else:
+        total_segments = singer.get_bookmark(state, table_name, 'scan_segments') or get_scan_segments(md_map)
+
+    # Shared read capacity budget, if one is configured
+    limiter = rate_limiter.get_read_limiter(config, table_name)
+
+    deserializer = Deserializer(number_mode=metadata.get(md_map, (), 'tap-dynamodb.number-mode'))
+    decoder = raw_response.get_decoder(config, deserializer)
+
+    if partition_keys is not None:
+        workers = get_positive_int_metadata(md_map, 'tap-dynamodb.query-workers', 'query workers',
+                                            MAX_QUERY_WORKERS) or PARTITION_QUERY_WORKERS
+        return sync_partitions(config, state, table_name, projection, expression,
+                               stream_version, partition_keys, min(workers, len(partition_keys)),
+                               limiter, deserializer, checkpoints, filter_expression=filter_expression,
+                               filter_values=filter_values, item_counts=item_counts)
+
+    if total_segments > 1:
+        workers = get_scan_workers(md_map, total_segments, config)
+        return sync_segments(config, state, table_name, projection, expression,
+                             stream_version, total_segments, workers, limiter, deserializer,
+                             checkpoints, decoder=decoder, filter_expression=filter_expression,
+                             filter_values=filter_values, item_counts=item_counts)
+
+    # The next pages are fetched while the current one is written. The
+    # bookmark is only updated once a page has been written, so pages
+    # fetched ahead are scanned again if the sync is interrupted.
+    rows_saved = 0
+    pages = parallel.prefetch(scan_table(table_name, projection, expression, last_evaluated_key,
+                                         config, limiter=limiter, decoder=decoder,
+                                         filter_expression=filter_expression, filter_values=filter_values),
+                              get_prefetch_pages(config))
+    with contextlib.closing(pages):
+        for _, result, page_rows in write_pages(config, deserializer, table_name, stream_version,
+                                                ((None, result) for result in pages)):
+            rows_saved += page_rows
+            count_page(item_counts, result)
+            if result.get('LastEvaluatedKey'):
+                state = singer.write_bookmark(state, table_name, 'last_evaluated_key', result.get('LastEvaluatedKey'))
+            checkpoints.update(state, records=page_rows)
+
+    return rows_saved
+
+def is_sync_in_progress(state, table_name):
+    '''
+    The last run was interrupted if there is a last_evaluated_key bookmark,
+    a parallel scan or a partition key list query in progress
+    '''
+    return singer.get_bookmark(state, table_name, 'last_evaluated_key') is not None or \
+        singer.get_bookmark(state, table_name, 'scan_segments') is not None or \
+        singer.get_bookmark(state, table_name, 'finished_partitions') is not None
+
 # Backoff for both ReadTimeout and ConnectTimeout error for 5 times
 @backoff.on_exception(backoff.expo,
                       (ReadTimeoutError, ConnectTimeoutError),
@@ -49,14 +452,16 @@ def scan_table(table_name, projection, expression, last_evaluated_key, config):
                       factor=2)
 def sync(config, state, stream):
     table_name = stream['tap_stream_id']
+    md_map = metadata.to_map(stream['metadata'])
+    # raises before any state is written if the filter or the partition keys are invalid
+    filter_expression, filter_values = get_scan_filter(md_map)
+    # Only the listed partitions are extracted if partition keys are configured
+    partition_keys = get_partition_keys(md_map)
 
     # before writing the table version to state, check if we had one to begin with
     first_run = singer.get_bookmark(state, table_name, 'version') is None
 
-    # last run was interrupted if there is a last_id_fetched bookmark
-    was_interrupted = singer.get_bookmark(state,
-                                          table_name,
-                                          'last_evaluated_key') is not None
+    was_interrupted = is_sync_in_progress(state, table_name)
 
     # pick a new table version if last run wasn't interrupted
     if was_interrupted:
@@ -68,52 +473,41 @@ def sync(config, state, stream):
                                   table_name,
                                   'version',
                                   stream_version)
-    singer.write_state(state)
+    output.write_state(state)
 
     # For the initial replication, emit an ACTIVATE_VERSION message
     # at the beginning so the records show up right away.
     if first_run:
-        singer.write_version(table_name, stream_version)
+        output.write_version(table_name, stream_version)
 
-    last_evaluated_key = singer.get_bookmark(state,
-                                             table_name,
-                                             'last_evaluated_key')
+    item_counts = {'scanned': 0, 'returned': 0}
+    checkpoints = checkpoint.CheckpointPolicy()
 
-    md_map = metadata.to_map(stream['metadata'])
-    projection = metadata.get(md_map, (), 'tap-mongodb.projection')
+    try:
+        rows_saved = sync_items(config, state, table_name, md_map, stream_version, checkpoints, item_counts,
+                                partition_keys, filter_expression, filter_values)
 
-    # An expression attribute name is a placeholder that one uses in an Amazon DynamoDB expression as an alternative to an actual attribute name.
-    # Sometimes it might need to write an expression containing an attribute name that conflicts with a DynamoDB reserved word.
-    # For example, table `A` contains the field `Comment` but `Comment` is a reserved word. So, it fails during fetch.
-    expression = metadata.get(md_map, (), 'tap-dynamodb.expression-attributes')
-
-    rows_saved = 0
+        state = singer.clear_bookmark(state, table_name, 'last_evaluated_key')
+        state = singer.clear_bookmark(state, table_name, 'scan_segments')
+        state = singer.clear_bookmark(state, table_name, 'segment_last_evaluated_keys')
+        state = singer.clear_bookmark(state, table_name, 'finished_segments')
+        state = singer.clear_bookmark(state, table_name, 'partition_last_evaluated_keys')
+        state = singer.clear_bookmark(state, table_name, 'finished_partitions')
 
-    deserializer = Deserializer()
-    for result in scan_table(table_name, projection, expression, last_evaluated_key, config):
-        for item in result.get('Items', []):
-            rows_saved += 1
-            # TODO: Do we actually have to put the item we retreive from
-            # dynamo into a map before we can deserialize?
-            record = deserializer.deserialize_item(item)
-            record_message = singer.RecordMessage(stream=table_name,
-                                                  record=record,
-                                                  version=stream_version)
-
-            singer.write_message(record_message)
-        if result.get('LastEvaluatedKey'):
-            state = singer.write_bookmark(state, table_name, 'last_evaluated_key', result.get('LastEvaluatedKey'))
-            singer.write_state(state)
+        state = singer.write_bookmark(state,
+                                      table_name,
+                                      'initial_full_table_complete',
+                                      True)
 
-    state = singer.clear_bookmark(state, table_name, 'last_evaluated_key')
-
-    state = singer.write_bookmark(state,
-                                  table_name,
-                                  'initial_full_table_complete',
-                                  True)
+        checkpoints.write(state)
+    finally:
+        # the bookmarks in memory only cover the records written so far
+        checkpoints.write_pending(state)
 
-    singer.write_state(state)
+    output.write_version(table_name, stream_version)
 
-    singer.write_version(table_name, stream_version)
+    if filter_expression:
+        LOGGER.info('Filter expression of table %s returned %s of %s scanned items',
+                    table_name, item_counts['returned'], item_counts['scanned'])
 
     return rows_saved
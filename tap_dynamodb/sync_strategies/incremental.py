@@ -0,0 +1,140 @@
+import contextlib
+import functools
+import singer
+from singer import metadata
+import backoff
+from botocore.exceptions import ConnectTimeoutError, ReadTimeoutError
+from tap_dynamodb.deserialize import Deserializer
+from tap_dynamodb import checkpoint, dynamodb, parallel, rate_limiter
+from tap_dynamodb.sync_strategies.common import get_positive_int_metadata, write_pages
+from tap_dynamodb.sync_strategies.query import (MAX_QUERY_WORKERS, PARTITION_KEY_NAME, get_attribute_type,
+                                                 get_key_schema, query_table, serialize_key_value)
+
+LOGGER = singer.get_logger()
+
+# Placeholder of the replication key in the key condition expression, see
+# `query.PARTITION_KEY_NAME`
+REPLICATION_KEY_NAME = '#tap_dynamodb_replication_key'
+
+
+def get_query_partitions(md_map):
+    '''
+    Return the partition key values to query, from the comma separated
+    `tap-dynamodb.query-partitions` metadata
+    '''
+    partitions = metadata.get(md_map, (), 'tap-dynamodb.query-partitions')
+    if isinstance(partitions, str):
+        partitions = [partition.strip() for partition in partitions.split(',') if partition.strip()]
+    if not partitions:
+        raise Exception("Invalid query partitions: {}. It should list the partition key values to query.".format(
+            partitions))
+    return [str(partition) for partition in partitions]
+
+
+def check_projection(projection, expression_names, replication_key):
+    '''
+    Raise an exception if a projection leaves out the replication key, which
+    the bookmark is read from
+    '''
+    if projection is None or projection == '':
+        return
+    projected = {expression_names.get(part.strip(), part.strip()) for part in projection.split(',')}
+    if replication_key not in projected:
+        raise Exception("Invalid projection: {}. It should include the replication key {}.".format(
+            projection, replication_key))
+
+
+# Backoff for both ReadTimeout and ConnectTimeout error for 5 times
+@backoff.on_exception(backoff.expo,
+                      (ReadTimeoutError, ConnectTimeoutError),
+                      max_tries=5,
+                      factor=2)
+def sync(config, state, stream):
+    '''
+    Query the partitions listed in the `tap-dynamodb.query-partitions`
+    metadata of the table, or of the index named by `tap-dynamodb.query-index`,
+    for the items whose `replication-key` is at least the bookmarked value.
+
+    The replication key has to be the sort key of the queried key schema.
+    Every partition keeps the typed replication key value of the last item
+    written in the `replication_key_values` bookmark, so an interrupted or
+    later sync continues every partition from where it stopped. The items
+    with the bookmarked value itself are written again, as items updated at
+    the same time may not all have been written. The partitions are queried
+    on `tap-dynamodb.query-workers` parallel worker threads, one per
+    partition by default.
+    '''
+    table_name = stream['tap_stream_id']
+    md_map = metadata.to_map(stream['metadata'])
+
+    replication_key = metadata.get(md_map, (), 'replication-key')
+    if not replication_key:
+        raise Exception("Invalid replication key: {}. It should be set for INCREMENTAL replication.".format(
+            replication_key))
+    index_name = metadata.get(md_map, (), 'tap-dynamodb.query-index')
+    partitions = get_query_partitions(md_map)
+
+    client = dynamodb.get_client(config)
+    table = client.describe_table(TableName=table_name)['Table']
+    partition_key, sort_key = get_key_schema(table, index_name)
+    if sort_key != replication_key:
+        raise Exception("Invalid replication key: {}. It should be the sort key of {}.".format(
+            replication_key, index_name or table_name))
+    partition_key_type = get_attribute_type(table, partition_key)
+
+    projection = metadata.get(md_map, (), 'tap-mongodb.projection')
+    expression = metadata.get(md_map, (), 'tap-dynamodb.expression-attributes')
+    expression_names = dynamodb.decode_expression(expression) if expression else {}
+    check_projection(projection, expression_names, replication_key)
+    expression_names = dict(expression_names, **{PARTITION_KEY_NAME: partition_key})
+
+    replication_key_values = singer.get_bookmark(state, table_name, 'replication_key_values') or {}
+    # partitions which are no longer queried are forgotten
+    replication_key_values = {partition: value for partition, value in replication_key_values.items()
+                              if partition in partitions}
+    state = singer.write_bookmark(state, table_name, 'replication_key_values', replication_key_values)
+
+    # Shared read capacity budget, if one is configured
+    limiter = rate_limiter.get_read_limiter(config, table_name)
+
+    def query_partition(partition):
+        key_condition = '{} = :partition'.format(PARTITION_KEY_NAME)
+        names = expression_names
+        expression_values = {':partition': serialize_key_value(partition_key_type, partition)}
+        # DynamoDB rejects the names and values which are not used
+        if partition in replication_key_values:
+            key_condition += ' AND {} >= :replication_key'.format(REPLICATION_KEY_NAME)
+            names = dict(expression_names, **{REPLICATION_KEY_NAME: replication_key})
+            expression_values[':replication_key'] = replication_key_values[partition]
+        return query_table(table_name, key_condition, names, expression_values, projection, config,
+                           index_name=index_name, client=client, limiter=limiter)
+
+    workers = get_positive_int_metadata(md_map, 'tap-dynamodb.query-workers', 'query workers', MAX_QUERY_WORKERS)
+    workers = min(workers or len(partitions), len(partitions))
+    deserializer = Deserializer(number_mode=metadata.get(md_map, (), 'tap-dynamodb.number-mode'))
+    tasks = [(partition, functools.partial(query_partition, partition)) for partition in partitions]
+
+    LOGGER.info('Querying %s partitions of table %s with %s workers', len(tasks), table_name, workers)
+
+    rows_saved = 0
+    checkpoints = checkpoint.CheckpointPolicy()
+
+    try:
+        # closing the pages stops the workers if writing the records fails
+        with contextlib.closing(parallel.iterate_in_parallel(tasks, workers)) as pages:
+            for partition, result, page_rows in write_pages(config, deserializer, table_name, None, pages):
+                if result is parallel.DONE:
+                    continue
+
+                items = result.get('Items', [])
+                if items:
+                    replication_key_values[partition] = items[-1][replication_key]
+                rows_saved += page_rows
+                checkpoints.update(state, records=page_rows)
+
+        checkpoints.write(state)
+    finally:
+        # the bookmarks in memory only cover the records written so far
+        checkpoints.write_pending(state)
+
+    return rows_saved
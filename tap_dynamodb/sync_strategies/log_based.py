@@ -1,30 +1,45 @@
+import contextlib
 import datetime
+import functools
+import itertools
 from singer import metadata
 import singer
 import backoff
-from botocore.exceptions import ConnectTimeoutError, ReadTimeoutError
-from tap_dynamodb import dynamodb, deserialize
+from botocore.exceptions import ClientError, ConnectTimeoutError, ReadTimeoutError
+from tap_dynamodb import checkpoint, dynamodb, deserialize, output, parallel, rate_limiter, raw_response, shard_state, tailing
+from tap_dynamodb.sync_strategies.common import get_positive_int_metadata
 
 LOGGER = singer.get_logger()
-WRITE_STATE_PERIOD = 1000
 
 SDC_DELETED_AT = "_sdc_deleted_at"
 MAX_TRIES = 5
 FACTOR = 2
 
-def get_shards(streams_client, stream_arn):
+# Upper bound of the `tap-dynamodb.shard-workers` metadata
+MAX_SHARD_WORKERS = 1000
+
+# Records are kept in a stream for 24 hours, so the shards which were already
+# closed when they were added to the shard catalog this long ago are trimmed
+SHARD_RETENTION = datetime.timedelta(hours=24)
+
+def get_shards(streams_client, stream_arn, include_open=False, exclusive_start_shard_id=None):
     '''
-    Yields closed shards.
+    Yields closed shards, and open shards if `include_open` is set. With
+    `exclusive_start_shard_id` only the shards after it are described.
 
-    We only yield closed shards because it is
+    By default we only yield closed shards because it is
     impossible to tell if an open shard has any more records or if you
-    will infinitely loop over the lastEvaluatedShardId
+    will infinitely loop over the lastEvaluatedShardId. Open shards are
+    only read with the bounded polling of `tailing.ShardTail`.
     '''
 
     params = {
         'StreamArn': stream_arn
     }
 
+    if exclusive_start_shard_id:
+        params['ExclusiveStartShardId'] = exclusive_start_shard_id
+
     has_more = True
 
     while has_more:
@@ -35,7 +50,7 @@ def get_shards(streams_client, stream_arn):
             # https://docs.aws.amazon.com/amazondynamodb/latest/APIReference/API_streams_DescribeStream.html
             # for documentation on how to identify closed shards
             # Closed shards all have an EndingSequenceNumber
-            if shard['SequenceNumberRange'].get('EndingSequenceNumber'):
+            if include_open or not tailing.is_open(shard):
                 yield shard
 
         last_evaluated_shard_id = stream_info.get('LastEvaluatedShardId')
@@ -45,12 +60,80 @@ def get_shards(streams_client, stream_arn):
             params['ExclusiveStartShardId'] = last_evaluated_shard_id
 
 
-def get_shard_records(streams_client, stream_arn, shard, sequence_number):
+def is_catalog_outdated(catalog, stream_arn, state, table_name):
     '''
-    This should only be called on closed shards. Calling this on an open
-    shard will lead to an infinite loop
+    The whole stream is described again if it changed or if the
+    `finished_shards` bookmark was removed to read every shard again
+    '''
+    return not catalog or catalog.get('stream_arn') != stream_arn or \
+        singer.get_bookmark(state, table_name, 'finished_shards') is None
+
 
-    Yields the records on a shard.
+def get_catalog_shards(catalog):
+    '''
+    Returns the shards of the catalog, after removing the batches of shards
+    which were added more than `SHARD_RETENTION` ago and are trimmed by now
+    '''
+    now = singer.utils.now()
+    catalog['shards'] = [batch for batch in catalog['shards']
+                         if now - singer.utils.strptime_to_utc(batch['added_at']) <= SHARD_RETENTION]
+    return [shard for batch in catalog['shards'] for shard in shard_state.decode_shards(batch)]
+
+
+def get_cached_shards(streams_client, stream_arn, state, table_name, include_open=False):
+    '''
+    Returns the closed shards of the stream, and the open shards if
+    `include_open` is set, from the `shard_catalog` bookmark.
+
+    The catalog holds the stream ARN, the closed shards before the first
+    open shard and the ID of the last of them. Only the shards after that ID
+    are described again, which covers the open shards, whose status changes,
+    and the new ones. The closed shards are kept encoded by
+    `shard_state.encode_shards`, in batches with the time they were added,
+    and stay in the catalog, and so in `finished_shards`, until they are
+    trimmed from the stream.
+    '''
+    catalog = singer.get_bookmark(state, table_name, 'shard_catalog')
+    if is_catalog_outdated(catalog, stream_arn, state, table_name):
+        catalog = {'stream_arn': stream_arn, 'last_shard_id': None, 'shards': []}
+    cached_shards = get_catalog_shards(catalog)
+
+    try:
+        described = list(get_shards(streams_client, stream_arn, include_open=True,
+                                    exclusive_start_shard_id=catalog['last_shard_id']))
+    except ClientError:
+        if catalog['last_shard_id'] is None:
+            raise
+        # the last shard of the catalog may have been trimmed since
+        LOGGER.info('Describing every shard of table %s, shards after %s could not be described',
+                    table_name, catalog['last_shard_id'])
+        catalog = {'stream_arn': stream_arn, 'last_shard_id': None, 'shards': []}
+        cached_shards = []
+        described = list(get_shards(streams_client, stream_arn, include_open=True))
+
+    cached_shard_ids = {shard['ShardId'] for shard in cached_shards}
+    shards = cached_shards + [shard for shard in described if shard['ShardId'] not in cached_shard_ids]
+
+    # the cached shards are all closed
+    closed_shards = list(itertools.takewhile(lambda shard: not tailing.is_open(shard), shards))
+    new_closed_shards = closed_shards[len(cached_shards):]
+    if new_closed_shards:
+        catalog['last_shard_id'] = new_closed_shards[-1]['ShardId']
+        catalog['shards'].append(dict(shard_state.encode_shards(new_closed_shards),
+                                      added_at=singer.utils.strftime(singer.utils.now())))
+    state = singer.write_bookmark(state, table_name, 'shard_catalog', catalog)
+
+    return [shard for shard in shards if include_open or not tailing.is_open(shard)]
+
+
+def get_shard_record_pages(streams_client, stream_arn, shard, sequence_number, decoder=None):
+    '''
+    Yields the lists of records returned by `get_records` on a shard. Open
+    shards never run out of records, so they are only polled until a limit
+    of `tailing.ShardTail` is reached. With a
+    `decoder` the records are deserialized from the raw response body,
+    otherwise the decoder of the current thread is kept. The calls are paced
+    by the streams governor of the process.
     '''
     if sequence_number:
         iterator_type = 'AFTER_SEQUENCE_NUMBER'
@@ -66,55 +149,168 @@ def get_shard_records(streams_client, stream_arn, shard, sequence_number):
     if sequence_number:
         params['SequenceNumber'] = sequence_number
 
-    shard_iterator = streams_client.get_shard_iterator(**params)['ShardIterator']
+    shard_iterator = rate_limiter.call_streams(stream_arn, shard['ShardId'],
+                                               streams_client.get_shard_iterator, **params)['ShardIterator']
+
+    tail = tailing.ShardTail() if tailing.is_open(shard) else None
 
-    # This will loop indefinitely if called on open shards
     while shard_iterator:
-        records = streams_client.get_records(ShardIterator=shard_iterator, Limit=1000)
+        with raw_response.decoding(decoder) if decoder is not None else contextlib.nullcontext():
+            records = rate_limiter.call_streams(stream_arn, shard['ShardId'], streams_client.get_records,
+                                                ShardIterator=shard_iterator, Limit=1000)
+
+        yield records['Records']
 
-        for record in records['Records']:
-            yield record
+        if tail is not None and tail.add_page(len(records['Records'])):
+            LOGGER.info('Stopped tailing open shard %s', shard['ShardId'])
+            return
 
         shard_iterator = records.get('NextShardIterator')
 
 
-def sync_shard(shard, seq_number_bookmarks, streams_client, stream_arn, projection, deserializer, table_name, stream_version, state):
+def write_shard_record(record, deserializer, projection, table_name, stream_version):
+    '''
+    Write a stream record as a record message, deleted items only keep their
+    keys and `_sdc_deleted_at`
+    '''
+    if record['eventName'] == 'REMOVE':
+        record_message = deserializer.deserialize_item(record['dynamodb']['Keys'])
+        record_message[SDC_DELETED_AT] = singer.utils.strftime(record['dynamodb']['ApproximateCreationDateTime'])
+    else:
+        new_image = record['dynamodb'].get('NewImage')
+        if new_image is None:
+            LOGGER.fatal('Dynamo stream view type must be either "NEW_IMAGE" "NEW_AND_OLD_IMAGES"')
+            raise RuntimeError('Dynamo stream view type must be either "NEW_IMAGE" "NEW_AND_OLD_IMAGES"')
+        if projection is not None and projection != '':
+            try:
+                # only the projected attributes of the image are deserialized
+                record_message = deserializer.deserialize_projected_item(new_image, projection)
+                record_message = deserializer.apply_projection(record_message, projection)
+            except:
+                LOGGER.fatal("Projection failed to apply: %s", projection)
+                raise RuntimeError('Projection failed to apply: {}'.format(projection))
+        else:
+            record_message = deserializer.deserialize_item(new_image)
+
+    output.write_record(table_name, record_message, version=stream_version)
+
+
+def sync_shard(shard, seq_number_bookmarks, streams_client, stream_arn, projection, deserializer, table_name, stream_version, state,
+               checkpoints=None):
+    '''
+    Write the records of the shard, keeping the sequence number of the last
+    written record in `seq_number_bookmarks`. The state is written according
+    to `checkpoints`.
+    '''
+    if checkpoints is None:
+        checkpoints = checkpoint.CheckpointPolicy()
+
     seq_number = seq_number_bookmarks.get(shard['ShardId'])
 
+    # the bookmark holds the dict itself, so the sequence numbers are updated in memory
+    state = singer.write_bookmark(state, table_name, 'shard_seq_numbers', seq_number_bookmarks)
+
     rows_synced = 0
 
-    for record in get_shard_records(streams_client, stream_arn, shard, seq_number):
-        if record['eventName'] == 'REMOVE':
-            record_message = deserializer.deserialize_item(record['dynamodb']['Keys'])
-            record_message[SDC_DELETED_AT] = singer.utils.strftime(record['dynamodb']['ApproximateCreationDateTime'])
-        else:
-            new_image = record['dynamodb'].get('NewImage')
-            if new_image is None:
-                LOGGER.fatal('Dynamo stream view type must be either "NEW_IMAGE" "NEW_AND_OLD_IMAGES"')
-                raise RuntimeError('Dynamo stream view type must be either "NEW_IMAGE" "NEW_AND_OLD_IMAGES"')
-            record_message = deserializer.deserialize_item(new_image)
-            if projection is not None and projection != '':
-                try:
-                    record_message = deserializer.apply_projection(record_message, projection)
-                except:
-                    LOGGER.fatal("Projection failed to apply: %s", projection)
-                    raise RuntimeError('Projection failed to apply: {}'.format(projection))
+    # the bookmark and the checkpoint policy are updated once per page
+    for records in get_shard_record_pages(streams_client, stream_arn, shard, seq_number):
+        for record in records:
+            write_shard_record(record, deserializer, projection, table_name, stream_version)
+
+        if records:
+            seq_number_bookmarks[shard['ShardId']] = records[-1]['dynamodb']['SequenceNumber']
+        rows_synced += len(records)
+        checkpoints.update(state, records=len(records))
 
-        record_message = singer.RecordMessage(stream=table_name,
-                                              record=record_message,
-                                              version=stream_version)
-        singer.write_message(record_message)
+    checkpoints.update(state)
+    return rows_synced
 
-        rows_synced += 1
+def sync_shards(shards, workers, seq_number_bookmarks, finished_shards, streams_client, stream_arn, projection,
+                deserializer, decoder, table_name, stream_version, state, checkpoints):
+    '''
+    Write the records of the closed `shards` which are not finished yet on
+    `workers` parallel worker threads.
+
+    A shard is only started once its parent shard, from `ParentShardId`, is
+    finished, so the changes to an item are written in the order they were
+    made. Independent shards are read concurrently. The records are written
+    and bookmarked on the calling thread, page by page, and a closed shard
+    is added to the `finished_shards` set once all its records are written.
+    Open shards keep their sequence number bookmark for the next sync.
+    '''
+    state = singer.write_bookmark(state, table_name, 'shard_seq_numbers', seq_number_bookmarks)
 
-        seq_number_bookmarks[shard['ShardId']] = record['dynamodb']['SequenceNumber']
-        state = singer.write_bookmark(state, table_name, 'shard_seq_numbers', seq_number_bookmarks)
+    pending_shards = [shard for shard in shards if shard['ShardId'] not in finished_shards]
+    tasks = [(shard['ShardId'], functools.partial(get_shard_record_pages, streams_client, stream_arn, shard,
+                                                  seq_number_bookmarks.get(shard['ShardId']), decoder=decoder))
+             for shard in pending_shards]
+    parents = {shard['ShardId']: shard.get('ParentShardId') for shard in pending_shards}
+    open_shards = {shard['ShardId'] for shard in pending_shards if tailing.is_open(shard)}
 
-        # Every 100 rows write the state
-        if rows_synced % 100 == 0:
-            singer.write_state(state)
+    LOGGER.info('Syncing %s of %s closed shards of table %s with %s workers',
+                len(tasks), len(shards), table_name, workers)
+
+    rows_synced = 0
+
+    # closing the pages stops the workers if writing the records fails
+    with contextlib.closing(parallel.iterate_in_parallel(tasks, workers, parents=parents)) as pages:
+        for shard_id, records in pages:
+            if records is parallel.DONE:
+                if shard_id in open_shards:
+                    continue
+                finished_shards.add(shard_id)
+                seq_number_bookmarks.pop(shard_id, None)
+                state = shard_state.write_finished_shards(state, table_name, finished_shards)
+                checkpoints.update(state)
+                continue
+
+            for record in records:
+                write_shard_record(record, deserializer, projection, table_name, stream_version)
+
+            if records:
+                seq_number_bookmarks[shard_id] = records[-1]['dynamodb']['SequenceNumber']
+            rows_synced += len(records)
+            checkpoints.update(state, records=len(records))
+
+    return rows_synced
+
+def sync_shards_sequentially(shards, seq_number_bookmarks, finished_shards, streams_client, stream_arn, projection,
+                             deserializer, decoder, table_name, stream_version, state, checkpoints):
+    '''
+    Write the records of the `shards` which are not finished yet one shard
+    after another, in the order they are described. A closed shard is added
+    to the `finished_shards` set once all its records are written.
+    '''
+    rows_synced = 0
+
+    for shard in shards:
+        # Only sync shards which we have not fully synced already
+        if shard['ShardId'] in finished_shards:
+            continue
+
+        # The images of the records are deserialized from the raw
+        # responses if it is enabled, `deserialize_item` returns them as is
+        with raw_response.decoding(decoder):
+            rows_synced += sync_shard(shard, seq_number_bookmarks,
+                                      streams_client, stream_arn, projection, deserializer,
+                                      table_name, stream_version, state, checkpoints=checkpoints)
+
+        # An open shard is continued after its bookmarked sequence
+        # number by the next sync
+        if tailing.is_open(shard):
+            continue
+
+        # Now that we have fully synced the shard, move it from the
+        # shard_seq_numbers to finished_shards.
+        finished_shards.add(shard['ShardId'])
+        state = shard_state.write_finished_shards(state, table_name, finished_shards)
+
+        if seq_number_bookmarks.get(shard['ShardId']):
+            seq_number_bookmarks.pop(shard['ShardId'])
+            state = singer.write_bookmark(state, table_name, 'shard_seq_numbers', seq_number_bookmarks)
+
+        checkpoints.update(state)
 
-    singer.write_state(state)
     return rows_synced
 
 def prepare_projection(projection, expression, exp_key_traverse):
@@ -174,7 +370,7 @@ def sync(config, state, stream):
                 raise Exception("No projection is available for the expression keys: {}.".format(exp_key_traverse))
     # Write activate version message
     stream_version = singer.get_bookmark(state, table_name, 'version')
-    singer.write_version(table_name, stream_version)
+    output.write_version(table_name, stream_version)
 
     table = client.describe_table(TableName=table_name)['Table']
     stream_arn = table['LatestStreamArn']
@@ -186,48 +382,52 @@ def sync(config, state, stream):
     if not seq_number_bookmarks:
         seq_number_bookmarks = {}
 
-    # Get the list of closed shards which we have fully synced. These
+    # Get the set of closed shards which we have fully synced. These
     # are removed after performing a sync and not seeing the shardId
     # returned by get_shards() because at that point the shard has been
     # killed by DynamoDB and will not be returned anymore
-    finished_shard_bookmarks = singer.get_bookmark(state, table_name, 'finished_shards')
-    if not finished_shard_bookmarks:
-        finished_shard_bookmarks = []
-
-    # The list of shardIds we found this sync. Is used to determine which
-    # finished_shard_bookmarks to kill
-    found_shards = []
+    finished_shards = shard_state.read_finished_shards(state, table_name)
 
-    deserializer = deserialize.Deserializer()
-
-    rows_synced = 0
+    deserializer = deserialize.Deserializer(number_mode=metadata.get(md_map, (), 'tap-dynamodb.number-mode'))
+    decoder = raw_response.get_decoder(config, deserializer)
+    if decoder is not None:
+        raw_response.register(streams_client)
 
-    for shard in get_shards(streams_client, stream_arn):
-        found_shards.append(shard['ShardId'])
-        # Only sync shards which we have not fully synced already
-        if shard['ShardId'] not in finished_shard_bookmarks:
-            rows_synced += sync_shard(shard, seq_number_bookmarks,
-                                      streams_client, stream_arn, projection, deserializer,
-                                      table_name, stream_version, state)
+    # Open shards are only read if tailing is enabled in the config
+    include_open = tailing.SETTINGS['enabled']
 
-        # Now that we have fully synced the shard, move it from the
-        # shard_seq_numbers to finished_shards.
-        finished_shard_bookmarks.append(shard['ShardId'])
-        state = singer.write_bookmark(state, table_name, 'finished_shards', finished_shard_bookmarks)
+    shard_workers = get_positive_int_metadata(md_map, 'tap-dynamodb.shard-workers', 'shard workers', MAX_SHARD_WORKERS)
 
-        if seq_number_bookmarks.get(shard['ShardId']):
-            seq_number_bookmarks.pop(shard['ShardId'])
-            state = singer.write_bookmark(state, table_name, 'shard_seq_numbers', seq_number_bookmarks)
+    rows_synced = 0
+    # The bookmarks are updated in memory and only written once a threshold
+    # of the checkpoint policy is reached, instead of after every shard
+    checkpoints = checkpoint.CheckpointPolicy()
+
+    try:
+        shards = get_cached_shards(streams_client, stream_arn, state, table_name, include_open=include_open)
+        # The set of shardIds we found this sync. Is used to determine which
+        # finished_shards to kill
+        found_shards = {shard['ShardId'] for shard in shards}
+
+        if shard_workers is not None and shard_workers > 1:
+            rows_synced += sync_shards(shards, shard_workers, seq_number_bookmarks, finished_shards,
+                                       streams_client, stream_arn, projection, deserializer, decoder,
+                                       table_name, stream_version, state, checkpoints)
+        else:
+            rows_synced += sync_shards_sequentially(shards, seq_number_bookmarks, finished_shards,
+                                                    streams_client, stream_arn, projection, deserializer, decoder,
+                                                    table_name, stream_version, state, checkpoints)
 
-        singer.write_state(state)
+        # Remove the shards which are no longer appearing when we query for get_shards
+        finished_shards &= found_shards
+        state = shard_state.write_finished_shards(state, table_name, finished_shards)
 
-    for shardId in finished_shard_bookmarks:
-        if shardId not in found_shards:
-            # Remove this shard because its no longer appearing when we query for get_shards
-            finished_shard_bookmarks.remove(shardId)
-            state = singer.write_bookmark(state, table_name, 'finished_shards', finished_shard_bookmarks)
+        checkpoints.write(state)
+    finally:
+        # the bookmarks in memory only cover the records written so far
+        checkpoints.write_pending(state)
 
-    singer.write_state(state)
+    rate_limiter.STREAMS_GOVERNOR.log_throttles(stream_arn, table_name)
 
     return rows_synced
 
@@ -242,10 +442,14 @@ def has_stream_aged_out(state, table_name):
     and shards close after 4 hours. 24-4 = 20 and we gave 30 minutes of
     wiggle room because I don't trust AWS.
     See https://aws.amazon.com/blogs/database/dynamodb-streams-use-cases-and-design-patterns/
+
+    Until the first successful sync, an interrupted initial full table sync
+    ages from the time `get_initial_bookmarks` bookmarked the shards.
     '''
     current_time = singer.utils.now()
 
-    success_timestamp = singer.get_bookmark(state, table_name, 'success_timestamp')
+    success_timestamp = singer.get_bookmark(state, table_name, 'success_timestamp') or \
+        singer.get_bookmark(state, table_name, 'initial_bookmarks_timestamp')
 
     # If we have no success_timestamp then we have aged out
     if not success_timestamp:
@@ -265,19 +469,58 @@ def has_stream_aged_out(state, table_name):
 def get_initial_bookmarks(config, state, table_name):
     '''
     Returns the state including all bookmarks necessary for the initial
-    full table sync
+    full table sync. Closed shards are finished, and open shards are
+    bookmarked at their latest sequence number because the full table sync
+    already covers the records written before it starts. The time of the
+    bookmarks is kept, see `has_stream_aged_out`.
     '''
-    # TODO This can be improved by getting the max sequence number in the
-    # open shards and include those in the seq_number bookmark
-
-
     client = dynamodb.get_client(config)
     streams_client = dynamodb.get_stream_client(config)
 
     table = client.describe_table(TableName=table_name)['Table']
     stream_arn = table['LatestStreamArn']
 
-    finished_shard_bookmarks = [shard['ShardId'] for shard in get_shards(streams_client, stream_arn)]
-    state = singer.write_bookmark(state, table_name, 'finished_shards', finished_shard_bookmarks)
+    finished_shards = set()
+    seq_number_bookmarks = {}
+    for shard in get_cached_shards(streams_client, stream_arn, state, table_name, include_open=True):
+        if not tailing.is_open(shard):
+            finished_shards.add(shard['ShardId'])
+            continue
+
+        seq_number = get_latest_sequence_number(streams_client, stream_arn, shard)
+        if seq_number:
+            seq_number_bookmarks[shard['ShardId']] = seq_number
+
+    state = shard_state.write_finished_shards(state, table_name, finished_shards)
+    state = singer.write_bookmark(state, table_name, 'shard_seq_numbers', seq_number_bookmarks)
+    state = singer.write_bookmark(state, table_name, 'initial_bookmarks_timestamp',
+                                  singer.utils.strftime(singer.utils.now()))
 
     return state
+
+
+def get_latest_sequence_number(streams_client, stream_arn, shard):
+    '''
+    Returns the sequence number of the last record of an open shard, or None
+    if it has no records yet.
+
+    The shard is read from TRIM_HORIZON until the first empty page, which is
+    returned once the iterator caught up with the shard. The records are not
+    written. An empty page before the end of the shard only means that some
+    records are read again by the next sync.
+    '''
+    shard_iterator = rate_limiter.call_streams(stream_arn, shard['ShardId'], streams_client.get_shard_iterator,
+                                               StreamArn=stream_arn, ShardId=shard['ShardId'],
+                                               ShardIteratorType='TRIM_HORIZON')['ShardIterator']
+
+    seq_number = None
+    while shard_iterator:
+        records = rate_limiter.call_streams(stream_arn, shard['ShardId'], streams_client.get_records,
+                                            ShardIterator=shard_iterator, Limit=1000)
+        if not records['Records']:
+            break
+
+        seq_number = records['Records'][-1]['dynamodb']['SequenceNumber']
+        shard_iterator = records.get('NextShardIterator')
+
+    return seq_number
@@ -0,0 +1,96 @@
+import base64
+import singer
+from tap_dynamodb import dynamodb
+
+LOGGER = singer.get_logger()
+
+# Upper bound of the `tap-dynamodb.query-workers` metadata
+MAX_QUERY_WORKERS = 1000
+
+# Placeholder of the partition key in the key condition expression, which
+# can not collide with the `#` placeholders of the expression attributes
+PARTITION_KEY_NAME = '#tap_dynamodb_partition_key'
+
+
+def get_key_schema(table, index_name):
+    '''
+    Return the partition and sort key attribute names of the table, or of
+    the global or local secondary index `index_name`
+    '''
+    if index_name:
+        indexes = table.get('GlobalSecondaryIndexes', []) + table.get('LocalSecondaryIndexes', [])
+        matching = [index for index in indexes if index['IndexName'] == index_name]
+        if not matching:
+            raise Exception("Invalid query index: {}. It should be an index of table {}.".format(
+                index_name, table['TableName']))
+        key_schema = matching[0]['KeySchema']
+    else:
+        key_schema = table['KeySchema']
+
+    keys = {key['KeyType']: key['AttributeName'] for key in key_schema}
+    return keys['HASH'], keys.get('RANGE')
+
+
+def get_attribute_type(table, attribute_name):
+    for attribute in table['AttributeDefinitions']:
+        if attribute['AttributeName'] == attribute_name:
+            return attribute['AttributeType']
+    return None
+
+
+def serialize_key_value(attribute_type, value):
+    '''
+    Return the typed attribute value of a partition key value from the
+    metadata. Binary values are base64 encoded, the way they are written.
+    '''
+    if attribute_type == 'B':
+        return {'B': base64.b64decode(value)}
+    return {attribute_type: str(value)}
+
+
+def query_table(table_name, key_condition, expression_names, expression_values, projection, config,
+                index_name=None, exclusive_start_key=None, client=None, limiter=None, filter_expression=None):
+    '''
+    Get the items matching `key_condition` by using the `query()` method, in
+    ascending order of the sort key. With a `filter_expression` only the
+    matching items are returned.
+    '''
+    query_params = {
+        'TableName': table_name,
+        'KeyConditionExpression': key_condition,
+        'ExpressionAttributeNames': expression_names,
+        'ExpressionAttributeValues': expression_values,
+        'ScanIndexForward': True,
+        'Limit': 1000,
+        'ReturnConsumedCapacity': 'TOTAL'
+    }
+
+    if index_name:
+        query_params['IndexName'] = index_name
+    # add the projection expression in the parameters to the `query`
+    if projection is not None and projection != '':
+        query_params['ProjectionExpression'] = projection
+    if filter_expression:
+        query_params['FilterExpression'] = filter_expression
+    if exclusive_start_key is not None:
+        query_params['ExclusiveStartKey'] = exclusive_start_key
+
+    if client is None:
+        client = dynamodb.get_client(config)
+    has_more = True
+    LOGGER.info('Querying table %s with params:', table_name)
+    for key, value in query_params.items():
+        LOGGER.info('\t%s = %s', key, value)
+
+    while has_more:
+        if limiter is not None:
+            limiter.acquire()
+        result = client.query(**query_params)
+        if limiter is not None:
+            limiter.consume(result)
+        yield result
+
+        if result.get('LastEvaluatedKey'):
+            query_params['ExclusiveStartKey'] = result['LastEvaluatedKey']
+
+        has_more = result.get('LastEvaluatedKey', False)
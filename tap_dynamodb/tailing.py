@@ -0,0 +1,101 @@
+import collections
+import time
+
+from tap_dynamodb import output
+from tap_dynamodb.config import get_number
+
+# By default an open shard is read until this many pages in a row come back
+# empty or this many seconds have passed. 0 disables a limit.
+TAIL_EMPTY_PAGES = 5
+TAIL_SECONDS = 60.0
+TAIL_RECORDS = 0
+
+# Seconds to wait before polling an open shard again after an empty page
+TAIL_POLL_INTERVAL = 1.0
+
+# The settings of the run, see `configure`
+SETTINGS = {
+    'enabled': False,
+    'empty_pages': TAIL_EMPTY_PAGES,
+    'seconds': TAIL_SECONDS,
+    'records': TAIL_RECORDS,
+}
+
+# The limits of the polling of an open shard, 0 disables a limit
+TailLimits = collections.namedtuple('TailLimits', ['empty_pages', 'seconds', 'records'])
+
+
+def is_open(shard):
+    '''
+    Open shards have no EndingSequenceNumber yet, see
+    https://docs.aws.amazon.com/amazondynamodb/latest/APIReference/API_streams_DescribeStream.html
+    '''
+    return not shard['SequenceNumberRange'].get('EndingSequenceNumber')
+
+
+class ShardTail():
+    '''
+    Bounds the polling of an open shard, which never runs out of pages.
+
+    `add_page` is called with the record count of every page and returns
+    True once the shard has returned `empty_pages` empty pages in a row,
+    `records` records or has been polled for `seconds` seconds, from the
+    `TailLimits` given or else from the settings of the run.
+    '''
+
+    def __init__(self, limits=None, clock=time.monotonic, sleep=time.sleep):
+        if limits is None:
+            limits = TailLimits(SETTINGS['empty_pages'], SETTINGS['seconds'], SETTINGS['records'])
+        self.limits = limits
+        self._clock = clock
+        self._sleep = sleep
+        self._started_at = clock()
+        self._empty_pages_in_a_row = 0
+        self._records_read = 0
+
+    def add_page(self, record_count):
+        self._records_read += record_count
+        if record_count:
+            self._empty_pages_in_a_row = 0
+        else:
+            self._empty_pages_in_a_row += 1
+
+        limits = self.limits
+        if limits.empty_pages and self._empty_pages_in_a_row >= limits.empty_pages:
+            return True
+        if limits.records and self._records_read >= limits.records:
+            return True
+        if limits.seconds and self._clock() - self._started_at >= limits.seconds:
+            return True
+
+        if not record_count:
+            # the buffered messages are only flushed when another one is
+            # written, so they are written out before waiting
+            output.flush()
+            # give the shard time to receive new records
+            self._sleep(TAIL_POLL_INTERVAL)
+        return False
+
+
+def get_bool_config(config, key):
+    value = config.get(key)
+    if isinstance(value, str):
+        return value.lower() not in ('false', '0', '')
+    return bool(value)
+
+
+def get_limit_config(config, key, default, convert):
+    return get_number(config.get(key), key, default, convert)
+
+
+def configure(config):
+    '''
+    Enable the tailing of open shards with `tail_open_shards` and set its
+    limits from the config
+    '''
+    SETTINGS['enabled'] = get_bool_config(config, 'tail_open_shards')
+    SETTINGS['empty_pages'] = get_limit_config(config, 'tail_empty_pages', TAIL_EMPTY_PAGES, int)
+    SETTINGS['seconds'] = get_limit_config(config, 'tail_seconds', TAIL_SECONDS, float)
+    SETTINGS['records'] = get_limit_config(config, 'tail_records', TAIL_RECORDS, int)
+    if SETTINGS['enabled'] and not (SETTINGS['empty_pages'] or SETTINGS['seconds'] or SETTINGS['records']):
+        raise Exception("Invalid tail limits: tail_empty_pages, tail_seconds or tail_records should be greater than 0.")
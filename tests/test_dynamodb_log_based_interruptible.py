@@ -99,7 +99,18 @@ class DynamoDBLogBased(TestDynamoDBBase):
             # The first sync should only have 1 shard, but theoretically this is not
             # gauranteed
             # This should result in the next sync having 10 messages
-            shard_id_to_remove = state['bookmarks'][table_name]['finished_shards'].pop()
+            # finished_shards holds the common prefix and the comma separated rest of the shard IDs,
+            # the list of IDs written back is the format of earlier versions, which is still read
+            finished_shards = state['bookmarks'][table_name]['finished_shards']
+            finished_shard_ids = [finished_shards['prefix'] + suffix for suffix in finished_shards['ids'].split(',')]
+            shard_id_to_remove = finished_shard_ids.pop()
+            state['bookmarks'][table_name]['finished_shards'] = finished_shard_ids
+            # the finished shard stays in the shard catalog, so it is read again
+            # the catalog holds batches of the common prefix and the comma separated `id/parent` rest of the shard IDs
+            catalog_shard_ids = [batch['prefix'] + shard.split('/')[0]
+                                 for batch in state['bookmarks'][table_name]['shard_catalog']['shards']
+                                 for shard in batch['ids'].split(',')]
+            self.assertIn(shard_id_to_remove, catalog_shard_ids)
             shard_from_dynamodb = self.get_shard(table_name, shard_id_to_remove)
             shard_to_removed_last_sequence_number = shard_from_dynamodb['SequenceNumberRange']['EndingSequenceNumber']
             new_shard_last_sequence_number = int(shard_to_removed_last_sequence_number) - 10
@@ -189,7 +200,7 @@ class DynamoDBLogBased(TestDynamoDBBase):
             self.assertIsNotNone(first_versions[table_name])
 
             # Write state with missing finished_shards so it
-            # re-reads data from all shards
+            # describes the whole stream again and re-reads data from all shards
             # This should result in the next sync having same number of records
             # as the full table sync
             state['bookmarks'][table_name].pop('finished_shards')
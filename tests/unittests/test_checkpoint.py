@@ -0,0 +1,94 @@
+import unittest
+from unittest import mock
+from tap_dynamodb import checkpoint
+from tap_dynamodb.sync_strategies import log_based
+
+class FakeClock():
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+def make_stream_record(sequence_number):
+    return {'eventName': 'INSERT',
+            'dynamodb': {'NewImage': {'id': {'N': str(sequence_number)}}, 'SequenceNumber': str(sequence_number)}}
+
+@mock.patch('tap_dynamodb.output.write_state')
+class TestCheckpointPolicy(unittest.TestCase):
+
+    def test_write_on_record_count(self, mock_write_state):
+        """Verify the state is written once the record threshold is reached"""
+        policy = checkpoint.CheckpointPolicy(interval=0, records=3, clock=FakeClock())
+        policy.update({}, records=2)
+        self.assertEqual(mock_write_state.call_count, 0)
+        policy.update({}, records=1)
+        self.assertEqual(mock_write_state.call_count, 1)
+        policy.update({}, records=2)
+        self.assertEqual(mock_write_state.call_count, 1)
+
+    def test_write_on_interval(self, mock_write_state):
+        """Verify the state is written once the interval has passed since the last state message"""
+        clock = FakeClock()
+        policy = checkpoint.CheckpointPolicy(interval=10, records=0, clock=clock)
+        policy.update({}, records=1000)
+        self.assertEqual(mock_write_state.call_count, 0)
+        clock.now = 10
+        policy.update({})
+        self.assertEqual(mock_write_state.call_count, 1)
+        clock.now = 15
+        policy.update({})
+        self.assertEqual(mock_write_state.call_count, 1)
+
+    def test_without_thresholds(self, mock_write_state):
+        """Verify every update is written if both thresholds are disabled"""
+        policy = checkpoint.CheckpointPolicy(interval=0, records=0, clock=FakeClock())
+        policy.update({})
+        policy.update({})
+        self.assertEqual(mock_write_state.call_count, 2)
+
+    def test_write_pending(self, mock_write_state):
+        """Verify the pending state is only written if a bookmark was updated since the last state message"""
+        policy = checkpoint.CheckpointPolicy(interval=0, records=10, clock=FakeClock())
+        policy.write_pending({})
+        self.assertEqual(mock_write_state.call_count, 0)
+        policy.update({'bookmarks': {}}, records=1)
+        policy.write_pending({'bookmarks': {}})
+        mock_write_state.assert_called_once_with({'bookmarks': {}})
+        policy.write_pending({})
+        self.assertEqual(mock_write_state.call_count, 1)
+
+    def test_configure(self, mock_write_state):
+        """Verify the thresholds are read from the config and validated"""
+        with mock.patch.dict(checkpoint.SETTINGS):
+            checkpoint.configure({'checkpoint_interval': '2.5', 'checkpoint_records': '0'})
+            policy = checkpoint.CheckpointPolicy()
+            self.assertEqual((policy.interval, policy.records), (2.5, 0))
+            with self.assertRaises(Exception) as e:
+                checkpoint.configure({'checkpoint_records': 'many'})
+            self.assertEqual(str(e.exception), "Invalid checkpoint_records: many. It should be an integer.")
+
+    @mock.patch('tap_dynamodb.output.write_record')
+    @mock.patch('tap_dynamodb.sync_strategies.log_based.get_shard_record_pages')
+    def test_sync_shard_updates_bookmarks_in_memory(self, mock_get_shard_record_pages, mock_write_record,
+                                                    mock_write_state):
+        """Verify the sequence numbers are bookmarked in memory and the state is only written on the thresholds"""
+        mock_get_shard_record_pages.return_value = [[make_stream_record(1), make_stream_record(2)],
+                                                    [make_stream_record(3), make_stream_record(4)],
+                                                    [], [make_stream_record(5)]]
+        state = {}
+        seq_number_bookmarks = {}
+        policy = checkpoint.CheckpointPolicy(interval=0, records=2, clock=FakeClock())
+
+        with mock.patch.object(policy, 'update', wraps=policy.update) as mock_update:
+            rows = log_based.sync_shard({'ShardId': 'shard'}, seq_number_bookmarks, None, 'arn', None,
+                                        log_based.deserialize.Deserializer(), 'table', 1, state, checkpoints=policy)
+
+        self.assertEqual(rows, 5)
+        # once per page and once at the end of the shard
+        self.assertEqual(mock_update.call_count, 5)
+        self.assertEqual(mock_write_state.call_count, 2)
+        self.assertEqual(state, {'bookmarks': {'table': {'shard_seq_numbers': {'shard': '5'}}}})
+        # the records after the last state message are still pending
+        policy.write_pending(state)
+        self.assertEqual(mock_write_state.call_count, 3)
@@ -0,0 +1,56 @@
+import unittest
+from unittest import mock
+from tap_dynamodb import dynamodb
+
+@mock.patch('boto3.client', side_effect=lambda *args, **kwargs: mock.Mock())
+class TestClientCache(unittest.TestCase):
+    '''
+    Test that the clients are shared by the whole run
+    '''
+    def setUp(self):
+        dynamodb.clear_client_cache()
+
+    def tearDown(self):
+        dynamodb.clear_client_cache()
+
+    def test_client_is_reused(self, mock_client):
+        """Verify the same client is returned for the same config"""
+        config = {"region_name": "dummy_region"}
+        self.assertIs(dynamodb.get_client(config), dynamodb.get_client(dict(config)))
+        self.assertEqual(mock_client.call_count, 1)
+
+    def test_clients_are_keyed_by_service_region_and_timeout(self, mock_client):
+        """Verify a new client is created for another service, region or request timeout"""
+        client = dynamodb.get_client({"region_name": "dummy_region"})
+        self.assertIsNot(client, dynamodb.get_stream_client({"region_name": "dummy_region"}))
+        self.assertIsNot(client, dynamodb.get_client({"region_name": "other_region"}))
+        self.assertIsNot(client, dynamodb.get_client({"region_name": "dummy_region", "request_timeout": 10}))
+        self.assertIsNot(client, dynamodb.get_client({"region_name": "dummy_region", "use_local_dynamo": "true"}))
+        self.assertEqual(mock_client.call_count, 5)
+
+    def test_clear_client_cache(self, mock_client):
+        """Verify a new client is created once the cache is cleared"""
+        config = {"region_name": "dummy_region"}
+        client = dynamodb.get_client(config)
+        dynamodb.clear_client_cache()
+        self.assertIsNot(client, dynamodb.get_client(config))
+
+    @mock.patch("tap_dynamodb.dynamodb.Config")
+    def test_connection_settings(self, mock_config, mock_client):
+        """Verify the connection pool, keepalive and retry settings are read from the config"""
+        config = {"region_name": "dummy_region", "max_pool_connections": "100",
+                  "tcp_keepalive": "false", "retry_mode": "standard"}
+        dynamodb.get_client(config)
+        mock_config.assert_any_call(max_pool_connections=100, tcp_keepalive=False, retries={'mode': 'standard'})
+
+    @mock.patch("tap_dynamodb.dynamodb.Config")
+    def test_default_connection_settings(self, mock_config, mock_client):
+        """Verify the default connection pool and keepalive settings, which keep the retry mode of botocore"""
+        dynamodb.get_stream_client({"region_name": "dummy_region"})
+        mock_config.assert_any_call(max_pool_connections=dynamodb.MAX_POOL_CONNECTIONS, tcp_keepalive=True)
+
+    def test_invalid_retry_mode(self, mock_client):
+        """Verify an invalid retry mode raises an exception"""
+        with self.assertRaises(Exception) as e:
+            dynamodb.get_client({"region_name": "dummy_region", "retry_mode": "fast"})
+        self.assertEqual(str(e.exception), "Invalid retry_mode: fast. It should be one of legacy, standard or adaptive.")
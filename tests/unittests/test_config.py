@@ -0,0 +1,28 @@
+import unittest
+from tap_dynamodb.config import get_number
+
+class TestGetNumber(unittest.TestCase):
+
+    def test_values(self):
+        """Verify the values are converted, and the default is returned if they are not set"""
+        self.assertEqual(get_number('4', 'workers'), 4)
+        self.assertEqual(get_number('0.5', 'seconds', convert=float), 0.5)
+        self.assertEqual(get_number(None, 'workers', 3), 3)
+        self.assertEqual(get_number('', 'workers', 3), 3)
+        self.assertEqual(get_number('-2', 'priority', minimum=None), -2)
+
+    def test_invalid_values(self):
+        """Verify the values which are not numbers or out of bounds raise an exception"""
+        cases = [
+            (('x', 'workers'), {}, "Invalid workers: x. It should be an integer."),
+            (('x', 'seconds'), {'convert': float}, "Invalid seconds: x. It should be a number."),
+            (('-1', 'workers'), {}, "Invalid workers: -1. It should not be negative."),
+            (('0', 'workers'), {'minimum': 1}, "Invalid workers: 0. It should be at least 1."),
+            (('0', 'rate'), {'convert': float, 'exclusive_minimum': True}, "Invalid rate: 0.0. It should be greater than 0."),
+            (('11', 'workers'), {'minimum': 1, 'maximum': 10}, "Invalid workers: 11. It should be between 1 and 10."),
+        ]
+        for args, kwargs, message in cases:
+            with self.subTest(message=message):
+                with self.assertRaises(Exception) as e:
+                    get_number(*args, **kwargs)
+                self.assertEqual(str(e.exception), message)
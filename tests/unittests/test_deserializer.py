@@ -1,4 +1,7 @@
+import decimal
 import unittest
+from unittest import mock
+import singer
 from tap_dynamodb import deserialize
 
 class TestDeserializer(unittest.TestCase):
@@ -128,3 +131,191 @@ class TestDeserializer(unittest.TestCase):
         output = deserializer.apply_projection(mock_record, mock_projections)
         # veriy that we get no error when add list projection in decreasing order and it is not found
         self.assertEqual(output, {'metadata': [{'inner_metadata': 'Test'}]})
+
+class TestDeserializeItem(unittest.TestCase):
+
+    item = {
+        'id': {'N': '1'},
+        'name': {'S': 'No One You Know'},
+        'active': {'BOOL': False},
+        'deleted_at': {'NULL': True},
+        'price': {'N': '12.50'},
+        'payload': {'B': b'binary data'},
+        'tags': {'SS': ['a', 'b']},
+        'counters': {'NS': ['1', '2.5']},
+        'blobs': {'BS': [b'a', b'b']},
+        'empty_map': {'M': {}},
+        'empty_list': {'L': []},
+        'address': {'M': {'street': {'S': 'Main'},
+                          'geo': {'M': {'lat': {'N': '52.52'}, 'lng': {'N': '13.405'}}}}},
+        'events': {'L': [{'M': {'type': {'S': 'click'}, 'at': {'L': [{'N': '1'}, {'NULL': True}]}}},
+                         {'L': [{'S': 'nested'}, {'M': {}}]},
+                         {'N': '3'}]},
+    }
+
+    def test_output_matches_recursive_deserializer(self):
+        '''
+            Verify that deserialize_item produces the same output as the recursive TypeDeserializer path
+        '''
+        deserializer = deserialize.Deserializer()
+        expected = deserializer.deserialize({'M': self.item})
+        self.assertEqual(deserializer.deserialize_item(self.item), expected)
+        self.assertEqual(expected['payload'], 'YmluYXJ5IGRhdGE=')
+        self.assertEqual(expected['events'][0]['at'], [1, None])
+
+    def test_deeply_nested_item(self):
+        '''
+            Verify that deeply nested maps and lists are deserialized
+        '''
+        item = {'leaf': {'S': 'value'}}
+        for depth in range(200):
+            if depth % 2:
+                item = {'level_{}'.format(depth): {'M': item}}
+            else:
+                item = {'list': {'L': [{'N': str(depth)}, {'M': item}]}}
+        deserializer = deserialize.Deserializer()
+        self.assertEqual(deserializer.deserialize_item(item), deserializer.deserialize({'M': item}))
+
+    def test_empty_type_raises_type_error(self):
+        '''
+            Verify that an attribute without a type raises the same error as TypeDeserializer
+        '''
+        deserializer = deserialize.Deserializer()
+        with self.assertRaises(TypeError):
+            deserializer.deserialize_item({'id': {}})
+
+    def test_unsupported_type_raises_type_error(self):
+        '''
+            Verify that an unsupported type raises the same error as TypeDeserializer
+        '''
+        deserializer = deserialize.Deserializer()
+        with self.assertRaises(TypeError) as e:
+            deserializer.deserialize_item({'id': {'X': '1'}})
+        self.assertEqual(str(e.exception), 'Dynamodb type X is not supported')
+
+class TestDeserializeNumber(unittest.TestCase):
+
+    def test_integers_are_deserialized_as_int(self):
+        '''
+            Verify that integers within the safe range are deserialized as int
+        '''
+        for value, expected in [('0', 0), ('42', 42), ('-42', -42), ('007', 7), ('999999999999999', 999999999999999)]:
+            number = deserialize.deserialize_number(value)
+            self.assertIs(type(number), int)
+            self.assertEqual(number, expected)
+
+    def test_other_numbers_are_deserialized_as_decimal(self):
+        '''
+            Verify that numbers outside of the integer fast path keep the Decimal semantics
+        '''
+        for value in ['1.5', '-0', '1E+2', '1000000000000000', '-1000000000000000', '0.1']:
+            number = deserialize.deserialize_number(value)
+            self.assertIsInstance(number, decimal.Decimal)
+            self.assertEqual(str(number), value)
+
+    def test_overflow_is_still_trapped(self):
+        '''
+            Verify that numbers too large for the singer context still raise an error
+        '''
+        with self.assertRaises(decimal.Overflow):
+            deserialize.deserialize_number('1E+300')
+        with self.assertRaises(decimal.Overflow):
+            deserialize.deserialize_number_as_float('1E+300')
+
+    def test_json_output_is_unchanged(self):
+        '''
+            Verify that the record messages are JSON encoded as with the Decimal deserializer
+        '''
+        item = {'id': {'N': '12'}, 'price': {'N': '-3.50'}, 'counters': {'NS': ['1', '-2', '30']}}
+        fast = singer.format_message(singer.RecordMessage(stream='table', record=deserialize.Deserializer().deserialize_item(item)))
+        expected = {key: ([deserialize.SINGER_CONTEXT.create_decimal(n) for n in value['NS']] if 'NS' in value
+                          else deserialize.SINGER_CONTEXT.create_decimal(value['N']))
+                    for key, value in item.items()}
+        self.assertEqual(fast, singer.format_message(singer.RecordMessage(stream='table', record=expected)))
+
+    def test_float_mode(self):
+        '''
+            Verify that the float mode only returns floats which round-trip to the same value
+        '''
+        deserializer = deserialize.Deserializer(number_mode='float')
+        record = deserializer.deserialize_item({'a': {'N': '0.1'}, 'b': {'N': '12'}, 'c': {'N': '2.0'},
+                                                'd': {'N': '0.12345678901234567890'}, 'e': {'NS': ['1.25']}})
+        self.assertIs(type(record['a']), float)
+        self.assertEqual(record['a'], 0.1)
+        self.assertIs(type(record['b']), int)
+        # integral values keep their Decimal representation
+        self.assertEqual(record['c'], decimal.Decimal('2.0'))
+        self.assertIsInstance(record['c'], decimal.Decimal)
+        # the float would lose precision
+        self.assertEqual(record['d'], decimal.Decimal('0.12345678901234567890'))
+        self.assertIsInstance(record['d'], decimal.Decimal)
+        self.assertEqual(record['e'], [1.25])
+
+    def test_invalid_number_mode(self):
+        '''
+            Verify that an unknown number mode raises an exception
+        '''
+        with self.assertRaises(Exception) as e:
+            deserialize.Deserializer(number_mode='int')
+        self.assertEqual(str(e.exception), "Invalid number mode: int. It should be one of decimal, float.")
+
+    def test_compile_projection(self):
+        '''
+            Verify that the breadcrumbs are compiled into the steps to their last part and the last part
+        '''
+        plan = deserialize.compile_projection([['Artist'], ['test1[4]', 'Name'], ['a', 'b[10]']])
+        self.assertEqual(plan, ((((), ('Artist', None))),
+                                ((('test1', 4),), ('Name', None)),
+                                ((('a', None),), ('b', 10))))
+
+    def test_projection_plan_is_reused(self):
+        '''
+            Verify that a projection is only compiled again if another list of breadcrumbs is applied
+        '''
+        deserializer = deserialize.Deserializer()
+        projections = [['Artist'], ['metadata[0]']]
+        deserializer.apply_projection({'Artist': 'a'}, projections)
+        plan = deserializer._projection_plan
+        output = deserializer.apply_projection({'Artist': 'b', 'metadata': ['c']}, projections)
+        self.assertIs(deserializer._projection_plan, plan)
+        self.assertEqual(output, {'Artist': 'b', 'metadata': ['c']})
+
+        output = deserializer.apply_projection({'Artist': 'b'}, [['Title']])
+        self.assertIsNot(deserializer._projection_plan, plan)
+        self.assertEqual(output, {'Title': None})
+
+    def test_compile_selection(self):
+        '''
+            Verify that the selection holds the attributes read by the projection
+        '''
+        plan = deserialize.compile_projection([['Artist'], ['test1[4]', 'Name'], ['a', 'b[1]'], ['a', 'c'],
+                                               ['d', 'e'], ['d'], ['f[-1]']])
+        self.assertEqual(deserialize.compile_selection(plan),
+                         {'Artist': None,
+                          'test1': ('L', {4: ('M', {'Name': None})}),
+                          'a': ('M', {'b': ('L', {1: None}), 'c': None}),
+                          'd': None,
+                          'f': None})
+
+    def test_deserialize_projected_item(self):
+        '''
+            Verify that only the projected attributes are deserialized and the projection gives the same output
+        '''
+        item = {'Artist': {'S': 'No One You Know'},
+                'metadata': {'L': [{'B': b'skipped'}, {'M': {'Name': {'S': 'a'}, 'Cover': {'B': b'skipped'}}}]},
+                'info': {'M': {'Genre': {'BS': [b'skipped']}}},
+                'Cover': {'B': b'skipped'},
+                'Sizes': {'NS': ['1', '2']}}
+        projections = [['Artist'], ['metadata[1]', 'Name'], ['info', 'Year'], ['Sizes']]
+
+        deserializer = deserialize.Deserializer()
+        expected = deserializer.apply_projection(deserializer.deserialize_item(item), projections)
+        not_deserialized = mock.Mock(side_effect=AssertionError('deserialized'))
+        with mock.patch.dict(deserializer.type_deserializers, B=not_deserialized, BS=not_deserialized):
+            projected = deserializer.deserialize_projected_item(item, projections)
+
+        self.assertEqual(projected, {'Artist': 'No One You Know', 'metadata': [None, {'Name': 'a'}],
+                                     'info': {'Genre': None}, 'Sizes': [1, 2]})
+        self.assertEqual(deserializer.apply_projection(projected, projections), expected)
+        self.assertEqual(expected, {'Artist': 'No One You Know', 'metadata': [{'Name': 'a'}],
+                                    'info': {'Year': None}, 'Sizes': [1, 2]})
@@ -0,0 +1,50 @@
+import decimal
+import unittest
+from unittest import mock
+import singer
+from tap_dynamodb import encoder
+
+RECORDS = [
+    {'id': 1, 'name': 'No One You Know', 'price': decimal.Decimal('12.50'), 'active': True,
+     'deleted_at': None, 'tags': ['a', 'b'], 'payload': 'YmluYXJ5IGRhdGE=',
+     'address': {'street': 'Main', 'geo': {'lat': decimal.Decimal('52.52'), 'lng': decimal.Decimal('-1E+2')}},
+     'events': [{'type': 'click', 'at': [1, None]}, [], {}]},
+    {'unicode': 'café ☃ \U0001f600', 'quote': 'say "hi"\n\t\\', 'big': decimal.Decimal('1' * 40)},
+    {},
+]
+
+class TestRecordEncoder(unittest.TestCase):
+
+    def test_output_is_identical_to_singer(self):
+        """Verify the encoded records are byte-identical to singer.format_message"""
+        record_encoder = encoder.RecordEncoder()
+        for stream_name in ['table', 'table "quoted" é']:
+            for version in [None, 1600000000000]:
+                for record in RECORDS:
+                    expected = singer.format_message(singer.RecordMessage(stream=stream_name, record=record, version=version))
+                    self.assertEqual(record_encoder.encode_record(stream_name, record, version), expected.encode('utf-8'))
+
+    def test_default_encoder(self):
+        """Verify the simplejson encoder is used by default"""
+        self.assertIsInstance(encoder.get_record_encoder({}), encoder.RecordEncoder)
+
+    def test_invalid_encoder(self):
+        """Verify an unknown encoder raises an exception"""
+        with self.assertRaises(Exception) as e:
+            encoder.get_record_encoder({'json_encoder': 'ujson'})
+        self.assertEqual(str(e.exception), "Invalid json_encoder: ujson. It should be one of simplejson, orjson.")
+
+    @mock.patch('tap_dynamodb.encoder.orjson', None)
+    def test_orjson_not_installed(self):
+        """Verify the simplejson encoder is used when orjson is not installed"""
+        self.assertIsInstance(encoder.get_record_encoder({'json_encoder': 'orjson'}), encoder.RecordEncoder)
+
+    @unittest.skipUnless(encoder.orjson is not None and hasattr(encoder.orjson, 'Fragment'), 'orjson 3.9 or later is not installed')
+    def test_orjson_output_is_equivalent(self):
+        """Verify the orjson encoder produces the same JSON values as singer.format_message"""
+        record_encoder = encoder.get_record_encoder({'json_encoder': 'orjson'})
+        self.assertIsInstance(record_encoder, encoder.OrjsonRecordEncoder)
+        for record in RECORDS:
+            expected = singer.parse_message(singer.format_message(singer.RecordMessage(stream='table', record=record, version=1)))
+            actual = singer.parse_message(record_encoder.encode_record('table', record, 1).decode('utf-8'))
+            self.assertEqual(actual, expected)
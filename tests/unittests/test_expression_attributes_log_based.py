@@ -1,5 +1,5 @@
 import unittest
-from unittest.mock import patch
+from unittest.mock import ANY, patch
 from tap_dynamodb.sync_strategies.log_based import sync, prepare_projection
 
 CONFIG = {
@@ -34,6 +34,11 @@ class MockClient():
         '''Mock the get_shard_iterator() of the client.'''
         return {'ShardIterator': {}}
 
+def mock_metadata(projection, expression):
+    '''Mock the metadata of the stream with the given projection and expression attributes.'''
+    values = {'tap-mongodb.projection': projection, 'tap-dynamodb.expression-attributes': expression}
+    return lambda md_map, breadcrumb, key: values.get(key)
+
 class MockDeserializer():
     def __init__(self):
         return {}
@@ -48,97 +53,97 @@ client = MockClient()
 class TestExpressionAttributesInLogBasedSync(unittest.TestCase):
     """Test expression attributes for reserved word in log_based sync. Mocked some method of singer package"""
 
-    @patch('singer.metadata.get', side_effect = ["#c, Sheet", "{\"#c\": \"Comment\"}"])
+    @patch('singer.metadata.get', side_effect = mock_metadata("#c, Sheet", "{\"#c\": \"Comment\"}"))
     @patch('tap_dynamodb.sync_strategies.log_based.sync_shard', return_value = 1)
     @patch('tap_dynamodb.deserialize.Deserializer', return_value = {})
     def test_sync_with_single_expression(self, mock_deserializer, mock_sync_shard, mock_stream_client, mock_client, mock_metadata_get, mock_get_bookmark, mock_write_bookmark, mock_write_state, mock_to_map):
         """Test expression attribute for single reserve word passed in `expression` field."""
         res = sync(CONFIG, STATE, STREAM)
         
-        mock_sync_shard.assert_called_with({'SequenceNumberRange': {'EndingSequenceNumber': 'dummy_no'}, 'ShardId': 'dummy_id'}, {}, client, 'dummy_arn', [['Comment'], ['Sheet']], {}, 'GoogleDocs', {}, {})
+        mock_sync_shard.assert_called_with({'SequenceNumberRange': {'EndingSequenceNumber': 'dummy_no'}, 'ShardId': 'dummy_id'}, {}, client, 'dummy_arn', [['Comment'], ['Sheet']], {}, 'GoogleDocs', {}, {}, checkpoints=ANY)
 
-    @patch('singer.metadata.get', side_effect = ["#tst[4], #n, Test", "{\"#tst\": \"test1\", \"#n\": \"Name\"}"])
+    @patch('singer.metadata.get', side_effect = mock_metadata("#tst[4], #n, Test", "{\"#tst\": \"test1\", \"#n\": \"Name\"}"))
     @patch('tap_dynamodb.sync_strategies.log_based.sync_shard', return_value = 1)
     @patch('tap_dynamodb.deserialize.Deserializer', return_value = {})
     def test_sync_with_multiple_expression(self, mock_deserializer, mock_sync_shard, mock_stream_client, mock_client, mock_metadata_get, mock_get_bookmark, mock_write_bookmark, mock_write_state, mock_to_map):
         """Test expression attribute for multiple reserve words passed in `expression` field."""
         res = sync(CONFIG, STATE, STREAM)
         
-        mock_sync_shard.assert_called_with({'SequenceNumberRange': {'EndingSequenceNumber': 'dummy_no'}, 'ShardId': 'dummy_id'}, {}, client, 'dummy_arn', [['test1[4]'], ['Name'], ['Test']], {}, 'GoogleDocs', {}, {})
+        mock_sync_shard.assert_called_with({'SequenceNumberRange': {'EndingSequenceNumber': 'dummy_no'}, 'ShardId': 'dummy_id'}, {}, client, 'dummy_arn', [['test1[4]'], ['Name'], ['Test']], {}, 'GoogleDocs', {}, {}, checkpoints=ANY)
 
-    @patch('singer.metadata.get', side_effect =["Comment, Sheet", ""])
+    @patch('singer.metadata.get', side_effect = mock_metadata("Comment, Sheet", ""))
     @patch('tap_dynamodb.sync_strategies.log_based.sync_shard', return_value = 1)
     @patch('tap_dynamodb.deserialize.Deserializer', return_value = {})
     def test_sync_without_expression(self, mock_deserializer, mock_sync_shard, mock_stream_client, mock_client, mock_metadata_get, mock_get_bookmark, mock_write_bookmark, mock_write_state, mock_to_map):
         """Test expression attribute with empty string passed in `expression` field."""   
         res = sync(CONFIG, STATE, STREAM)
         
-        mock_sync_shard.assert_called_with({'SequenceNumberRange': {'EndingSequenceNumber': 'dummy_no'}, 'ShardId': 'dummy_id'}, {}, client, 'dummy_arn', [['Comment'], ['Sheet']], {}, 'GoogleDocs', {}, {})
+        mock_sync_shard.assert_called_with({'SequenceNumberRange': {'EndingSequenceNumber': 'dummy_no'}, 'ShardId': 'dummy_id'}, {}, client, 'dummy_arn', [['Comment'], ['Sheet']], {}, 'GoogleDocs', {}, {}, checkpoints=ANY)
 
-    @patch('singer.metadata.get', side_effect =["", ""])
+    @patch('singer.metadata.get', side_effect = mock_metadata("", ""))
     @patch('tap_dynamodb.sync_strategies.log_based.sync_shard', return_value = 1)
     @patch('tap_dynamodb.deserialize.Deserializer', return_value = {})
     def test_sync_without_projection(self, mock_deserializer, mock_sync_shard, mock_stream_client, mock_client, mock_metadata_get, mock_get_bookmark, mock_write_bookmark, mock_write_state, mock_to_map):
         """Test expression attribute with empty string passed in `projection` field."""   
         res = sync(CONFIG, STATE, STREAM)
         
-        mock_sync_shard.assert_called_with({'SequenceNumberRange': {'EndingSequenceNumber': 'dummy_no'}, 'ShardId': 'dummy_id'}, {}, client, 'dummy_arn', '', {}, 'GoogleDocs', {}, {})
+        mock_sync_shard.assert_called_with({'SequenceNumberRange': {'EndingSequenceNumber': 'dummy_no'}, 'ShardId': 'dummy_id'}, {}, client, 'dummy_arn', '', {}, 'GoogleDocs', {}, {}, checkpoints=ANY)
 
-    @patch('singer.metadata.get', side_effect =["#tst[4].#n, #tst[4].#a, Test", "{\"#tst\": \"test1\", \"#n\": \"Name\", \"#a\": \"Age\"}"])
+    @patch('singer.metadata.get', side_effect = mock_metadata("#tst[4].#n, #tst[4].#a, Test", "{\"#tst\": \"test1\", \"#n\": \"Name\", \"#a\": \"Age\"}"))
     @patch('tap_dynamodb.sync_strategies.log_based.sync_shard', return_value = 1)
     @patch('tap_dynamodb.deserialize.Deserializer', return_value = {})
     def test_sync_with_nested_expr_with_dict_and_list(self, mock_deserializer, mock_sync_shard, mock_stream_client, mock_client, mock_metadata_get, mock_get_bookmark, mock_write_bookmark, mock_write_state, mock_to_map):
         """Test expression attribute for nested reserved words with dictionary and list passed in `expression` field."""
         res = sync(CONFIG, STATE, STREAM)
         
-        mock_sync_shard.assert_called_with({'SequenceNumberRange': {'EndingSequenceNumber': 'dummy_no'}, 'ShardId': 'dummy_id'}, {}, client, 'dummy_arn', [['test1[4]', 'Name'], ['test1[4]', 'Age'], ['Test']], {}, 'GoogleDocs', {}, {})
+        mock_sync_shard.assert_called_with({'SequenceNumberRange': {'EndingSequenceNumber': 'dummy_no'}, 'ShardId': 'dummy_id'}, {}, client, 'dummy_arn', [['test1[4]', 'Name'], ['test1[4]', 'Age'], ['Test']], {}, 'GoogleDocs', {}, {}, checkpoints=ANY)
 
-    @patch('singer.metadata.get', side_effect =["#tst[4], Test", "{\"#tst\": \"test1\"}"])
+    @patch('singer.metadata.get', side_effect = mock_metadata("#tst[4], Test", "{\"#tst\": \"test1\"}"))
     @patch('tap_dynamodb.sync_strategies.log_based.sync_shard', return_value = 1)
     @patch('tap_dynamodb.deserialize.Deserializer', return_value = {})
     def test_sync_with_nested_expr_with_list(self, mock_deserializer, mock_sync_shard, mock_stream_client, mock_client, mock_metadata_get, mock_get_bookmark, mock_write_bookmark, mock_write_state, mock_to_map):
         """Test expression attribute for reserve words with list passed in `expression` field."""
         res = sync(CONFIG, STATE, STREAM)
         
-        mock_sync_shard.assert_called_with({'SequenceNumberRange': {'EndingSequenceNumber': 'dummy_no'}, 'ShardId': 'dummy_id'}, {}, client, 'dummy_arn', [['test1[4]'], ['Test']], {}, 'GoogleDocs', {}, {})
+        mock_sync_shard.assert_called_with({'SequenceNumberRange': {'EndingSequenceNumber': 'dummy_no'}, 'ShardId': 'dummy_id'}, {}, client, 'dummy_arn', [['test1[4]'], ['Test']], {}, 'GoogleDocs', {}, {}, checkpoints=ANY)
 
-    @patch('singer.metadata.get', side_effect =["#tst.#n.#a", "{\"#tst\": \"test1\", \"#n\": \"Name\", \"#a\": \"Age\"}"])
+    @patch('singer.metadata.get', side_effect = mock_metadata("#tst.#n.#a", "{\"#tst\": \"test1\", \"#n\": \"Name\", \"#a\": \"Age\"}"))
     @patch('tap_dynamodb.sync_strategies.log_based.sync_shard', return_value = 1)
     @patch('tap_dynamodb.deserialize.Deserializer', return_value = {})
     def test_sync_with_nested_expr_with_nested_dict(self, mock_deserializer, mock_sync_shard, mock_stream_client, mock_client, mock_metadata_get, mock_get_bookmark, mock_write_bookmark, mock_write_state, mock_to_map):
         """Test expression attribute for nested reserved words with nested dictionary passed in `expression` field."""
         res = sync(CONFIG, STATE, STREAM)
         
-        mock_sync_shard.assert_called_with({'SequenceNumberRange': {'EndingSequenceNumber': 'dummy_no'}, 'ShardId': 'dummy_id'}, {}, client, 'dummy_arn', [['test1', 'Name', 'Age']], {}, 'GoogleDocs', {}, {})
+        mock_sync_shard.assert_called_with({'SequenceNumberRange': {'EndingSequenceNumber': 'dummy_no'}, 'ShardId': 'dummy_id'}, {}, client, 'dummy_arn', [['test1', 'Name', 'Age']], {}, 'GoogleDocs', {}, {}, checkpoints=ANY)
 
-    @patch('singer.metadata.get', side_effect =["#tst.#f, #tf", "{\"#tst\": \"test1\", \"#f\": \"field\", \"#tf\": \"test1.field\"}"])
+    @patch('singer.metadata.get', side_effect = mock_metadata("#tst.#f, #tf", "{\"#tst\": \"test1\", \"#f\": \"field\", \"#tf\": \"test1.field\"}"))
     @patch('tap_dynamodb.sync_strategies.log_based.sync_shard', return_value = 1)
     @patch('tap_dynamodb.deserialize.Deserializer', return_value = {})
     def test_sync_with_special_character_in_field_name(self, mock_deserializer, mock_sync_shard, mock_stream_client, mock_client, mock_metadata_get, mock_get_bookmark, mock_write_bookmark, mock_write_state, mock_to_map):
         """Test expression attribute for `.` in projection field passed in `expression` field."""
         res = sync(CONFIG, STATE, STREAM)
         
-        mock_sync_shard.assert_called_with({'SequenceNumberRange': {'EndingSequenceNumber': 'dummy_no'}, 'ShardId': 'dummy_id'}, {}, client, 'dummy_arn', [['test1', 'field'], ['test1.field']], {}, 'GoogleDocs', {}, {})
+        mock_sync_shard.assert_called_with({'SequenceNumberRange': {'EndingSequenceNumber': 'dummy_no'}, 'ShardId': 'dummy_id'}, {}, client, 'dummy_arn', [['test1', 'field'], ['test1.field']], {}, 'GoogleDocs', {}, {}, checkpoints=ANY)
 
-    @patch('singer.metadata.get', side_effect =["#test, #t[1].#n", "{\"#t\": \"test1\", \"#n\": \"Name\", \"#test\": \"test\"}"])
+    @patch('singer.metadata.get', side_effect = mock_metadata("#test, #t[1].#n", "{\"#t\": \"test1\", \"#n\": \"Name\", \"#test\": \"test\"}"))
     @patch('tap_dynamodb.sync_strategies.log_based.sync_shard', return_value = 1)
     @patch('tap_dynamodb.deserialize.Deserializer', return_value = {})
     def test_sync_for_different_order_in_projections(self, mock_deserializer, mock_sync_shard, mock_stream_client, mock_client, mock_metadata_get, mock_get_bookmark, mock_write_bookmark, mock_write_state, mock_to_map):
         """Test expression attribute to check different order in projection and expression field."""
         res = sync(CONFIG, STATE, STREAM)
         
-        mock_sync_shard.assert_called_with({'SequenceNumberRange': {'EndingSequenceNumber': 'dummy_no'}, 'ShardId': 'dummy_id'}, {}, client, 'dummy_arn', [['test'], ['test1[1]', 'Name']], {}, 'GoogleDocs', {}, {})
+        mock_sync_shard.assert_called_with({'SequenceNumberRange': {'EndingSequenceNumber': 'dummy_no'}, 'ShardId': 'dummy_id'}, {}, client, 'dummy_arn', [['test'], ['test1[1]', 'Name']], {}, 'GoogleDocs', {}, {}, checkpoints=ANY)
 
-    @patch('singer.metadata.get', side_effect =["Test", None])
+    @patch('singer.metadata.get', side_effect = mock_metadata("Test", None))
     @patch('tap_dynamodb.sync_strategies.log_based.sync_shard', return_value = 1) 
     @patch('tap_dynamodb.deserialize.Deserializer', return_value = {})
     def test_sync_for_valid_proj_and_no_expr(self, mock_deserializer, mock_sync_shard, mock_stream_client, mock_client, mock_metadata_get, mock_get_bookmark, mock_write_bookmark, mock_write_state, mock_to_map):
         """Test sync should work when valid projection passed with no expressions."""
         res = sync(CONFIG, STATE, STREAM)
         
-        mock_sync_shard.assert_called_with({'SequenceNumberRange': {'EndingSequenceNumber': 'dummy_no'}, 'ShardId': 'dummy_id'}, {}, client, 'dummy_arn', [['Test']], {}, 'GoogleDocs', {}, {})
+        mock_sync_shard.assert_called_with({'SequenceNumberRange': {'EndingSequenceNumber': 'dummy_no'}, 'ShardId': 'dummy_id'}, {}, client, 'dummy_arn', [['Test']], {}, 'GoogleDocs', {}, {}, checkpoints=ANY)
 
-    @patch('singer.metadata.get', side_effect =["", "{\"#cmt\": \"Comment\"}"])
+    @patch('singer.metadata.get', side_effect = mock_metadata("", "{\"#cmt\": \"Comment\"}"))
     @patch('tap_dynamodb.sync_strategies.log_based.sync_shard', return_value = 1)
     @patch('tap_dynamodb.deserialize.Deserializer', return_value = {})
     def test_sync_for_expr_not_in_proj(self, mock_deserializer, mock_sync_shard, mock_stream_client, mock_client, mock_metadata_get, mock_get_bookmark, mock_write_bookmark, mock_write_state, mock_to_map):
@@ -149,7 +154,7 @@ class TestExpressionAttributesInLogBasedSync(unittest.TestCase):
             expected_error_message = "No projection is available for the expression keys: {'#cmt'}."
             self.assertEqual(str(e), expected_error_message)
 
-    @patch('singer.metadata.get', side_effect =["#c", "{\"cmt\": \"Comment\"}"])
+    @patch('singer.metadata.get', side_effect = mock_metadata("#c", "{\"cmt\": \"Comment\"}"))
     @patch('tap_dynamodb.sync_strategies.log_based.sync_shard', return_value = 1)
     @patch('tap_dynamodb.deserialize.Deserializer', return_value = {})
     def test_sync_for_expr_key_without_hash(self, mock_deserializer, mock_sync_shard, mock_stream_client, mock_client, mock_metadata_get, mock_get_bookmark, mock_write_bookmark, mock_write_state, mock_to_map):
@@ -160,7 +165,7 @@ class TestExpressionAttributesInLogBasedSync(unittest.TestCase):
             expected_error_message = "Expression key 'cmt' must start with '#'."
             self.assertEqual(str(e), expected_error_message)
 
-    @patch('singer.metadata.get', side_effect =["#c", "{\"#cmt\": \"Comment\"}"])
+    @patch('singer.metadata.get', side_effect = mock_metadata("#c", "{\"#cmt\": \"Comment\"}"))
     @patch('tap_dynamodb.sync_strategies.log_based.sync_shard', return_value = 1)
     @patch('tap_dynamodb.deserialize.Deserializer', return_value = {})
     def test_sync_for_proj_not_in_expr(self, mock_deserializer, mock_sync_shard, mock_stream_client, mock_client, mock_metadata_get, mock_get_bookmark, mock_write_bookmark, mock_write_state, mock_to_map):
@@ -171,14 +176,14 @@ class TestExpressionAttributesInLogBasedSync(unittest.TestCase):
             expected_error_message = "No expression is available for the given projection: #c."
             self.assertEqual(str(e), expected_error_message)
 
-    @patch('singer.metadata.get', side_effect =["#cmt", ""])
+    @patch('singer.metadata.get', side_effect = mock_metadata("#cmt", ""))
     @patch('tap_dynamodb.sync_strategies.log_based.prepare_projection', return_value = 1)
     def test_prepare_projections_not_called_when_null_expressions(self, mock_prepare_projection, mock_metadata_get, mock_stream_client, mock_client, mock_get_bookmark, mock_write_bookmark, mock_write_state, mock_to_map):
         """Test that the prepare_projection() is not called when expression attributes are not passed in the catalog."""
         res = sync(CONFIG, STATE, STREAM)
         self.assertEqual(mock_prepare_projection.call_count, 0)
 
-    @patch('singer.metadata.get', side_effect = ["#c", "{\"#c\":, \"Comment\"}"])
+    @patch('singer.metadata.get', side_effect = mock_metadata("#c", "{\"#c\":, \"Comment\"}"))
     @patch('tap_dynamodb.sync_strategies.log_based.sync_shard', return_value = 1)
     @patch('tap_dynamodb.deserialize.Deserializer', return_value = {})
     def test_sync_with_invalid_json(self, mock_deserializer, mock_sync_shard, mock_stream_client, mock_client, mock_metadata_get, mock_get_bookmark, mock_write_bookmark, mock_write_state, mock_to_map):
@@ -189,7 +194,7 @@ class TestExpressionAttributesInLogBasedSync(unittest.TestCase):
             expected_error_message = "Invalid JSON format. The expression attributes should contain a valid JSON format."
             self.assertEqual(str(e), expected_error_message)
 
-    @patch('singer.metadata.get', side_effect = ["Test", ""])
+    @patch('singer.metadata.get', side_effect = mock_metadata("Test", ""))
     @patch('tap_dynamodb.sync_strategies.log_based.sync_shard', return_value = 1)
     @patch('tap_dynamodb.sync.clear_state_on_replication_change')
     @patch('singer.set_currently_syncing')
@@ -0,0 +1,121 @@
+import threading
+import unittest
+from unittest import mock
+from tap_dynamodb.sync_strategies import incremental
+
+CONFIG = {"region_name": "dummy_region", "use_local_dynamo": "true"}
+
+TABLE = {
+    'TableName': 'dummy_stream',
+    'KeySchema': [{'AttributeName': 'id', 'KeyType': 'HASH'}],
+    'AttributeDefinitions': [{'AttributeName': 'id', 'AttributeType': 'S'},
+                             {'AttributeName': 'bucket', 'AttributeType': 'N'},
+                             {'AttributeName': 'updated_at', 'AttributeType': 'S'}],
+    'GlobalSecondaryIndexes': [{'IndexName': 'by_updated_at',
+                                'KeySchema': [{'AttributeName': 'bucket', 'KeyType': 'HASH'},
+                                              {'AttributeName': 'updated_at', 'KeyType': 'RANGE'}]}],
+}
+
+def make_stream(partitions='0, 1', replication_key='updated_at', index='by_updated_at', projection=None):
+    mdata = {'replication-key': replication_key, 'tap-dynamodb.query-index': index,
+             'tap-dynamodb.query-partitions': partitions}
+    if projection is not None:
+        mdata['tap-mongodb.projection'] = projection
+    return {'tap_stream_id': 'dummy_stream', 'metadata': [{'breadcrumb': [], 'metadata': mdata}]}
+
+def make_item(item_id, bucket, updated_at):
+    return {'id': {'S': item_id}, 'bucket': {'N': str(bucket)}, 'updated_at': {'S': updated_at}}
+
+class MockClient():
+    '''Mock client answering the queries of the index in pages of two items.'''
+    def __init__(self, items):
+        self.items = items
+        self.queries = []
+        self.lock = threading.Lock()
+
+    def describe_table(self, **kwargs):
+        return {'Table': TABLE}
+
+    def query(self, **kwargs):
+        with self.lock:
+            self.queries.append(kwargs)
+        values = kwargs['ExpressionAttributeValues']
+        items = sorted((item for item in self.items
+                        if item['bucket'] == values[':partition']
+                        and (':replication_key' not in values
+                             or item['updated_at']['S'] >= values[':replication_key']['S'])),
+                       key=lambda item: item['updated_at']['S'])
+        start = 0
+        if 'ExclusiveStartKey' in kwargs:
+            start = items.index(kwargs['ExclusiveStartKey']) + 1
+        page = items[start:start + 2]
+        result = {'Items': page}
+        if start + 2 < len(items):
+            result['LastEvaluatedKey'] = page[-1]
+        return result
+
+@mock.patch('tap_dynamodb.output.write_state')
+@mock.patch('tap_dynamodb.output.write_record')
+class TestIncrementalSync(unittest.TestCase):
+
+    def sync(self, client, state, stream=None):
+        with mock.patch('tap_dynamodb.dynamodb.get_client', return_value=client):
+            return incremental.sync(CONFIG, state, stream or make_stream())
+
+    def test_partitions_are_queried_from_their_bookmark(self, mock_write_record, mock_write_state):
+        """Verify every partition is queried from the last replication key value it wrote"""
+        client = MockClient([make_item('a', 0, '2024-01-01'), make_item('b', 0, '2024-01-03'),
+                             make_item('c', 0, '2024-01-02'), make_item('d', 1, '2024-01-05'),
+                             make_item('e', 2, '2024-01-01')])
+        state = {}
+
+        rows = self.sync(client, state)
+
+        self.assertEqual(rows, 4)
+        self.assertEqual(sorted(c[0][1]['id'] for c in mock_write_record.call_args_list), ['a', 'b', 'c', 'd'])
+        self.assertEqual(state['bookmarks']['dummy_stream']['replication_key_values'],
+                         {'0': {'S': '2024-01-03'}, '1': {'S': '2024-01-05'}})
+        query = client.queries[0]
+        self.assertEqual(query['IndexName'], 'by_updated_at')
+        self.assertEqual(query['KeyConditionExpression'], '#tap_dynamodb_partition_key = :partition')
+        self.assertEqual(query['ExpressionAttributeNames'], {'#tap_dynamodb_partition_key': 'bucket'})
+
+        client.items.append(make_item('f', 0, '2024-01-04'))
+        client.queries = []
+        mock_write_record.reset_mock()
+
+        rows = self.sync(client, state)
+
+        # the items with the bookmarked value are written again
+        self.assertEqual(sorted(c[0][1]['id'] for c in mock_write_record.call_args_list), ['b', 'd', 'f'])
+        query = [query for query in client.queries if query['ExpressionAttributeValues'][':partition'] == {'N': '0'}][0]
+        self.assertEqual(query['KeyConditionExpression'],
+                         '#tap_dynamodb_partition_key = :partition AND #tap_dynamodb_replication_key >= :replication_key')
+        self.assertEqual(query['ExpressionAttributeValues'][':replication_key'], {'S': '2024-01-03'})
+        self.assertEqual(state['bookmarks']['dummy_stream']['replication_key_values']['0'], {'S': '2024-01-04'})
+
+    def test_replication_key_is_the_sort_key(self, mock_write_record, mock_write_state):
+        """Verify the replication key has to be the sort key of the queried index"""
+        with self.assertRaises(Exception) as e:
+            self.sync(MockClient([]), {}, make_stream(replication_key='id'))
+        self.assertEqual(str(e.exception), "Invalid replication key: id. It should be the sort key of by_updated_at.")
+
+    def test_unknown_index(self, mock_write_record, mock_write_state):
+        """Verify an unknown index raises an exception"""
+        with self.assertRaises(Exception) as e:
+            self.sync(MockClient([]), {}, make_stream(index='missing'))
+        self.assertEqual(str(e.exception), "Invalid query index: missing. It should be an index of table dummy_stream.")
+
+    def test_projection_without_replication_key(self, mock_write_record, mock_write_state):
+        """Verify a projection has to include the replication key"""
+        with self.assertRaises(Exception) as e:
+            self.sync(MockClient([]), {}, make_stream(projection='id, name'))
+        self.assertEqual(str(e.exception),
+                         "Invalid projection: id, name. It should include the replication key updated_at.")
+
+    def test_missing_partitions(self, mock_write_record, mock_write_state):
+        """Verify the partitions to query have to be listed"""
+        with self.assertRaises(Exception) as e:
+            self.sync(MockClient([]), {}, make_stream(partitions=''))
+        self.assertEqual(str(e.exception),
+                         "Invalid query partitions: []. It should list the partition key values to query.")
@@ -0,0 +1,213 @@
+import datetime
+import unittest
+from unittest import mock
+import singer
+from botocore.exceptions import ClientError
+from tap_dynamodb import shard_state, sync, tailing
+from tap_dynamodb.sync_strategies import log_based
+
+CONFIG = {"region_name": "dummy_region", "use_local_dynamo": "true"}
+
+def make_shard(shard_id, closed):
+    sequence_number_range = {'StartingSequenceNumber': '1'}
+    if closed:
+        sequence_number_range['EndingSequenceNumber'] = '9'
+    return {'ShardId': shard_id, 'SequenceNumberRange': sequence_number_range}
+
+class MockStreamsClient():
+    '''Mock client serving the pages of sequence numbers of every shard, followed by empty pages.'''
+    def __init__(self, shards, pages):
+        self.shards = shards
+        self.pages = pages
+        self.get_records_calls = 0
+        self.describe_stream_calls = []
+
+    def describe_table(self, **kwargs):
+        return {'Table': {'LatestStreamArn': 'dummy_arn'}}
+
+    def describe_stream(self, **kwargs):
+        self.describe_stream_calls.append(kwargs)
+        shard_ids = [shard['ShardId'] for shard in self.shards]
+        start = 0
+        if 'ExclusiveStartShardId' in kwargs:
+            if kwargs['ExclusiveStartShardId'] not in shard_ids:
+                raise ClientError({'Error': {'Code': 'ValidationException', 'Message': 'Unknown shard'}},
+                                  'DescribeStream')
+            start = shard_ids.index(kwargs['ExclusiveStartShardId']) + 1
+        return {'StreamDescription': {'Shards': self.shards[start:]}}
+
+    def get_shard_iterator(self, **kwargs):
+        assert kwargs['ShardIteratorType'] == 'TRIM_HORIZON'
+        return {'ShardIterator': '{}/0'.format(kwargs['ShardId'])}
+
+    def get_records(self, ShardIterator, Limit):
+        self.get_records_calls += 1
+        shard_id, page = ShardIterator.split('/')
+        page = int(page)
+        pages = self.pages.get(shard_id, [])
+        sequence_numbers = pages[page] if page < len(pages) else []
+        records = [{'eventName': 'INSERT', 'dynamodb': {'SequenceNumber': n}} for n in sequence_numbers]
+        return {'Records': records, 'NextShardIterator': '{}/{}'.format(shard_id, page + 1)}
+
+class TestGetInitialBookmarks(unittest.TestCase):
+
+    @mock.patch('tap_dynamodb.dynamodb.get_stream_client')
+    @mock.patch('tap_dynamodb.dynamodb.get_client')
+    def test_open_shards_are_bookmarked(self, mock_get_client, mock_get_stream_client):
+        """Verify closed shards are finished and open shards are bookmarked at their last record"""
+        client = MockStreamsClient([make_shard('closed', True), make_shard('open', False), make_shard('empty', False)],
+                                   {'open': [['1', '2'], ['3']]})
+        mock_get_client.return_value = client
+        mock_get_stream_client.return_value = client
+        state = {'bookmarks': {'dummy_table': {'shard_seq_numbers': {'gone': '5'}}}}
+
+        state = log_based.get_initial_bookmarks(CONFIG, state, 'dummy_table')
+
+        bookmarks = state['bookmarks']['dummy_table']
+        self.assertEqual(shard_state.decode_shard_ids(bookmarks['finished_shards']), {'closed'})
+        self.assertEqual(bookmarks['shard_seq_numbers'], {'open': '3'})
+        self.assertIn('initial_bookmarks_timestamp', bookmarks)
+        # the open shards are read until the first empty page
+        self.assertEqual(client.get_records_calls, 4)
+
+STREAM = {'tap_stream_id': 'dummy_table', 'schema': {},
+          'metadata': [{'breadcrumb': [], 'metadata': {'replication-method': 'LOG_BASED',
+                                                        'table-key-properties': ['id']}}]}
+
+@mock.patch('tap_dynamodb.output.write_message')
+@mock.patch('tap_dynamodb.output.write_state')
+@mock.patch('tap_dynamodb.sync_strategies.log_based.sync', return_value=0)
+@mock.patch('tap_dynamodb.sync_strategies.full_table.sync', return_value=0)
+@mock.patch('tap_dynamodb.sync_strategies.log_based.get_initial_bookmarks', side_effect=lambda config, state, table: state)
+class TestInitialFullTableSync(unittest.TestCase):
+
+    def make_state(self, hours_ago=1, **bookmarks):
+        # an interrupted first run has no success_timestamp yet
+        bookmarks_timestamp = singer.utils.now() - datetime.timedelta(hours=hours_ago)
+        bookmarks = dict(bookmarks, last_replication_method='LOG_BASED',
+                         initial_bookmarks_timestamp=singer.utils.strftime(bookmarks_timestamp),
+                         shard_seq_numbers={'open': '3'})
+        return {'bookmarks': {'dummy_table': bookmarks}}
+
+    def test_shards_are_bookmarked_before_the_full_table_sync(self, mock_get_initial_bookmarks, *args):
+        """Verify the shards are bookmarked when a full table sync starts"""
+        sync.sync_stream(CONFIG, {}, STREAM)
+        mock_get_initial_bookmarks.assert_called_once()
+
+    def test_resumed_full_table_sync_keeps_the_shard_bookmarks(self, mock_get_initial_bookmarks, *args):
+        """Verify an interrupted full table sync is resumed with the shard bookmarks it started with"""
+        for bookmark, value in [('last_evaluated_key', {'id': {'N': '1'}}), ('scan_segments', 4)]:
+            with self.subTest(bookmark=bookmark):
+                state = self.make_state(**{bookmark: value})
+                sync.sync_stream(CONFIG, state, STREAM)
+                mock_get_initial_bookmarks.assert_not_called()
+                self.assertEqual(state['bookmarks']['dummy_table']['shard_seq_numbers'], {'open': '3'})
+
+    def test_aged_out_full_table_sync_is_restarted(self, mock_get_initial_bookmarks, *args):
+        """Verify an interrupted full table sync is restarted once its shard bookmarks aged out"""
+        state = self.make_state(hours_ago=20, last_evaluated_key={'id': {'N': '1'}})
+
+        sync.sync_stream(CONFIG, state, STREAM)
+
+        mock_get_initial_bookmarks.assert_called_once()
+        self.assertNotIn('shard_seq_numbers', state['bookmarks']['dummy_table'])
+
+class TestShardCatalog(unittest.TestCase):
+
+    def make_state(self):
+        return {'bookmarks': {'dummy_table': {'finished_shards': shard_state.encode_shard_ids(set())}}}
+
+    def shard_ids(self, shards):
+        return [shard['ShardId'] for shard in shards]
+
+    def test_only_shards_after_the_catalog_are_described(self):
+        """Verify the shards are described after the last closed shard before the first open shard"""
+        client = MockStreamsClient([make_shard('a', True), make_shard('b', True), make_shard('c', False),
+                                    make_shard('d', True)], {})
+        state = self.make_state()
+
+        shards = log_based.get_cached_shards(client, 'dummy_arn', state, 'dummy_table')
+
+        self.assertEqual(self.shard_ids(shards), ['a', 'b', 'd'])
+        catalog = state['bookmarks']['dummy_table']['shard_catalog']
+        self.assertEqual(catalog['last_shard_id'], 'b')
+        # only the IDs of the closed shards are kept
+        self.assertEqual([{key: value for key, value in batch.items() if key != 'added_at'}
+                          for batch in catalog['shards']], [{'prefix': '', 'ids': 'a,b'}])
+
+        # 'c' closed and a new shard was created
+        client.shards[2] = make_shard('c', True)
+        client.shards.append(make_shard('e', False))
+        shards = log_based.get_cached_shards(client, 'dummy_arn', state, 'dummy_table', include_open=True)
+
+        self.assertEqual(client.describe_stream_calls[-1], {'StreamArn': 'dummy_arn', 'ExclusiveStartShardId': 'b'})
+        # the finished shards stay in the catalog
+        self.assertEqual(self.shard_ids(shards), ['a', 'b', 'c', 'd', 'e'])
+        self.assertEqual(catalog['last_shard_id'], 'd')
+        self.assertEqual([batch['ids'] for batch in catalog['shards']], ['a,b', 'c,d'])
+
+        # a new stream is described from the start
+        log_based.get_cached_shards(client, 'new_arn', state, 'dummy_table')
+        self.assertEqual(client.describe_stream_calls[-1], {'StreamArn': 'new_arn'})
+        self.assertEqual(state['bookmarks']['dummy_table']['shard_catalog']['last_shard_id'], 'd')
+
+    def test_removed_finished_shards_describe_every_shard(self):
+        """Verify every shard is described again once the finished shards bookmark is removed"""
+        client = MockStreamsClient([make_shard('a', True), make_shard('b', True)], {})
+        state = self.make_state()
+        log_based.get_cached_shards(client, 'dummy_arn', state, 'dummy_table')
+
+        del state['bookmarks']['dummy_table']['finished_shards']
+        shards = log_based.get_cached_shards(client, 'dummy_arn', state, 'dummy_table')
+
+        self.assertEqual(client.describe_stream_calls[-1], {'StreamArn': 'dummy_arn'})
+        self.assertEqual(self.shard_ids(shards), ['a', 'b'])
+
+    def test_trimmed_shards_are_dropped(self):
+        """Verify the shards added to the catalog before the stream retention are dropped without describing them"""
+        client = MockStreamsClient([make_shard('a', True), make_shard('b', False)], {})
+        state = self.make_state()
+        log_based.get_cached_shards(client, 'dummy_arn', state, 'dummy_table')
+
+        client.shards = [make_shard('a', True), make_shard('b', True), make_shard('c', False)]
+        later = singer.utils.now() + datetime.timedelta(hours=2)
+        with mock.patch('singer.utils.now', return_value=later):
+            log_based.get_cached_shards(client, 'dummy_arn', state, 'dummy_table')
+
+        later += log_based.SHARD_RETENTION - datetime.timedelta(hours=1)
+        with mock.patch('singer.utils.now', return_value=later):
+            shards = log_based.get_cached_shards(client, 'dummy_arn', state, 'dummy_table')
+
+        self.assertEqual(client.describe_stream_calls[-1], {'StreamArn': 'dummy_arn', 'ExclusiveStartShardId': 'b'})
+        self.assertEqual(self.shard_ids(shards), ['b'])
+
+    def test_parent_shards_are_kept(self):
+        """Verify the parent shards of the closed shards are kept in the catalog"""
+        parent = make_shard('shardId-0001', True)
+        child = dict(make_shard('shardId-0002', True), ParentShardId='shardId-0001')
+        client = MockStreamsClient([parent, child], {})
+        state = self.make_state()
+        log_based.get_cached_shards(client, 'dummy_arn', state, 'dummy_table')
+
+        shards = log_based.get_cached_shards(client, 'dummy_arn', state, 'dummy_table')
+
+        # the shards are decoded from the catalog
+        self.assertEqual(client.describe_stream_calls[-1], {'StreamArn': 'dummy_arn',
+                                                            'ExclusiveStartShardId': 'shardId-0002'})
+
+        self.assertEqual([(shard['ShardId'], shard.get('ParentShardId')) for shard in shards],
+                         [('shardId-0001', None), ('shardId-0002', 'shardId-0001')])
+        self.assertFalse(any(tailing.is_open(shard) for shard in shards))
+
+    def test_trimmed_last_shard(self):
+        """Verify every shard is described if the shards after the last shard of the catalog can not be"""
+        client = MockStreamsClient([make_shard('a', True), make_shard('b', True), make_shard('c', False)], {})
+        state = self.make_state()
+        log_based.get_cached_shards(client, 'dummy_arn', state, 'dummy_table')
+
+        client.shards = [make_shard('c', True), make_shard('d', False)]
+        shards = log_based.get_cached_shards(client, 'dummy_arn', state, 'dummy_table', include_open=True)
+
+        self.assertEqual(client.describe_stream_calls[-2], {'StreamArn': 'dummy_arn', 'ExclusiveStartShardId': 'b'})
+        self.assertEqual(client.describe_stream_calls[-1], {'StreamArn': 'dummy_arn'})
+        self.assertEqual(self.shard_ids(shards), ['c', 'd'])
@@ -0,0 +1,167 @@
+import io
+import threading
+import unittest
+from unittest import mock
+import singer
+from tap_dynamodb import output
+
+class FakeClock():
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+def make_stdout():
+    return io.TextIOWrapper(io.BytesIO(), encoding='utf-8')
+
+def written_lines(stdout):
+    stdout.flush()
+    return stdout.buffer.getvalue().decode('utf-8').splitlines()
+
+class TestMessageWriter(unittest.TestCase):
+
+    def test_messages_are_buffered_until_flush(self):
+        """Verify nothing is written to stdout before the buffer is flushed"""
+        stdout = make_stdout()
+        writer = output.MessageWriter(buffer_size=1024 * 1024, flush_interval=60, clock=FakeClock())
+        with mock.patch('sys.stdout', stdout):
+            writer.write_message(singer.RecordMessage(stream='table', record={'id': 1}, version=1))
+            self.assertEqual(written_lines(stdout), [])
+            writer.flush()
+        self.assertEqual(written_lines(stdout),
+                         [singer.format_message(singer.RecordMessage(stream='table', record={'id': 1}, version=1))])
+
+    def test_state_is_written_after_its_records(self):
+        """Verify the messages are written in the order they were written to the writer"""
+        stdout = make_stdout()
+        writer = output.MessageWriter(buffer_size=1024 * 1024, flush_interval=60, clock=FakeClock())
+        with mock.patch('sys.stdout', stdout):
+            for i in range(3):
+                writer.write_message(singer.RecordMessage(stream='table', record={'id': i}))
+            writer.write_message(singer.StateMessage(value={'bookmarks': {'table': {'id': 2}}}))
+            writer.write_message(singer.RecordMessage(stream='table', record={'id': 3}))
+            writer.flush()
+        types = [singer.parse_message(line).asdict()['type'] for line in written_lines(stdout)]
+        self.assertEqual(types, ['RECORD', 'RECORD', 'RECORD', 'STATE', 'RECORD'])
+
+    def test_flush_on_buffer_size(self):
+        """Verify the buffer is flushed once it reaches the buffer size"""
+        stdout = make_stdout()
+        writer = output.MessageWriter(buffer_size=100, flush_interval=60, clock=FakeClock())
+        with mock.patch('sys.stdout', stdout):
+            writer.write_message(singer.RecordMessage(stream='table', record={'id': 1}))
+            self.assertEqual(len(written_lines(stdout)), 0)
+            writer.write_message(singer.RecordMessage(stream='table', record={'data': 'x' * 100}))
+            self.assertEqual(len(written_lines(stdout)), 2)
+        self.assertEqual(len(writer.buffer), 0)
+
+    def test_flush_on_interval(self):
+        """Verify the buffer is flushed once the oldest buffered message is older than the interval"""
+        stdout = make_stdout()
+        clock = FakeClock()
+        writer = output.MessageWriter(buffer_size=1024 * 1024, flush_interval=1, clock=clock)
+        with mock.patch('sys.stdout', stdout):
+            writer.write_message(singer.RecordMessage(stream='table', record={'id': 1}))
+            clock.now += 0.5
+            writer.write_message(singer.RecordMessage(stream='table', record={'id': 2}))
+            self.assertEqual(len(written_lines(stdout)), 0)
+            clock.now += 0.5
+            writer.write_message(singer.RecordMessage(stream='table', record={'id': 3}))
+            self.assertEqual(len(written_lines(stdout)), 3)
+
+    def test_unbuffered(self):
+        """Verify every message is written right away with a buffer size of 0"""
+        stdout = make_stdout()
+        writer = output.MessageWriter(buffer_size=0, flush_interval=60, clock=FakeClock())
+        with mock.patch('sys.stdout', stdout):
+            writer.write_message(singer.StateMessage(value={}))
+            self.assertEqual(len(written_lines(stdout)), 1)
+
+    def test_text_stdout(self):
+        """Verify the messages are written to a stdout without a binary buffer"""
+        stdout = io.StringIO()
+        writer = output.MessageWriter(buffer_size=0, flush_interval=60, clock=FakeClock())
+        with mock.patch('sys.stdout', stdout):
+            writer.write_message(singer.StateMessage(value={}))
+        self.assertEqual(stdout.getvalue(), '{"type": "STATE", "value": {}}\n')
+
+    def test_configure(self):
+        """Verify the flush thresholds are read from the config"""
+        with mock.patch.object(output, 'WRITER', output.MessageWriter()):
+            output.configure({'output_buffer_size': '0', 'output_flush_interval': '2.5'})
+            self.assertEqual(output.WRITER.buffer_size, 0)
+            self.assertEqual(output.WRITER.flush_interval, 2.5)
+            output.configure({})
+            self.assertEqual(output.WRITER.buffer_size, output.BUFFER_SIZE)
+            self.assertEqual(output.WRITER.flush_interval, output.FLUSH_INTERVAL)
+
+    def test_invalid_config(self):
+        """Verify invalid flush thresholds raise an exception"""
+        cases = [({'output_buffer_size': 'big'}, "Invalid output_buffer_size: big. It should be an integer."),
+                 ({'output_buffer_size': -1}, "Invalid output_buffer_size: -1. It should not be negative."),
+                 ({'output_flush_interval': 'soon'}, "Invalid output_flush_interval: soon. It should be a number."),
+                 ({'output_flush_interval': '-1'}, "Invalid output_flush_interval: -1.0. It should not be negative.")]
+        for config, message in cases:
+            with self.subTest(message=message), mock.patch.object(output, 'WRITER', output.MessageWriter()):
+                with self.assertRaises(Exception) as e:
+                    output.configure(config)
+                self.assertEqual(str(e.exception), message)
+
+class TestStateMerger(unittest.TestCase):
+
+    @mock.patch('tap_dynamodb.output.write_message')
+    def test_stream_states_are_merged(self, mock_write_message):
+        """Verify the state of a stream is merged into the state of the run, which is written as a whole"""
+        state = {'bookmarks': {'a': {'version': 1}, 'b': {'version': 2}}}
+        merger = output.StateMerger(state)
+        stream_state = merger.get_stream_state('a')
+        self.assertEqual(stream_state, {'bookmarks': {'a': {'version': 1}}})
+
+        with output.merging_state(merger, 'a'):
+            stream_state['currently_syncing'] = 'a'
+            stream_state['bookmarks']['a']['shard_seq_numbers'] = {'shard': '1'}
+            output.write_state(stream_state)
+
+        self.assertEqual(state, {'currently_syncing': 'a',
+                                 'bookmarks': {'a': {'version': 1, 'shard_seq_numbers': {'shard': '1'}},
+                                               'b': {'version': 2}}})
+        self.assertEqual(mock_write_message.call_args[0][0].value, state)
+        # the merged bookmarks are a copy, so the stream can keep updating its own
+        stream_state['bookmarks']['a']['shard_seq_numbers']['shard'] = '2'
+        self.assertEqual(state['bookmarks']['a']['shard_seq_numbers'], {'shard': '1'})
+
+        # outside of `merging_state` the state is written as is
+        output.write_state({'bookmarks': {}})
+        self.assertEqual(mock_write_message.call_args[0][0].value, {'bookmarks': {}})
+
+    @mock.patch('tap_dynamodb.output.write_message')
+    def test_cleared_stream_state(self, mock_write_message):
+        """Verify the bookmarks of a stream are removed if the stream cleared them"""
+        state = {'bookmarks': {'a': {'version': 1}}}
+        merger = output.StateMerger(state)
+        merger.write_state('a', {'bookmarks': {}})
+        self.assertEqual(state, {'bookmarks': {}})
+
+    def test_concurrent_writes_do_not_interleave(self):
+        """Verify the messages written from several threads are written whole"""
+        stdout = make_stdout()
+        writer = output.MessageWriter(buffer_size=100, flush_interval=60)
+
+        def write(stream):
+            for i in range(200):
+                writer.write_record(stream, {'id': i, 'data': stream * 20})
+
+        with mock.patch('sys.stdout', stdout):
+            threads = [threading.Thread(target=write, args=(stream,)) for stream in 'abcd']
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            writer.flush()
+
+        lines = written_lines(stdout)
+        self.assertEqual(len(lines), 800)
+        for stream in 'abcd':
+            records = [singer.parse_message(line).record for line in lines if singer.parse_message(line).stream == stream]
+            self.assertEqual([record['id'] for record in records], list(range(200)))
@@ -0,0 +1,146 @@
+import unittest
+from unittest import mock
+from tap_dynamodb.sync_strategies import full_table
+
+CONFIG = {"region_name": "dummy_region", "use_local_dynamo": "true"}
+
+def make_stream(segments=None):
+    mdata = {}
+    if segments is not None:
+        mdata['tap-dynamodb.scan-segments'] = segments
+    return {"tap_stream_id": "dummy_stream",
+            "metadata": [{"breadcrumb": [], "metadata": mdata}]}
+
+class MockSegmentedClient():
+    '''Mock client returning two pages of two items for every segment.'''
+    def __init__(self):
+        self.calls = []
+
+    def scan(self, **kwargs):
+        self.calls.append(kwargs)
+        segment = kwargs['Segment']
+        if 'ExclusiveStartKey' not in kwargs:
+            return {'Items': [{'id': {'N': '{}0'.format(segment)}}, {'id': {'N': '{}1'.format(segment)}}],
+                    'LastEvaluatedKey': {'id': {'N': '{}1'.format(segment)}}}
+        return {'Items': [{'id': {'N': '{}2'.format(segment)}}, {'id': {'N': '{}3'.format(segment)}}]}
+
+class MockFailingClient():
+    def scan(self, **kwargs):
+        raise RuntimeError('segment failed')
+
+@mock.patch('tap_dynamodb.output.write_message')
+@mock.patch('tap_dynamodb.output.write_state')
+class TestParallelScan(unittest.TestCase):
+
+    def test_get_scan_segments(self, mock_write_state, mock_write_message):
+        """Verify the segment count is read from the metadata and defaults to 1"""
+        self.assertEqual(full_table.get_scan_segments({}), 1)
+        self.assertEqual(full_table.get_scan_segments({(): {'tap-dynamodb.scan-segments': '4'}}), 4)
+
+    def test_get_scan_segments_invalid(self, mock_write_state, mock_write_message):
+        """Verify an invalid segment count raises an exception"""
+        with self.assertRaises(Exception) as e:
+            full_table.get_scan_segments({(): {'tap-dynamodb.scan-segments': 0}})
+        self.assertEqual(str(e.exception), "Invalid scan segments: 0. It should be between 1 and 1000000.")
+
+    @mock.patch('tap_dynamodb.output.write_record')
+    @mock.patch('tap_dynamodb.dynamodb.get_client')
+    def test_all_segments_are_scanned(self, mock_get_client, mock_write_record, mock_write_state, mock_write_message):
+        """Verify every segment is scanned and every record is written"""
+        client = MockSegmentedClient()
+        mock_get_client.return_value = client
+        state = {}
+
+        rows = full_table.sync(CONFIG, state, make_stream(3))
+
+        self.assertEqual(rows, 12)
+        self.assertEqual({call['Segment'] for call in client.calls}, {0, 1, 2})
+        self.assertTrue(all(call['TotalSegments'] == 3 for call in client.calls))
+        written_ids = sorted(int(c[0][1]['id']) for c in mock_write_record.call_args_list)
+        self.assertEqual(written_ids, [0, 1, 2, 3, 10, 11, 12, 13, 20, 21, 22, 23])
+        # the segment bookmarks are cleared once the table has been scanned
+        self.assertEqual(state['bookmarks']['dummy_stream'].get('scan_segments'), None)
+        self.assertEqual(state['bookmarks']['dummy_stream'].get('finished_segments'), None)
+        self.assertTrue(state['bookmarks']['dummy_stream']['initial_full_table_complete'])
+
+    @mock.patch('tap_dynamodb.dynamodb.get_client')
+    def test_interrupted_segments_are_resumed(self, mock_get_client, mock_write_state, mock_write_message):
+        """Verify finished segments are skipped and others resume from their own bookmark"""
+        client = MockSegmentedClient()
+        mock_get_client.return_value = client
+        state = {'bookmarks': {'dummy_stream': {
+            'version': 1,
+            'scan_segments': 3,
+            'finished_segments': [0],
+            'segment_last_evaluated_keys': {'1': {'id': {'N': '11'}}}}}}
+
+        # the segment count from the bookmark wins over the metadata
+        rows = full_table.sync(CONFIG, state, make_stream(5))
+
+        self.assertEqual(rows, 6)
+        calls = {call['Segment']: call for call in client.calls}
+        self.assertEqual(set(calls), {1, 2})
+        self.assertEqual(calls[1]['ExclusiveStartKey'], {'id': {'N': '11'}})
+        self.assertEqual(state['bookmarks']['dummy_stream']['version'], 1)
+
+    @mock.patch('tap_dynamodb.dynamodb.get_client')
+    def test_segment_error_is_raised(self, mock_get_client, mock_write_state, mock_write_message):
+        """Verify an error raised by a segment worker is raised by the sync"""
+        mock_get_client.return_value = MockFailingClient()
+
+        with self.assertRaises(RuntimeError):
+            full_table.sync(CONFIG, {}, make_stream(2))
+
+@mock.patch('tap_dynamodb.output.write_message')
+@mock.patch('tap_dynamodb.output.write_state')
+class TestScanScheduler(unittest.TestCase):
+
+    def test_segments_oversubscribe_workers(self, mock_write_state, mock_write_message):
+        """Verify the table is split in more segments than workers when only the workers are set"""
+        md_map = {(): {'tap-dynamodb.scan-workers': 3}}
+        self.assertEqual(full_table.get_scan_segments(md_map), 3 * full_table.SEGMENTS_PER_WORKER)
+        self.assertEqual(full_table.get_scan_workers(md_map, 12, CONFIG), 3)
+
+    def test_workers_default_to_segments(self, mock_write_state, mock_write_message):
+        """Verify there is one worker per segment by default and never more workers than segments"""
+        self.assertEqual(full_table.get_scan_workers({}, 5, CONFIG), 5)
+        self.assertEqual(full_table.get_scan_workers({(): {'tap-dynamodb.scan-workers': 8}}, 5, CONFIG), 5)
+
+    def test_default_workers_are_capped_by_the_connection_pool(self, mock_write_state, mock_write_message):
+        """Verify the default worker count does not exceed the connections of the shared client"""
+        self.assertEqual(full_table.get_scan_workers({}, 1000, CONFIG), 50)
+        self.assertEqual(full_table.get_scan_workers({}, 1000, dict(CONFIG, max_pool_connections=20)), 20)
+        # explicitly configured workers are not capped
+        self.assertEqual(full_table.get_scan_workers({(): {'tap-dynamodb.scan-workers': 100}}, 1000, CONFIG), 100)
+
+    @mock.patch('tap_dynamodb.sync_strategies.full_table.parallel.iterate_in_parallel',
+                side_effect=lambda tasks, workers: (page for page in []))
+    @mock.patch('tap_dynamodb.dynamodb.get_client')
+    def test_in_progress_segments_are_queued_first(self, mock_get_client, mock_iterate, mock_write_state, mock_write_message):
+        """Verify interrupted segments are resumed before the pending ones and finished ones are skipped"""
+        state = {'bookmarks': {'dummy_stream': {
+            'version': 1,
+            'scan_segments': 6,
+            'finished_segments': [0, 2],
+            'segment_last_evaluated_keys': {'4': {'id': {'N': '1'}}, '5': {'id': {'N': '2'}}}}}}
+        stream = make_stream()
+        stream['metadata'][0]['metadata']['tap-dynamodb.scan-workers'] = 2
+
+        full_table.sync(CONFIG, state, stream)
+
+        tasks, workers = mock_iterate.call_args[0]
+        self.assertEqual([segment for segment, _ in tasks], [4, 5, 1, 3])
+        self.assertEqual(workers, 2)
+
+    @mock.patch('tap_dynamodb.dynamodb.get_client')
+    def test_more_segments_than_workers(self, mock_get_client, mock_write_state, mock_write_message):
+        """Verify every segment is scanned when there are less workers than segments"""
+        client = MockSegmentedClient()
+        mock_get_client.return_value = client
+        stream = make_stream(8)
+        stream['metadata'][0]['metadata']['tap-dynamodb.scan-workers'] = 2
+
+        rows = full_table.sync(CONFIG, {}, stream)
+
+        self.assertEqual(rows, 32)
+        self.assertEqual({call['Segment'] for call in client.calls}, set(range(8)))
@@ -0,0 +1,132 @@
+import os
+import tempfile
+import threading
+import unittest
+from unittest import mock
+from tap_dynamodb.sync_strategies import full_table
+
+CONFIG = {"region_name": "dummy_region", "use_local_dynamo": "true"}
+
+TABLE = {
+    'TableName': 'dummy_stream',
+    'KeySchema': [{'AttributeName': 'customer', 'KeyType': 'HASH'},
+                  {'AttributeName': 'order', 'KeyType': 'RANGE'}],
+    'AttributeDefinitions': [{'AttributeName': 'customer', 'AttributeType': 'N'},
+                             {'AttributeName': 'order', 'AttributeType': 'S'}],
+}
+
+def make_stream(replication_method='FULL_TABLE', **mdata):
+    mdata = {'tap-dynamodb.' + key.replace('_', '-'): value for key, value in mdata.items()}
+    mdata['replication-method'] = replication_method
+    return {'tap_stream_id': 'dummy_stream', 'metadata': [{'breadcrumb': [], 'metadata': mdata}]}
+
+def make_item(customer, order):
+    return {'customer': {'N': str(customer)}, 'order': {'S': order}}
+
+class MockClient():
+    '''Mock client answering the queries of a partition in pages of two items.'''
+    def __init__(self, items):
+        self.items = items
+        self.queries = []
+        self.lock = threading.Lock()
+
+    def describe_table(self, **kwargs):
+        return {'Table': TABLE}
+
+    def scan(self, **kwargs):
+        raise AssertionError('the table should not be scanned')
+
+    def query(self, **kwargs):
+        with self.lock:
+            self.queries.append(kwargs)
+        partition = kwargs['ExpressionAttributeValues'][':partition']
+        items = sorted((item for item in self.items if item['customer'] == partition),
+                       key=lambda item: item['order']['S'])
+        start = 0
+        if 'ExclusiveStartKey' in kwargs:
+            start = items.index(kwargs['ExclusiveStartKey']) + 1
+        page = items[start:start + 2]
+        result = {'Items': page}
+        if start + 2 < len(items):
+            result['LastEvaluatedKey'] = page[-1]
+        return result
+
+ITEMS = [make_item(1, 'a'), make_item(1, 'b'), make_item(1, 'c'), make_item(2, 'd'), make_item(3, 'e')]
+
+@mock.patch('tap_dynamodb.output.write_message')
+@mock.patch('tap_dynamodb.output.write_state')
+@mock.patch('tap_dynamodb.output.write_record')
+class TestPartitionQuery(unittest.TestCase):
+
+    def sync(self, client, state, stream):
+        with mock.patch('tap_dynamodb.dynamodb.get_client', return_value=client):
+            return full_table.sync(CONFIG, state, stream)
+
+    def test_listed_partitions_are_queried(self, mock_write_record, mock_write_state, mock_write_message):
+        """Verify only the listed partitions are queried and their bookmarks are cleared once done"""
+        client = MockClient(ITEMS)
+        state = {}
+
+        rows = self.sync(client, state, make_stream(partition_keys='1, 3, 1'))
+
+        self.assertEqual(rows, 4)
+        self.assertEqual(sorted(c[0][1]['order'] for c in mock_write_record.call_args_list), ['a', 'b', 'c', 'e'])
+        # two pages of the first partition and one of the other
+        self.assertEqual(len(client.queries), 3)
+        query = client.queries[0]
+        self.assertEqual(query['KeyConditionExpression'], '#tap_dynamodb_partition_key = :partition')
+        self.assertEqual(query['ExpressionAttributeNames'], {'#tap_dynamodb_partition_key': 'customer'})
+        self.assertNotIn('IndexName', query)
+        bookmarks = state['bookmarks']['dummy_stream']
+        self.assertNotIn('partition_last_evaluated_keys', bookmarks)
+        self.assertNotIn('finished_partitions', bookmarks)
+        self.assertTrue(bookmarks['initial_full_table_complete'])
+
+    def test_partition_keys_file(self, mock_write_record, mock_write_state, mock_write_message):
+        """Verify the partition keys are read from a file with one value per line"""
+        with tempfile.NamedTemporaryFile('w', suffix='.txt', delete=False) as keys_file:
+            keys_file.write('2\n\n3\n')
+        self.addCleanup(os.remove, keys_file.name)
+
+        rows = self.sync(MockClient(ITEMS), {}, make_stream(partition_keys_file=keys_file.name))
+
+        self.assertEqual(rows, 2)
+        self.assertEqual(sorted(c[0][1]['order'] for c in mock_write_record.call_args_list), ['d', 'e'])
+
+    def test_interrupted_partitions_are_resumed(self, mock_write_record, mock_write_state, mock_write_message):
+        """Verify an interrupted sync skips the finished partitions and resumes the others from their bookmark"""
+        client = MockClient(ITEMS)
+        state = {'bookmarks': {'dummy_stream': {
+            'version': 1234,
+            'finished_partitions': ['2'],
+            'partition_last_evaluated_keys': {'1': make_item(1, 'b')},
+        }}}
+
+        rows = self.sync(client, state, make_stream(partition_keys='2,3,1', query_workers='1'))
+
+        self.assertEqual(rows, 2)
+        self.assertEqual([c[0][1]['order'] for c in mock_write_record.call_args_list], ['c', 'e'])
+        # the in progress partition is queried first
+        self.assertEqual(client.queries[0]['ExclusiveStartKey'], make_item(1, 'b'))
+        # the interrupted sync keeps its version
+        self.assertEqual(state['bookmarks']['dummy_stream']['version'], 1234)
+
+    def test_empty_partition_keys(self, mock_write_record, mock_write_state, mock_write_message):
+        """Verify a partition key list without values raises an exception"""
+        with self.assertRaises(Exception) as e:
+            full_table.get_partition_keys({(): {'replication-method': 'FULL_TABLE',
+                                                 'tap-dynamodb.partition-keys': ' , '}})
+        self.assertEqual(str(e.exception),
+                         "Invalid partition keys:  , . It should list the partition key values to query.")
+
+    def test_partition_keys_of_log_based_stream(self, mock_write_record, mock_write_state, mock_write_message):
+        """Verify the partition keys are rejected on a LOG_BASED stream, as they would limit its initial sync"""
+        client = MockClient(ITEMS)
+
+        with self.assertRaises(Exception) as e:
+            self.sync(client, {}, make_stream('LOG_BASED', partition_keys='1'))
+
+        self.assertEqual(str(e.exception),
+                         "Invalid partition keys: 1. It should only be set on FULL_TABLE streams, not LOG_BASED.")
+        self.assertEqual(client.queries, [])
+        mock_write_state.assert_not_called()
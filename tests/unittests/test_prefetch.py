@@ -0,0 +1,54 @@
+import threading
+import unittest
+from unittest import mock
+from tap_dynamodb import parallel
+from tap_dynamodb.sync_strategies import full_table
+
+class TestPrefetch(unittest.TestCase):
+
+    def test_items_are_yielded_in_order(self):
+        """Verify the prefetched items are yielded in the order of the iterable"""
+        self.assertEqual(list(parallel.prefetch(iter(range(10)), 2)), list(range(10)))
+
+    def test_prefetch_disabled(self):
+        """Verify the iterable is consumed on the calling thread when the depth is 0"""
+        threads = []
+        def pages():
+            threads.append(threading.current_thread())
+            yield 1
+        self.assertEqual(list(parallel.prefetch(pages(), 0)), [1])
+        self.assertEqual(threads, [threading.current_thread()])
+
+    def test_prefetch_is_bounded(self):
+        """Verify the background thread does not fetch more than the depth ahead of the caller"""
+        fetched = []
+        def pages():
+            for page in range(100):
+                fetched.append(page)
+                yield page
+        with mock.patch('tap_dynamodb.parallel.QUEUE_POLL_SECONDS', 0.01):
+            items = parallel.prefetch(pages(), 2)
+            self.assertEqual(next(items), 0)
+            # let the background thread fill the queue
+            threading.Event().wait(0.2)
+            # the queue holds 2 pages and 1 more page waits to be queued
+            self.assertLessEqual(len(fetched), 4)
+            items.close()
+
+    def test_errors_are_raised_to_the_caller(self):
+        """Verify an error raised while fetching is raised on the calling thread"""
+        def pages():
+            yield 1
+            raise RuntimeError('fetch failed')
+        items = parallel.prefetch(pages(), 1)
+        self.assertEqual(next(items), 1)
+        with self.assertRaises(RuntimeError):
+            next(items)
+
+    def test_get_prefetch_pages(self):
+        """Verify the prefetch depth is read from the config"""
+        self.assertEqual(full_table.get_prefetch_pages({}), full_table.PREFETCH_PAGES)
+        self.assertEqual(full_table.get_prefetch_pages({'scan_prefetch_pages': '4'}), 4)
+        self.assertEqual(full_table.get_prefetch_pages({'scan_prefetch_pages': 0}), 0)
+        with self.assertRaises(Exception):
+            full_table.get_prefetch_pages({'scan_prefetch_pages': -1})
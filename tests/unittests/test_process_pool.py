@@ -0,0 +1,76 @@
+import decimal
+import io
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from unittest import mock
+import singer
+from tap_dynamodb import output, parallel, process_pool
+
+def make_page(start, count, last_evaluated_key=None):
+    page = {'Items': [{'id': {'N': str(i)}, 'price': {'N': '1.5'}, 'payload': {'B': b'data'}}
+                      for i in range(start, start + count)]}
+    if last_evaluated_key:
+        page['LastEvaluatedKey'] = last_evaluated_key
+    return page
+
+def expected_lines(table_name, version, ids):
+    return [singer.format_message(singer.RecordMessage(
+        stream=table_name, version=version,
+        record={'id': i, 'price': decimal.Decimal('1.5'), 'payload': 'ZGF0YQ=='})) for i in ids]
+
+class TestProcessPool(unittest.TestCase):
+
+    def test_get_decode_workers(self):
+        """Verify the worker count is read from the config and validated"""
+        self.assertEqual(process_pool.get_decode_workers({}), 0)
+        self.assertEqual(process_pool.get_decode_workers({'decode_workers': '4'}), 4)
+        with self.assertRaises(Exception) as e:
+            process_pool.get_decode_workers({'decode_workers': '-1'})
+        self.assertEqual(str(e.exception), "Invalid decode_workers: -1. It should not be negative.")
+
+    def test_encode_page(self):
+        """Verify a page is encoded to the same lines as the records written by the main process"""
+        lines, count = process_pool.encode_page('table', 1, None, None, make_page(0, 3)['Items'])
+        self.assertEqual(count, 3)
+        self.assertEqual(lines.decode('utf-8').splitlines(), expected_lines('table', 1, range(3)))
+
+    @mock.patch('tap_dynamodb.output.write_lines')
+    def test_pages_are_written_in_order(self, mock_write_lines):
+        """Verify the pages are written and yielded in order, each once its records are written"""
+        pages = [('a', make_page(0, 2, {'id': {'N': '1'}})),
+                 ('b', make_page(2, 3)),
+                 ('a', parallel.DONE),
+                 ('b', make_page(5, 1)),
+                 ('b', parallel.DONE)]
+        written = []
+
+        with mock.patch.dict(process_pool.POOL, executor=ThreadPoolExecutor(max_workers=2), workers=2):
+            for key, result, rows_saved in process_pool.write_pages(iter(pages), 'table', 1, None, None):
+                # every page is yielded after its records were written
+                written.append((key, result, rows_saved, mock_write_lines.call_count))
+
+        self.assertEqual([(key, result) for key, result, _, _ in written], pages)
+        self.assertEqual([rows_saved for _, _, rows_saved, _ in written], [2, 3, 0, 1, 0])
+        self.assertEqual([calls for _, _, _, calls in written], [1, 2, 2, 3, 3])
+        lines = b''.join(c[0][0] for c in mock_write_lines.call_args_list).decode('utf-8').splitlines()
+        self.assertEqual(lines, expected_lines('table', 1, range(6)))
+
+    def test_worker_processes(self):
+        """Verify the pool is started once and encodes the pages in worker processes"""
+        stdout = io.TextIOWrapper(io.BytesIO(), encoding='utf-8')
+        try:
+            process_pool.start({'decode_workers': 1})
+            pool = process_pool.get_pool()
+            process_pool.start({'decode_workers': 1})
+            self.assertIs(process_pool.get_pool(), pool)
+
+            with mock.patch.object(output, 'WRITER', output.MessageWriter()), mock.patch('sys.stdout', stdout):
+                results = list(process_pool.write_pages(iter([(None, make_page(0, 2))]), 'table', 1, None, None))
+                output.flush()
+        finally:
+            process_pool.shutdown()
+
+        self.assertIsNone(process_pool.get_pool())
+        self.assertEqual(results[0][2], 2)
+        stdout.flush()
+        self.assertEqual(stdout.buffer.getvalue().decode('utf-8').splitlines(), expected_lines('table', 1, range(2)))
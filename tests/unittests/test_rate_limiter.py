@@ -0,0 +1,223 @@
+import json
+import unittest
+from unittest import mock
+import boto3
+from botocore.awsrequest import AWSResponse
+from botocore.config import Config
+from botocore.exceptions import ClientError
+from tap_dynamodb import rate_limiter
+from tap_dynamodb.sync_strategies import full_table
+
+class FakeClock():
+    def __init__(self):
+        self.now = 0.0
+        self.sleeps = []
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+class MockClient():
+    def __init__(self, table):
+        self.table = table
+        self.scan_params = []
+
+    def describe_table(self, **kwargs):
+        return {'Table': self.table}
+
+    def scan(self, **kwargs):
+        self.scan_params.append(kwargs)
+        return {'Items': [], 'ConsumedCapacity': {'TableName': 'dummy', 'CapacityUnits': 5.0}}
+
+class TestTokenBucket(unittest.TestCase):
+
+    def test_acquire_does_not_wait_with_tokens_left(self):
+        """Verify acquire returns right away while the bucket holds tokens"""
+        clock = FakeClock()
+        bucket = rate_limiter.TokenBucket(10, clock=clock, sleep=clock.sleep)
+        bucket.acquire()
+        bucket.consume(5)
+        bucket.acquire()
+        self.assertEqual(clock.sleeps, [])
+
+    def test_acquire_waits_for_the_debt_to_be_paid(self):
+        """Verify acquire waits until the capacity consumed above the budget is refilled"""
+        clock = FakeClock()
+        bucket = rate_limiter.TokenBucket(10, clock=clock, sleep=clock.sleep)
+        bucket.acquire()
+        # consume 2 seconds worth of capacity in one request
+        bucket.consume(30)
+        bucket.acquire()
+        self.assertEqual(clock.sleeps, [2.0])
+
+    def test_bucket_does_not_refill_above_capacity(self):
+        """Verify an idle bucket does not accumulate more than its capacity"""
+        clock = FakeClock()
+        bucket = rate_limiter.TokenBucket(10, clock=clock, sleep=clock.sleep)
+        clock.now += 100
+        bucket.consume(0)
+        self.assertEqual(bucket.tokens, 10)
+
+class TestGetReadLimiter(unittest.TestCase):
+
+    def setUp(self):
+        rate_limiter.reset_read_limiters()
+
+    def tearDown(self):
+        rate_limiter.reset_read_limiters()
+
+    def test_no_limiter_without_config(self):
+        """Verify no limiter is used when no read capacity budget is configured"""
+        self.assertIsNone(rate_limiter.get_read_limiter({}, 'dummy'))
+
+    def test_absolute_limiter_is_shared_by_tables(self):
+        """Verify the absolute budget is one bucket shared by every table"""
+        config = {'read_capacity_units_per_second': '50'}
+        limiter_1 = rate_limiter.get_read_limiter(config, 'table_1')
+        limiter_2 = rate_limiter.get_read_limiter(config, 'table_2')
+        self.assertIs(limiter_1.buckets[0], limiter_2.buckets[0])
+        self.assertEqual(limiter_1.buckets[0].rate, 50)
+
+    @mock.patch('tap_dynamodb.dynamodb.get_client')
+    def test_fraction_of_provisioned_capacity(self, mock_get_client):
+        """Verify the table budget is the fraction of the provisioned read capacity units"""
+        mock_get_client.return_value = MockClient({'ProvisionedThroughput': {'ReadCapacityUnits': 200}})
+        limiter = rate_limiter.get_read_limiter({'read_capacity_fraction': 0.25}, 'table_1')
+        self.assertEqual([bucket.rate for bucket in limiter.buckets], [50])
+        # the table limiter is shared by every sync of the table
+        self.assertIs(rate_limiter.get_read_limiter({'read_capacity_fraction': 0.25}, 'table_1').buckets[0],
+                      limiter.buckets[0])
+        self.assertEqual(mock_get_client.call_count, 1)
+
+    @mock.patch('tap_dynamodb.dynamodb.get_client')
+    def test_fraction_ignored_for_on_demand_tables(self, mock_get_client):
+        """Verify the fraction does not apply to on-demand tables"""
+        mock_get_client.return_value = MockClient({'BillingModeSummary': {'BillingMode': 'PAY_PER_REQUEST'},
+                                                   'ProvisionedThroughput': {'ReadCapacityUnits': 0}})
+        self.assertIsNone(rate_limiter.get_read_limiter({'read_capacity_fraction': 0.25}, 'table_1'))
+
+    def test_invalid_fraction(self):
+        """Verify a fraction greater than 1 raises an exception"""
+        with self.assertRaises(Exception) as e:
+            rate_limiter.get_read_limiter({'read_capacity_fraction': 2}, 'table_1')
+        self.assertEqual(str(e.exception), "Invalid read_capacity_fraction: 2.0. It should not be greater than 1.")
+
+class TestScanConsumedCapacity(unittest.TestCase):
+
+    def test_scan_consumes_capacity(self):
+        """Verify every scan requests the consumed capacity and feeds it to the limiter"""
+        client = MockClient({})
+        limiter = mock.Mock()
+        pages = list(full_table.scan_table('dummy', None, None, None, {}, client=client, limiter=limiter))
+
+        self.assertEqual(client.scan_params[0]['ReturnConsumedCapacity'], 'TOTAL')
+        limiter.acquire.assert_called_once_with()
+        limiter.consume.assert_called_once_with(pages[0])
+
+class MockStreamsClient():
+    def get_records(self, **kwargs):
+        return {'Records': []}
+
+class FakeRaw():
+    def __init__(self, body):
+        self.body = body
+
+    def stream(self, **kwargs):
+        yield self.body
+
+def make_streams_client(responses):
+    '''
+    Return a Streams client answering its attempts with the `(status, error
+    code)` responses in turn, so the retries still go through botocore
+    '''
+    client = boto3.client('dynamodbstreams', region_name='us-east-1',
+                          aws_access_key_id='key', aws_secret_access_key='secret',
+                          config=Config(retries={'mode': 'standard', 'total_max_attempts': 3}))
+    responses = iter(responses)
+
+    def send(request, **kwargs):
+        status, error_code = next(responses)
+        body = {'__type': error_code, 'message': 'error'} if error_code else {'Records': []}
+        return AWSResponse(request.url, status, {}, FakeRaw(json.dumps(body).encode('utf-8')))
+
+    client.meta.events.register('before-send', send)
+    return client
+
+THROTTLED = (400, 'LimitExceededException')
+
+class TestStreamsGovernor(unittest.TestCase):
+
+    def test_requests_are_paced_per_shard(self):
+        """Verify the requests to a shard are paced while other shards keep their own budget"""
+        clock = FakeClock()
+        governor = rate_limiter.StreamsGovernor(2, clock=clock, sleep=clock.sleep)
+        client = MockStreamsClient()
+        for _ in range(3):
+            governor.call('arn', 'shard-1', client.get_records, ShardIterator='iterator')
+        self.assertEqual(clock.sleeps, [0.5])
+        governor.call('arn', 'shard-2', client.get_records, ShardIterator='iterator')
+        self.assertEqual(clock.sleeps, [0.5])
+
+    def test_requests_are_paced_per_stream(self):
+        """Verify the shards of a stream share the stream budget"""
+        clock = FakeClock()
+        governor = rate_limiter.StreamsGovernor(5, stream_rate=1, clock=clock, sleep=clock.sleep)
+        client = MockStreamsClient()
+        governor.call('arn', 'shard-1', client.get_records)
+        governor.call('arn', 'shard-2', client.get_records)
+        self.assertEqual(clock.sleeps, [1.0])
+        governor.call('other-arn', 'shard-1', client.get_records)
+        self.assertEqual(clock.sleeps, [1.0])
+
+    @mock.patch('time.sleep')
+    def test_throttles_are_counted(self, mock_sleep):
+        """Verify only the attempts rejected with a throttling error are counted and hold the shard back"""
+        clock = FakeClock()
+        governor = rate_limiter.StreamsGovernor(5, clock=clock, sleep=clock.sleep)
+        client = make_streams_client([THROTTLED, (500, 'InternalServerError'), (200, None)])
+        governor.call('arn', 'shard', client.get_records, ShardIterator='iterator')
+        self.assertEqual(governor.throttles[('arn', 'get_records')], 1)
+        # the throttled shard lost a second of its budget on top of the request
+        self.assertEqual(governor.get_buckets('arn', 'shard')[0].tokens, 5 - 1 - 5)
+
+        # the last attempt of a request which ran out of retries is counted as well
+        client = make_streams_client([THROTTLED, THROTTLED, THROTTLED])
+        with self.assertRaises(ClientError):
+            governor.call('arn', 'shard', client.get_records, ShardIterator='iterator')
+        client = make_streams_client([(400, 'ResourceNotFoundException')])
+        with self.assertRaises(ClientError):
+            governor.call('arn', 'shard', client.get_records, ShardIterator='iterator')
+        self.assertEqual(governor.throttles[('arn', 'get_records')], 4)
+
+    @mock.patch('time.sleep')
+    def test_throttles_outside_the_governor_are_not_counted(self, mock_sleep):
+        """Verify the calls which are not made through the governor are not counted"""
+        governor = rate_limiter.StreamsGovernor(5)
+        client = make_streams_client([(200, None), THROTTLED, (200, None)])
+        governor.call('arn', 'shard', client.get_records, ShardIterator='iterator')
+        client.get_records(ShardIterator='iterator')
+        self.assertEqual(governor.throttles[('arn', 'get_records')], 0)
+
+    @mock.patch('time.sleep')
+    @mock.patch('singer.metrics.log')
+    def test_throttles_are_published(self, mock_log, mock_sleep):
+        """Verify the throttle counts of a stream are logged as metrics"""
+        governor = rate_limiter.StreamsGovernor(5)
+        client = make_streams_client([THROTTLED, (200, None)])
+        governor.call('arn', 'shard', client.get_records, ShardIterator='iterator')
+        governor.log_throttles('arn', 'table')
+        points = [c[0][1] for c in mock_log.call_args_list]
+        self.assertEqual([(p.metric, p.value, p.tags['operation']) for p in points],
+                         [('throttled_requests', 0, 'get_shard_iterator'), ('throttled_requests', 1, 'get_records')])
+
+    def test_configure(self):
+        """Verify the governor of the process is configured from the config"""
+        with mock.patch.object(rate_limiter, 'STREAMS_GOVERNOR', rate_limiter.StreamsGovernor(1)):
+            rate_limiter.configure_streams_governor({'shard_requests_per_second': '2', 'stream_requests_per_second': 10})
+            self.assertEqual((rate_limiter.STREAMS_GOVERNOR.shard_rate, rate_limiter.STREAMS_GOVERNOR.stream_rate), (2, 10))
+            rate_limiter.configure_streams_governor({})
+            self.assertEqual((rate_limiter.STREAMS_GOVERNOR.shard_rate, rate_limiter.STREAMS_GOVERNOR.stream_rate),
+                             (rate_limiter.SHARD_REQUESTS_PER_SECOND, None))
@@ -0,0 +1,137 @@
+import datetime
+import json
+import unittest
+import boto3
+from botocore.awsrequest import AWSResponse
+from tap_dynamodb import raw_response
+from tap_dynamodb.deserialize import Deserializer
+from tap_dynamodb.sync_strategies import log_based
+
+SCAN_BODY = {
+    'Items': [
+        {'id': {'N': '1'}, 'name': {'S': 'café'}, 'price': {'N': '12.50'}, 'payload': {'B': 'YmluYXJ5'},
+         'blobs': {'BS': ['YQ==', 'Yg==']}, 'tags': {'SS': ['a']}, 'active': {'BOOL': True},
+         'address': {'M': {'geo': {'L': [{'N': '52.52'}, {'NULL': True}]}}}},
+        {'id': {'N': '2'}},
+    ],
+    'Count': 2,
+    'ScannedCount': 2,
+    'LastEvaluatedKey': {'id': {'N': '2'}, 'sort': {'B': 'YQ=='}},
+    'ConsumedCapacity': {'TableName': 'table', 'CapacityUnits': 1.5},
+}
+
+GET_RECORDS_BODY = {
+    'Records': [
+        {'eventID': '1', 'eventName': 'INSERT', 'eventSource': 'aws:dynamodb',
+         'dynamodb': {'ApproximateCreationDateTime': 1600000000.0, 'Keys': {'id': {'N': '1'}},
+                      'NewImage': {'id': {'N': '1'}, 'payload': {'B': 'YmluYXJ5'}},
+                      'SequenceNumber': '100000000000000000001', 'SizeBytes': 26,
+                      'StreamViewType': 'NEW_IMAGE'}},
+        {'eventID': '2', 'eventName': 'REMOVE', 'eventSource': 'aws:dynamodb',
+         'dynamodb': {'ApproximateCreationDateTime': 1600000001.0, 'Keys': {'id': {'N': '1'}},
+                      'SequenceNumber': '100000000000000000002', 'SizeBytes': 8,
+                      'StreamViewType': 'NEW_IMAGE'}},
+    ],
+    'NextShardIterator': 'next-iterator',
+}
+
+class FakeRaw():
+    def __init__(self, body):
+        self.body = body
+
+    def stream(self, **kwargs):
+        yield self.body
+
+def make_client(service_name, body):
+    '''
+    Return a client answering every call with `body`, so the responses still
+    go through the botocore parser
+    '''
+    client = boto3.client(service_name, region_name='us-east-1',
+                          aws_access_key_id='key', aws_secret_access_key='secret')
+    encoded = json.dumps(body).encode('utf-8')
+    client.meta.events.register(
+        'before-send', lambda request, **kwargs: AWSResponse(request.url, 200, {}, FakeRaw(encoded)))
+    return client
+
+def scan(client, decoder):
+    with raw_response.decoding(decoder):
+        return client.scan(TableName='table')
+
+def get_records(client, decoder):
+    with raw_response.decoding(decoder):
+        return client.get_records(ShardIterator='iterator')
+
+class TestRawResponseDecoding(unittest.TestCase):
+
+    def test_scan(self):
+        """Verify the decoded scan items are the deserialized items and the control fields are parsed by botocore"""
+        deserializer = Deserializer()
+        client = make_client('dynamodb', SCAN_BODY)
+        raw_response.register(client)
+
+        parsed = scan(client, None)
+        decoded = scan(client, deserializer)
+
+        self.assertEqual(decoded['Items'], [deserializer.deserialize_item(item) for item in parsed['Items']])
+        self.assertEqual(decoded['LastEvaluatedKey'], {'id': {'N': '2'}, 'sort': {'B': b'a'}})
+        self.assertEqual(decoded['ConsumedCapacity'], parsed['ConsumedCapacity'])
+        self.assertEqual(decoded['Count'], 2)
+        # the decoded items are not deserialized again
+        item = decoded['Items'][0]
+        self.assertIs(deserializer.deserialize_item(item), item)
+
+    def test_get_records(self):
+        """Verify the decoded stream records match the deserialized botocore records"""
+        deserializer = Deserializer()
+        client = make_client('dynamodbstreams', GET_RECORDS_BODY)
+        raw_response.register(client)
+
+        parsed = get_records(client, None)
+        decoded = get_records(client, deserializer)
+
+        self.assertEqual(decoded['NextShardIterator'], 'next-iterator')
+        self.assertEqual(len(decoded['Records']), 2)
+        for parsed_record, decoded_record in zip(parsed['Records'], decoded['Records']):
+            self.assertEqual(decoded_record['eventName'], parsed_record['eventName'])
+            parsed_stream_record, decoded_stream_record = parsed_record['dynamodb'], decoded_record['dynamodb']
+            self.assertEqual(decoded_stream_record['SequenceNumber'], parsed_stream_record['SequenceNumber'])
+            self.assertEqual(decoded_stream_record['ApproximateCreationDateTime'],
+                             parsed_stream_record['ApproximateCreationDateTime'])
+            self.assertIsInstance(decoded_stream_record['ApproximateCreationDateTime'], datetime.datetime)
+            for image in ('Keys', 'NewImage'):
+                if image in parsed_stream_record:
+                    self.assertEqual(deserializer.deserialize_item(decoded_stream_record[image]),
+                                     deserializer.deserialize_item(parsed_stream_record[image]))
+
+    def test_shard_pages_keep_the_decoder_of_the_thread(self):
+        """Verify the shard pages read without a decoder are decoded with the decoder of the current thread"""
+        deserializer = Deserializer()
+        # the shard is closed after the first page
+        body = {'Records': GET_RECORDS_BODY['Records'], 'ShardIterator': 'iterator'}
+        client = make_client('dynamodbstreams', body)
+        raw_response.register(client)
+        stream_arn = 'arn:aws:dynamodb:us-east-1:123456789012:table/table/stream/2020-01-01T00:00:00.000'
+        shard = {'ShardId': 'shardId-00000001600000000000-00000000',
+                 'SequenceNumberRange': {'EndingSequenceNumber': '9'}}
+
+        with raw_response.decoding(deserializer):
+            pages = list(log_based.get_shard_record_pages(client, stream_arn, shard, None))
+
+        self.assertEqual(len(pages), 1)
+        new_image = pages[0][0]['dynamodb']['NewImage']
+        self.assertIs(deserializer.deserialize_item(new_image), new_image)
+
+    def test_not_decoded_outside_of_decoding(self):
+        """Verify the registered handlers leave the responses to botocore without a deserializer"""
+        client = make_client('dynamodb', SCAN_BODY)
+        raw_response.register(client)
+        self.assertEqual(scan(client, None)['Items'][0]['payload'], {'B': b'binary'})
+
+    def test_get_decoder(self):
+        """Verify the decoder is only returned if raw response decoding is enabled in the config"""
+        deserializer = Deserializer()
+        self.assertIsNone(raw_response.get_decoder({}, deserializer))
+        self.assertIsNone(raw_response.get_decoder({'raw_response_decoding': 'false'}, deserializer))
+        self.assertIs(raw_response.get_decoder({'raw_response_decoding': 'true'}, deserializer), deserializer)
+        self.assertIs(raw_response.get_decoder({'raw_response_decoding': True}, deserializer), deserializer)
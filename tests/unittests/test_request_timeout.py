@@ -115,6 +115,13 @@ class TestRequestTimeoutValue(unittest.TestCase):
     Test that request timeout parameter works properly in various cases
     '''
     default_timeout_value = 300
+
+    def setUp(self):
+        # every test creates a new client instead of getting a cached one
+        dynamodb.clear_client_cache()
+
+    def tearDown(self):
+        dynamodb.clear_client_cache()
     @mock.patch('boto3.client')
     @mock.patch("tap_dynamodb.dynamodb.Config")
     def test_config_provided_request_timeout(self, mock_config, mock_client):
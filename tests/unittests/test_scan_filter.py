@@ -0,0 +1,117 @@
+import unittest
+from unittest import mock
+from tap_dynamodb.sync_strategies import full_table
+
+CONFIG = {"region_name": "dummy_region", "use_local_dynamo": "true"}
+
+FILTER = {'filter-expression': '#s = :status', 'filter-expression-values': '{":status": {"S": "active"}}',
+          'expression-attributes': '{"#s": "status"}'}
+
+def make_stream(segments=None, replication_method='FULL_TABLE', **mdata):
+    mdata = {'tap-dynamodb.' + key: value for key, value in mdata.items()}
+    mdata['replication-method'] = replication_method
+    if segments is not None:
+        mdata['tap-dynamodb.scan-segments'] = segments
+    return {'tap_stream_id': 'dummy_stream', 'metadata': [{'breadcrumb': [], 'metadata': mdata}]}
+
+class MockFilteringClient():
+    '''Mock client returning the active items of two pages of three items for every segment.'''
+    def __init__(self):
+        self.calls = []
+
+    def scan(self, **kwargs):
+        self.calls.append(kwargs)
+        segment = kwargs.get('Segment', 0)
+        page = 1 if 'ExclusiveStartKey' in kwargs else 0
+        items = [{'id': {'N': '{}{}{}'.format(segment, page, i)}, 'status': {'S': 'active' if i == 0 else 'closed'}}
+                 for i in range(3)]
+        if 'FilterExpression' in kwargs:
+            items = [item for item in items if item['status'] == kwargs['ExpressionAttributeValues'][':status']]
+        result = {'Items': items, 'Count': len(items), 'ScannedCount': 3}
+        if page == 0:
+            result['LastEvaluatedKey'] = {'id': {'N': '{}02'.format(segment)}}
+        return result
+
+@mock.patch('tap_dynamodb.output.write_message')
+@mock.patch('tap_dynamodb.output.write_state')
+@mock.patch('tap_dynamodb.output.write_record')
+class TestScanFilter(unittest.TestCase):
+
+    def sync(self, client, stream):
+        with mock.patch('tap_dynamodb.dynamodb.get_client', return_value=client):
+            return full_table.sync(CONFIG, {}, stream)
+
+    def test_filter_is_applied_to_the_scan(self, mock_write_record, mock_write_state, mock_write_message):
+        """Verify the filter expression and its values are sent with every scan request"""
+        client = MockFilteringClient()
+
+        with self.assertLogs(full_table.LOGGER, 'INFO') as logs:
+            rows = self.sync(client, make_stream(**FILTER))
+
+        self.assertEqual(rows, 2)
+        for call in client.calls:
+            self.assertEqual(call['FilterExpression'], '#s = :status')
+            self.assertEqual(call['ExpressionAttributeValues'], {':status': {'S': 'active'}})
+            self.assertEqual(call['ExpressionAttributeNames'], {'#s': 'status'})
+        self.assertIn('INFO:root:Filter expression of table dummy_stream returned 2 of 6 scanned items',
+                      logs.output)
+
+    def test_filter_is_applied_to_the_segments(self, mock_write_record, mock_write_state, mock_write_message):
+        """Verify every segment of a parallel scan is filtered"""
+        client = MockFilteringClient()
+
+        with self.assertLogs(full_table.LOGGER, 'INFO') as logs:
+            rows = self.sync(client, make_stream(3, **FILTER))
+
+        self.assertEqual(rows, 6)
+        self.assertEqual({call['Segment'] for call in client.calls}, {0, 1, 2})
+        self.assertTrue(all(call['FilterExpression'] == '#s = :status' for call in client.calls))
+        self.assertIn('INFO:root:Filter expression of table dummy_stream returned 6 of 18 scanned items',
+                      logs.output)
+
+    def test_no_filter(self, mock_write_record, mock_write_state, mock_write_message):
+        """Verify the scan is not filtered without a filter expression"""
+        client = MockFilteringClient()
+
+        self.assertEqual(self.sync(client, make_stream()), 6)
+        self.assertNotIn('FilterExpression', client.calls[0])
+        self.assertNotIn('ExpressionAttributeValues', client.calls[0])
+
+    def test_binary_values_are_decoded(self, mock_write_record, mock_write_state, mock_write_message):
+        """Verify base64 encoded binary values are decoded"""
+        md_map = {(): {'replication-method': 'FULL_TABLE', 'tap-dynamodb.filter-expression': 'tag = :tag',
+                       'tap-dynamodb.filter-expression-values': {':tag': {'B': 'YWJj'}}}}
+        self.assertEqual(full_table.get_scan_filter(md_map), ('tag = :tag', {':tag': {'B': b'abc'}}))
+
+    def test_invalid_filters(self, mock_write_record, mock_write_state, mock_write_message):
+        """Verify the filters are validated before the table is scanned"""
+        cases = [
+            ({'filter-expression-values': '{":status": {"S": "active"}}'},
+             "Invalid filter expression values: {\":status\": {\"S\": \"active\"}}. "
+             "They should only be set with a filter expression."),
+            ({'filter-expression': 'status = :status', 'filter-expression-values': '{'},
+             "Invalid JSON format. The filter expression values should contain a valid JSON format."),
+            ({'filter-expression': 'status = :status', 'filter-expression-values': '{":status": "active"}'},
+             "Invalid filter expression values: {':status': 'active'}. They should map every placeholder to a "
+             "typed value, e.g. {\":status\": {\"S\": \"active\"}}."),
+            ({'filter-expression': 'status = :status', 'filter-expression-values': '{":other": {"S": "a"}}'},
+             "Invalid filter expression values: [':other']. They should define exactly the placeholders "
+             "[':status'] of the filter expression."),
+            ({'filter-expression': '#s = :status', 'filter-expression-values': '{":status": {"S": "a"}}'},
+             "Invalid filter expression: #s = :status. The attribute names ['#s'] should be defined in the "
+             "expression attributes."),
+            ({'filter-expression': 'status = :partition', 'filter-expression-values': '{":partition": {"S": "a"}}',
+              'partition-keys': '1'},
+             "Invalid filter expression values: [':partition']. The placeholder :partition is used by the "
+             "partition key queries."),
+            (dict(FILTER, replication_method='LOG_BASED'),
+             "Invalid filter expression: #s = :status. It should only be set on FULL_TABLE streams, not LOG_BASED."),
+        ]
+        for mdata, message in cases:
+            with self.subTest(message=message):
+                client = MockFilteringClient()
+                with self.assertRaises(Exception) as e:
+                    self.sync(client, make_stream(**mdata))
+                self.assertEqual(str(e.exception), message)
+                self.assertEqual(client.calls, [])
+                mock_write_state.assert_not_called()
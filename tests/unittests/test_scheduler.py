@@ -0,0 +1,49 @@
+import unittest
+from tap_dynamodb import scheduler
+
+def make_stream(name, row_count=None, table_size=None, priority=None):
+    mdata = {'selected': True}
+    if row_count is not None:
+        mdata['row-count'] = row_count
+    if table_size is not None:
+        mdata['table-size-bytes'] = table_size
+    if priority is not None:
+        mdata['tap-dynamodb.sync-priority'] = priority
+    return {'tap_stream_id': name, 'metadata': [{'breadcrumb': [], 'metadata': mdata}]}
+
+def names(streams):
+    return [stream['tap_stream_id'] for stream in streams]
+
+class TestOrderStreams(unittest.TestCase):
+
+    def test_shortest_first_without_workers(self):
+        """Verify the streams are synced shortest first one after another, empty tables first"""
+        streams = [make_stream('giant', row_count=10 ** 8), make_stream('small', row_count=10),
+                   make_stream('empty'), make_stream('medium', table_size=10 ** 9)]
+        self.assertEqual(names(scheduler.order_streams(streams, {}, 1)), ['empty', 'small', 'medium', 'giant'])
+
+    def test_longest_first_with_workers(self):
+        """Verify the longest streams are started first with several workers"""
+        streams = [make_stream('small', row_count=10), make_stream('giant', row_count=10 ** 8), make_stream('empty')]
+        self.assertEqual(names(scheduler.order_streams(streams, {}, 4)), ['giant', 'small', 'empty'])
+
+    def test_priority_comes_first(self):
+        """Verify the streams with a higher sync priority are synced first"""
+        streams = [make_stream('small', row_count=10), make_stream('urgent', row_count=10 ** 8, priority='5'),
+                   make_stream('late', priority=-1)]
+        self.assertEqual(names(scheduler.order_streams(streams, {}, 1)), ['urgent', 'small', 'late'])
+
+    def test_recorded_sync_time(self):
+        """Verify the recorded sync times are used and calibrate the estimates of the other streams"""
+        streams = [make_stream('slow', row_count=100), make_stream('known', row_count=1000),
+                   make_stream('new', row_count=500)]
+        state = {'bookmarks': {'slow': {'sync_seconds': 100.0}, 'known': {'sync_seconds': 10.0}}}
+        # 1100 rows in 110 seconds estimate `new` at 50 seconds
+        self.assertEqual(scheduler.get_throughput(streams, state, 'row-count', scheduler.ROWS_PER_SECOND), 10)
+        self.assertEqual(names(scheduler.order_streams(streams, state, 1)), ['known', 'new', 'slow'])
+
+    def test_invalid_priority(self):
+        """Verify an invalid sync priority raises an exception"""
+        with self.assertRaises(Exception) as e:
+            scheduler.order_streams([make_stream('a', priority='high')], {}, 1)
+        self.assertEqual(str(e.exception), "Invalid sync priority: high. It should be an integer.")
@@ -0,0 +1,117 @@
+import threading
+import time
+import unittest
+from unittest import mock
+from tap_dynamodb import parallel, shard_state
+from tap_dynamodb.sync_strategies import log_based
+
+CONFIG = {"region_name": "dummy_region", "use_local_dynamo": "true"}
+
+def make_stream(shard_workers=None):
+    mdata = {}
+    if shard_workers is not None:
+        mdata['tap-dynamodb.shard-workers'] = shard_workers
+    return {"tap_stream_id": "dummy_stream",
+            "metadata": [{"breadcrumb": [], "metadata": mdata}]}
+
+def make_shard(shard_id, parent_id=None):
+    shard = {'ShardId': shard_id, 'SequenceNumberRange': {'StartingSequenceNumber': '1', 'EndingSequenceNumber': '9'}}
+    if parent_id:
+        shard['ParentShardId'] = parent_id
+    return shard
+
+class MockStreamsClient():
+    '''Mock client returning two pages of two records for every shard, slowest on the parent shards.'''
+    def __init__(self, shards, slow_shards=()):
+        self.shards = shards
+        self.slow_shards = slow_shards
+        self.lock = threading.Lock()
+        self.started = []
+
+    def describe_table(self, **kwargs):
+        return {'Table': {'LatestStreamArn': 'dummy_arn'}}
+
+    def describe_stream(self, **kwargs):
+        return {'StreamDescription': {'Shards': self.shards}}
+
+    def get_shard_iterator(self, **kwargs):
+        with self.lock:
+            self.started.append(kwargs['ShardId'])
+        return {'ShardIterator': '{}/0'.format(kwargs['ShardId'])}
+
+    def get_records(self, ShardIterator, Limit):
+        shard_id, page = ShardIterator.split('/')
+        if shard_id in self.slow_shards:
+            time.sleep(0.05)
+        page = int(page)
+        records = [{'eventName': 'INSERT',
+                    'dynamodb': {'NewImage': {'shard': {'S': shard_id}, 'id': {'N': str(page * 2 + i)}},
+                                 'SequenceNumber': str(page * 2 + i)}}
+                   for i in range(2)]
+        if page == 0:
+            return {'Records': records, 'NextShardIterator': '{}/1'.format(shard_id)}
+        return {'Records': records}
+
+class TestIterateWithParents(unittest.TestCase):
+
+    def test_children_start_after_their_parent(self):
+        """Verify a child task only starts once all the pages of its parent were consumed"""
+        started = []
+
+        def task(task_id):
+            started.append(task_id)
+            time.sleep(0.01)
+            return [task_id + '-1', task_id + '-2']
+
+        tasks = [(task_id, lambda task_id=task_id: task(task_id)) for task_id in ['child', 'parent', 'other']]
+        results = list(parallel.iterate_in_parallel(tasks, 3, parents={'child': 'parent', 'parent': 'gone'}))
+
+        parent_done = results.index(('parent', parallel.DONE))
+        self.assertTrue(all(task_id != 'child' for task_id, _ in results[:parent_done]))
+        self.assertEqual(len(results), 9)
+        self.assertEqual(started.index('child'), 2)
+
+@mock.patch('tap_dynamodb.output.write_version')
+@mock.patch('tap_dynamodb.output.write_state')
+@mock.patch('tap_dynamodb.output.write_record')
+class TestConcurrentShards(unittest.TestCase):
+
+    @mock.patch('tap_dynamodb.dynamodb.get_stream_client')
+    @mock.patch('tap_dynamodb.dynamodb.get_client')
+    def test_shard_lineage_is_preserved(self, mock_get_client, mock_get_stream_client,
+                                        mock_write_record, mock_write_state, mock_write_version):
+        """Verify every record of a parent shard is written before the records of its children"""
+        shards = [make_shard('parent'), make_shard('child', 'parent'), make_shard('grandchild', 'child'),
+                  make_shard('other'), make_shard('orphan', 'trimmed'), make_shard('finished')]
+        client = MockStreamsClient(shards, slow_shards=('parent', 'child'))
+        mock_get_client.return_value = client
+        mock_get_stream_client.return_value = client
+        state = {'bookmarks': {'dummy_stream': {'finished_shards': ['finished', 'expired'],
+                                                'shard_seq_numbers': {'other': '0'}}}}
+
+        rows = log_based.sync(CONFIG, state, make_stream(4))
+
+        self.assertEqual(rows, 20)
+        written = [(c[0][1]['shard'], c[0][1]['id']) for c in mock_write_record.call_args_list]
+        for parent, child in [('parent', 'child'), ('child', 'grandchild')]:
+            last_parent = max(i for i, (shard, _) in enumerate(written) if shard == parent)
+            first_child = min(i for i, (shard, _) in enumerate(written) if shard == child)
+            self.assertLess(last_parent, first_child)
+        # the records of every shard are written in order
+        for shard in ['parent', 'child', 'grandchild', 'other', 'orphan']:
+            self.assertEqual([record_id for s, record_id in written if s == shard], [0, 1, 2, 3])
+        self.assertNotIn('finished', client.started)
+
+        bookmarks = state['bookmarks']['dummy_stream']
+        # the finished shards of the earlier format are read and the expired one is dropped
+        self.assertEqual(shard_state.decode_shard_ids(bookmarks['finished_shards']),
+                         {'child', 'finished', 'grandchild', 'orphan', 'other', 'parent'})
+        self.assertEqual(bookmarks['shard_seq_numbers'], {})
+
+    def test_shard_workers_invalid(self, mock_write_record, mock_write_state, mock_write_version):
+        """Verify an invalid worker count raises an exception"""
+        with self.assertRaises(Exception) as e:
+            log_based.get_positive_int_metadata({(): {'tap-dynamodb.shard-workers': 'x'}},
+                                                'tap-dynamodb.shard-workers', 'shard workers',
+                                                log_based.MAX_SHARD_WORKERS)
+        self.assertEqual(str(e.exception), "Invalid shard workers: x. It should be an integer.")
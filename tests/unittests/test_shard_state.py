@@ -0,0 +1,50 @@
+import unittest
+from tap_dynamodb import shard_state
+
+SHARD_IDS = {'shardId-00000001536019433744-ab1c2d3e', 'shardId-00000001536019452137-9f8e7d6c',
+             'shardId-00000001536020011024-01234567'}
+
+class TestShardState(unittest.TestCase):
+
+    def test_encode_shard_ids(self):
+        """Verify the shard IDs are written as their common prefix and the sorted rest of the IDs"""
+        encoded = shard_state.encode_shard_ids(SHARD_IDS)
+        self.assertEqual(encoded, {'prefix': 'shardId-000000015360',
+                                   'ids': '19433744-ab1c2d3e,19452137-9f8e7d6c,20011024-01234567'})
+        self.assertEqual(shard_state.decode_shard_ids(encoded), SHARD_IDS)
+
+    def test_empty(self):
+        """Verify no finished shards are encoded and decoded"""
+        encoded = shard_state.encode_shard_ids(set())
+        self.assertEqual(encoded, {'prefix': '', 'ids': ''})
+        self.assertEqual(shard_state.decode_shard_ids(encoded), set())
+        self.assertEqual(shard_state.decode_shard_ids(None), set())
+
+    def test_single_shard(self):
+        """Verify a single shard ID survives being its own common prefix"""
+        encoded = shard_state.encode_shard_ids({'shardId-1'})
+        self.assertEqual(shard_state.decode_shard_ids(encoded), {'shardId-1'})
+
+    def test_read_list_format(self):
+        """Verify the list written by earlier versions of the tap is read"""
+        state = {'bookmarks': {'table': {'finished_shards': sorted(SHARD_IDS)}}}
+        self.assertEqual(shard_state.read_finished_shards(state, 'table'), SHARD_IDS)
+
+        state = shard_state.write_finished_shards(state, 'table', SHARD_IDS)
+        self.assertIsInstance(state['bookmarks']['table']['finished_shards'], dict)
+        self.assertEqual(shard_state.read_finished_shards(state, 'table'), SHARD_IDS)
+
+    def test_encode_shards(self):
+        """Verify only the IDs and parent IDs of the shards are kept, in order"""
+        shard_ids = sorted(SHARD_IDS)
+        shards = [{'ShardId': shard_ids[2], 'SequenceNumberRange': {'EndingSequenceNumber': '9'}},
+                  {'ShardId': shard_ids[0], 'ParentShardId': shard_ids[2],
+                   'SequenceNumberRange': {'StartingSequenceNumber': '1', 'EndingSequenceNumber': '9'}}]
+
+        encoded = shard_state.encode_shards(shards)
+
+        self.assertEqual(encoded, {'prefix': 'shardId-000000015360',
+                                   'ids': '20011024-01234567,19433744-ab1c2d3e/20011024-01234567'})
+        self.assertEqual([(shard['ShardId'], shard.get('ParentShardId')) for shard in shard_state.decode_shards(encoded)],
+                         [(shard_ids[2], None), (shard_ids[0], shard_ids[2])])
+        self.assertEqual(shard_state.decode_shards(shard_state.encode_shards([])), [])
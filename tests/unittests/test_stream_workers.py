@@ -0,0 +1,85 @@
+import io
+import time
+import unittest
+from unittest import mock
+import singer
+import tap_dynamodb
+from tap_dynamodb import output
+
+def make_stream(name, selected=True):
+    return {'tap_stream_id': name, 'schema': {}, 'metadata': [
+        {'breadcrumb': [], 'metadata': {'selected': selected, 'table-key-properties': ['id']}}]}
+
+def mock_sync_stream(config, state, stream):
+    '''Write two records of the stream and its bookmark, like a sync strategy does'''
+    table_name = stream['tap_stream_id']
+    state = singer.set_currently_syncing(state, table_name)
+    for i in range(2):
+        output.write_record(table_name, {'id': i})
+        state = singer.write_bookmark(state, table_name, 'last_id', i)
+        output.write_state(state)
+    return 2
+
+@mock.patch('tap_dynamodb.process_pool.start')
+@mock.patch('tap_dynamodb.sync_stream', side_effect=mock_sync_stream)
+class TestStreamWorkers(unittest.TestCase):
+
+    def sync(self, config, streams, state):
+        stdout = io.TextIOWrapper(io.BytesIO(), encoding='utf-8')
+        with mock.patch('sys.stdout', stdout), mock.patch.object(output, 'WRITER', output.MessageWriter()):
+            tap_dynamodb.do_sync(config, {'streams': streams}, state)
+        stdout.flush()
+        return [singer.parse_message(line) for line in stdout.buffer.getvalue().decode('utf-8').splitlines()]
+
+    def test_concurrent_streams(self, mock_sync_stream, mock_start):
+        """Verify every stream is synced and every state holds the bookmarks of every stream synced so far"""
+        streams = [make_stream(name) for name in ['a', 'b', 'c']] + [make_stream('skipped', selected=False)]
+        state = {'bookmarks': {'c': {'version': 1}}}
+
+        messages = self.sync({'stream_workers': '3'}, streams, state)
+
+        self.assertEqual(mock_sync_stream.call_count, 3)
+        self.assertEqual(sum(1 for message in messages if isinstance(message, singer.RecordMessage)), 6)
+        states = [message.value for message in messages if isinstance(message, singer.StateMessage)]
+        self.assertEqual(states[-1]['bookmarks'], {'a': {'last_id': 1}, 'b': {'last_id': 1},
+                                                   'c': {'version': 1, 'last_id': 1}})
+        for value in states:
+            self.assertEqual(value['bookmarks']['c']['version'], 1)
+        self.assertEqual(state, states[-1])
+        self.assertIn(state['currently_syncing'], ['a', 'b', 'c'])
+
+    def test_first_failure_stops_the_other_streams(self, mock_sync_stream, mock_start):
+        """Verify a failing stream stops the streams still syncing at their next state message"""
+        written_states = []
+
+        def sync_stream(config, state, stream):
+            if stream['tap_stream_id'] == 'failing':
+                raise Exception('failed')
+            for i in range(100):
+                output.write_state(singer.write_bookmark(state, 'slow', 'last_id', i))
+                written_states.append(i)
+                time.sleep(0.05)
+            return 0
+        mock_sync_stream.side_effect = sync_stream
+
+        start_time = time.time()
+        with self.assertRaises(Exception) as e:
+            self.sync({'stream_workers': '2'}, [make_stream('slow'), make_stream('failing')], {})
+
+        self.assertEqual(str(e.exception), 'failed')
+        self.assertLess(time.time() - start_time, 2)
+        self.assertLess(len(written_states), 100)
+
+    def test_sequential_streams(self, mock_sync_stream, mock_start):
+        """Verify the streams share the state of the run without stream workers"""
+        state = {}
+        messages = self.sync({}, [make_stream('a'), make_stream('b')], state)
+        self.assertEqual([call[0][1] for call in mock_sync_stream.call_args_list], [state, state])
+        self.assertEqual(messages[-1].value, {'currently_syncing': 'b',
+                                              'bookmarks': {'a': {'last_id': 1}, 'b': {'last_id': 1}}})
+
+    def test_invalid_stream_workers(self, mock_sync_stream, mock_start):
+        """Verify an invalid stream worker count raises an exception"""
+        with self.assertRaises(Exception) as e:
+            tap_dynamodb.get_stream_workers({'stream_workers': 0})
+        self.assertEqual(str(e.exception), "Invalid stream_workers: 0. It should be at least 1.")
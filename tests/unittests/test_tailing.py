@@ -0,0 +1,153 @@
+import unittest
+from unittest import mock
+from tap_dynamodb import shard_state, tailing
+from tap_dynamodb.sync_strategies import log_based
+
+CONFIG = {"region_name": "dummy_region", "use_local_dynamo": "true"}
+STREAM = {"tap_stream_id": "dummy_stream", "metadata": [{"breadcrumb": [], "metadata": {}}]}
+
+class FakeClock():
+    def __init__(self):
+        self.now = 0.0
+        self.sleeps = []
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+def make_shard(shard_id, closed):
+    sequence_number_range = {'StartingSequenceNumber': '1'}
+    if closed:
+        sequence_number_range['EndingSequenceNumber'] = '9'
+    return {'ShardId': shard_id, 'SequenceNumberRange': sequence_number_range}
+
+class MockStreamsClient():
+    '''Mock client serving the given pages of sequence numbers for every shard, open shards never end.'''
+    def __init__(self, shards, pages):
+        self.shards = shards
+        self.pages = pages
+        self.iterator_params = []
+
+    def describe_table(self, **kwargs):
+        return {'Table': {'LatestStreamArn': 'dummy_arn'}}
+
+    def describe_stream(self, **kwargs):
+        shard_ids = [shard['ShardId'] for shard in self.shards]
+        start = shard_ids.index(kwargs['ExclusiveStartShardId']) + 1 if 'ExclusiveStartShardId' in kwargs else 0
+        return {'StreamDescription': {'Shards': self.shards[start:]}}
+
+    def get_shard_iterator(self, **kwargs):
+        self.iterator_params.append(kwargs)
+        return {'ShardIterator': '{}/0'.format(kwargs['ShardId'])}
+
+    def get_records(self, ShardIterator, Limit):
+        shard_id, page = ShardIterator.split('/')
+        page = int(page)
+        sequence_numbers = self.pages[page] if page < len(self.pages) else []
+        records = [{'eventName': 'INSERT',
+                    'dynamodb': {'NewImage': {'id': {'N': str(n)}}, 'SequenceNumber': str(n)}}
+                   for n in sequence_numbers]
+        shard = [shard for shard in self.shards if shard['ShardId'] == shard_id][0]
+        if tailing.is_open(shard) or page + 1 < len(self.pages):
+            return {'Records': records, 'NextShardIterator': '{}/{}'.format(shard_id, page + 1)}
+        return {'Records': records}
+
+class TestShardTail(unittest.TestCase):
+
+    def test_stop_on_empty_pages(self):
+        """Verify polling stops after the given number of empty pages in a row, waiting between them"""
+        clock = FakeClock()
+        tail = tailing.ShardTail(tailing.TailLimits(empty_pages=2, seconds=0, records=0), clock=clock, sleep=clock.sleep)
+        self.assertFalse(tail.add_page(0))
+        self.assertFalse(tail.add_page(3))
+        self.assertFalse(tail.add_page(0))
+        self.assertTrue(tail.add_page(0))
+        self.assertEqual(clock.sleeps, [tailing.TAIL_POLL_INTERVAL] * 2)
+
+    @mock.patch('tap_dynamodb.output.flush')
+    def test_flush_before_waiting(self, mock_flush):
+        """Verify the buffered messages are written out before waiting on an empty page"""
+        clock = FakeClock()
+        tail = tailing.ShardTail(tailing.TailLimits(empty_pages=3, seconds=0, records=0),
+                                 clock=clock, sleep=lambda seconds: clock.sleeps.append(mock_flush.call_count))
+        tail.add_page(2)
+        mock_flush.assert_not_called()
+        tail.add_page(0)
+        # the messages were flushed by the time the tail waited
+        self.assertEqual(clock.sleeps, [1])
+
+    def test_stop_on_records(self):
+        """Verify polling stops once the record limit is read"""
+        tail = tailing.ShardTail(tailing.TailLimits(empty_pages=0, seconds=0, records=5), clock=FakeClock())
+        self.assertFalse(tail.add_page(3))
+        self.assertTrue(tail.add_page(3))
+
+    def test_stop_on_time(self):
+        """Verify polling stops once the shard was polled for the time limit"""
+        clock = FakeClock()
+        tail = tailing.ShardTail(tailing.TailLimits(empty_pages=0, seconds=10, records=0), clock=clock)
+        self.assertFalse(tail.add_page(1))
+        clock.now = 10
+        self.assertTrue(tail.add_page(1))
+
+    def test_configure(self):
+        """Verify the tailing settings are read from the config and validated"""
+        with mock.patch.dict(tailing.SETTINGS):
+            tailing.configure({})
+            self.assertFalse(tailing.SETTINGS['enabled'])
+            tailing.configure({'tail_open_shards': 'true', 'tail_seconds': '5', 'tail_records': 100})
+            self.assertEqual(tailing.SETTINGS, {'enabled': True, 'empty_pages': tailing.TAIL_EMPTY_PAGES,
+                                                'seconds': 5.0, 'records': 100})
+            with self.assertRaises(Exception) as e:
+                tailing.configure({'tail_open_shards': True, 'tail_empty_pages': 0, 'tail_seconds': 0})
+            self.assertEqual(str(e.exception),
+                             "Invalid tail limits: tail_empty_pages, tail_seconds or tail_records should be greater than 0.")
+
+@mock.patch('tap_dynamodb.output.write_version')
+@mock.patch('tap_dynamodb.output.write_state')
+@mock.patch('tap_dynamodb.output.write_record')
+@mock.patch('tap_dynamodb.tailing.time.sleep')
+class TestTailOpenShards(unittest.TestCase):
+
+    def sync(self, client, state):
+        with mock.patch('tap_dynamodb.dynamodb.get_client', return_value=client), \
+             mock.patch('tap_dynamodb.dynamodb.get_stream_client', return_value=client), \
+             mock.patch.dict(tailing.SETTINGS, {'enabled': True, 'empty_pages': 2, 'seconds': 0, 'records': 0}):
+            return log_based.sync(CONFIG, state, STREAM)
+
+    def test_open_shards_are_skipped_by_default(self, mock_sleep, mock_write_record, mock_write_state, mock_write_version):
+        """Verify open shards are not read unless tailing is enabled"""
+        client = MockStreamsClient([make_shard('closed', True), make_shard('open', False)], [['1', '2']])
+        with mock.patch('tap_dynamodb.dynamodb.get_client', return_value=client), \
+             mock.patch('tap_dynamodb.dynamodb.get_stream_client', return_value=client):
+            rows = log_based.sync(CONFIG, {}, STREAM)
+        self.assertEqual(rows, 2)
+        self.assertEqual([params['ShardId'] for params in client.iterator_params], ['closed'])
+
+    def test_open_shard_is_tailed_and_continued(self, mock_sleep, mock_write_record, mock_write_state, mock_write_version):
+        """Verify an open shard is polled until the limit and continued from its bookmark by the next sync"""
+        client = MockStreamsClient([make_shard('closed', True), make_shard('open', False)], [['1', '2'], ['3']])
+        state = {}
+
+        rows = self.sync(client, state)
+
+        self.assertEqual(rows, 6)
+        bookmarks = state['bookmarks']['dummy_stream']
+        self.assertEqual(shard_state.decode_shard_ids(bookmarks['finished_shards']), {'closed'})
+        self.assertEqual(bookmarks['shard_seq_numbers'], {'open': '3'})
+        self.assertEqual(client.iterator_params[1]['ShardIteratorType'], 'TRIM_HORIZON')
+
+        # the shard was closed in the meantime
+        client.shards[1] = make_shard('open', True)
+        client.iterator_params = []
+        self.sync(client, state)
+
+        self.assertEqual(client.iterator_params, [{'StreamArn': 'dummy_arn', 'ShardId': 'open',
+                                                   'ShardIteratorType': 'AFTER_SEQUENCE_NUMBER',
+                                                   'SequenceNumber': '3'}])
+        # the finished closed shard stays in the catalog until the stream trims it
+        self.assertEqual(shard_state.decode_shard_ids(bookmarks['finished_shards']), {'closed', 'open'})
+        self.assertEqual(bookmarks['shard_seq_numbers'], {})